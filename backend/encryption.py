@@ -58,3 +58,37 @@ def decrypt_data(encrypted_data: str) -> str:
         # Logguez l'erreur ici pour le débogage
         print(f"Decryption failed: {e}") # À remplacer par un vrai logging
         raise ValueError("Could not decrypt data. It might be corrupted or the key is wrong.")
+
+
+# Keys of connection_config whose values are stored encrypted.
+SENSITIVE_CONFIG_KEYS = ["password", "secret", "token", "key", "pwd"]
+
+
+def encrypt_connection_config(config: dict | None) -> dict | None:
+    if config is None:
+        return None
+    encrypted_config = {}
+    for key, value in config.items():
+        if any(sk in key.lower() for sk in SENSITIVE_CONFIG_KEYS) and isinstance(value, str) and value:
+            encrypted_config[key] = encrypt_data(value)
+        else:
+            encrypted_config[key] = value 
+    return encrypted_config
+
+
+def decrypt_connection_config(config: dict | None) -> dict | None:
+    if config is None:
+        return None
+    decrypted_config = {}
+    for key, value in config.items():
+        if any(sk in key.lower() for sk in SENSITIVE_CONFIG_KEYS) and isinstance(value, str):
+            try:
+                if value.startswith('gAAAAA'):
+                    decrypted_config[key] = decrypt_data(value)
+                else:
+                     decrypted_config[key] = value 
+            except ValueError:
+                decrypted_config[key] = "DECRYPTION_FAILED"
+        else:
+            decrypted_config[key] = value
+    return decrypted_config
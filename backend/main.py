@@ -9,6 +9,11 @@ import models
 
 from services.nlp import nlp_service
 from services.query import query_service
+from services.jobs import job_manager
+from services.scheduler import sync_scheduler, SCHEDULER_ENABLED
+from services.engine_pool import engine_pool
+from services.deletion import resume_pending_deletions
+from services.ingestion import recover_interrupted_imports
 
 from routers import (
     user, 
@@ -21,6 +26,7 @@ from routers import (
     warehouse, 
     warehouse, 
     stock_movement,
+    stock_snapshot,
     dashboard
 )
 
@@ -56,6 +62,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Keyset pagination of the product / movement lists
 )
 
 class ConnectionManager:
@@ -146,6 +153,23 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
          manager.disconnect(websocket)
          await websocket.close(code=1011) 
 
+@app.on_event("startup")
+async def start_background_services():
+    db = get_session()
+    try:
+        resume_pending_deletions(db)
+        recover_interrupted_imports(db)
+    finally:
+        db.close()
+    if SCHEDULER_ENABLED:
+        sync_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_background_jobs():
+    await sync_scheduler.stop()
+    job_manager.shutdown()
+    engine_pool.dispose_all()
+
 app.include_router(auth.router)
 app.include_router(user.router)
 app.include_router(tenant.router)
@@ -155,6 +179,7 @@ app.include_router(category.router)
 app.include_router(supplier.router)
 app.include_router(warehouse.router)
 app.include_router(stock_movement.router)
+app.include_router(stock_snapshot.router)
 app.include_router(dashboard.router)
 
 @app.get("/", tags=["Default"])
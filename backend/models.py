@@ -1,8 +1,8 @@
 # models.py
 import uuid
 from sqlalchemy import (
-    Column, String, DateTime, func, ForeignKey, JSON, Enum as SQLAlchemyEnum,
-    Boolean, Integer, Text, Index, UniqueConstraint, DECIMAL, text
+    Column, String, Date, DateTime, func, ForeignKey, JSON, Enum as SQLAlchemyEnum,
+    Boolean, Integer, BigInteger, Text, Index, UniqueConstraint, DECIMAL, text, event, DDL
 )
 from sqlalchemy.dialects.postgresql import UUID
 # from sqlalchemy_utils import LtreeType <--- Removed
@@ -154,6 +154,17 @@ class Supplier(Base):
 
 
 
+def product_search_document(name, description):
+    """
+    Document plein texte d'un produit (nom + description). Une description absente ne doit pas
+    rendre tout le document NULL ; les requêtes doivent reprendre exactement cette expression pour
+    utiliser l'index GIN.
+    """
+    return func.to_tsvector(
+        text("'french'"), func.coalesce(name, text("''")) + text("' '") + func.coalesce(description, text("''"))
+    )
+
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -186,9 +197,11 @@ class Product(Base):
 
     __table_args__ = (
         UniqueConstraint('tenant_id', 'sku', name='uq_product_sku'),
+        # Listing order and keyset pagination key of GET /api/v1/products
+        Index('ix_products_tenant_name_id', tenant_id, name, id),
         Index(
-            'ix_products_name_description_tsv', 
-            func.to_tsvector(text("'french'"), name + ' ' + description), 
+            'ix_products_search_tsv',
+            product_search_document(name, description),
             postgresql_using='gin'
         ),
         {'extend_existing': True}
@@ -223,10 +236,120 @@ class StockMovement(Base):
     __table_args__ = (
         Index('ix_stock_movements_tenant_timestamp_desc', tenant_id, timestamp.desc()),
         Index('ix_stock_movements_product_timestamp_desc', product_id, timestamp.desc()),
+        # Movement listing of one warehouse, newest first (keyset pagination)
+        Index('ix_stock_movements_warehouse_timestamp_desc', warehouse_id, timestamp.desc()),
+        {'extend_existing': True}
+    )
+
+
+
+# Trigram index for typo-tolerant search, only where the pg_trgm extension can be installed.
+PRODUCT_TRIGRAM_INDEX = """
+DO $$ BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops);
+    END IF;
+END $$;
+"""
+event.listen(Product.__table__, "after_create", DDL(PRODUCT_TRIGRAM_INDEX))
+
+
+# Stands for "no warehouse" in the unique key of product_stock (NULLs never conflict).
+NO_WAREHOUSE = "00000000-0000-0000-0000-000000000000"
+
+
+class ProductStock(Base):
+    """
+    Stock courant par produit et entrepôt, tenu à jour par des triggers sur stock_movements
+    (un upsert agrégé par instruction : chemin ORM, COPY des imports, suppressions par lots).
+    Évite de sommer tout l'historique des mouvements à chaque lecture du stock.
+    """
+    __tablename__ = "product_stock"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False, index=True)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    warehouse_id = Column(UUID(as_uuid=True), ForeignKey("warehouses.id", ondelete="CASCADE"), nullable=True, index=True)
+    on_hand = Column(BigInteger, nullable=False, default=0)
+    last_movement_at = Column(DateTime(timezone=True))
+
+    product = relationship("Product")
+    warehouse = relationship("Warehouse")
+
+    __table_args__ = (
+        Index(
+            'uq_product_stock_product_warehouse',
+            product_id, func.coalesce(warehouse_id, text(f"'{NO_WAREHOUSE}'::uuid")),
+            unique=True
+        ),
+        # Stock of one warehouse (chat, product filters) and per-warehouse totals as index-only range scans
+        Index(
+            'ix_product_stock_tenant_warehouse', tenant_id, warehouse_id, product_id,
+            postgresql_include=['on_hand']
+        ),
         {'extend_existing': True}
     )
 
 
+PRODUCT_STOCK_KEY = f"COALESCE(warehouse_id, '{NO_WAREHOUSE}'::uuid)"
+
+_ADD_MOVEMENTS = f"""
+    INSERT INTO product_stock (tenant_id, product_id, warehouse_id, on_hand, last_movement_at)
+    SELECT tenant_id, product_id, warehouse_id, SUM(quantity), MAX("timestamp")
+    FROM new_rows GROUP BY tenant_id, product_id, warehouse_id
+    ON CONFLICT (product_id, ({PRODUCT_STOCK_KEY})) DO UPDATE
+    SET on_hand = product_stock.on_hand + EXCLUDED.on_hand,
+        last_movement_at = GREATEST(product_stock.last_movement_at, EXCLUDED.last_movement_at);
+"""
+
+# Cascaded product deletions also remove the product_stock rows: only rows that still exist are updated.
+_REMOVE_MOVEMENTS = f"""
+    UPDATE product_stock ps SET on_hand = ps.on_hand - d.quantity
+    FROM (
+        SELECT product_id, {PRODUCT_STOCK_KEY} AS warehouse_key, SUM(quantity) AS quantity
+        FROM old_rows GROUP BY 1, 2
+    ) d
+    WHERE ps.product_id = d.product_id AND COALESCE(ps.warehouse_id, '{NO_WAREHOUSE}'::uuid) = d.warehouse_key;
+"""
+
+# Statement-level triggers with transition tables: one aggregated statement per INSERT/UPDATE/DELETE
+# on stock_movements, whatever its row count (ORM path, COPY of the imports, batched deletions).
+PRODUCT_STOCK_TRIGGERS = f"""
+CREATE OR REPLACE FUNCTION product_stock_insert() RETURNS trigger AS $$
+BEGIN {_ADD_MOVEMENTS} RETURN NULL; END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION product_stock_delete() RETURNS trigger AS $$
+BEGIN {_REMOVE_MOVEMENTS} RETURN NULL; END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION product_stock_update() RETURNS trigger AS $$
+BEGIN {_REMOVE_MOVEMENTS} {_ADD_MOVEMENTS} RETURN NULL; END $$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_product_stock_insert ON stock_movements;
+CREATE TRIGGER trg_product_stock_insert AFTER INSERT ON stock_movements
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION product_stock_insert();
+
+DROP TRIGGER IF EXISTS trg_product_stock_delete ON stock_movements;
+CREATE TRIGGER trg_product_stock_delete AFTER DELETE ON stock_movements
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION product_stock_delete();
+
+DROP TRIGGER IF EXISTS trg_product_stock_update ON stock_movements;
+CREATE TRIGGER trg_product_stock_update AFTER UPDATE ON stock_movements
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION product_stock_update();
+"""
+
+# Rebuilds product_stock from the full history (creation backfill, scripts/rebuild_product_stock.py).
+PRODUCT_STOCK_REBUILD = """
+INSERT INTO product_stock (tenant_id, product_id, warehouse_id, on_hand, last_movement_at)
+SELECT tenant_id, product_id, warehouse_id, SUM(quantity), MAX("timestamp")
+FROM stock_movements {where} GROUP BY tenant_id, product_id, warehouse_id
+"""
+
+# Created by create_all on a database that already has movements: triggers first, then backfill.
+# The triggers live on stock_movements, which must therefore exist first.
+ProductStock.__table__.add_is_dependent_on(StockMovement.__table__)
+event.listen(ProductStock.__table__, "after_create", DDL(PRODUCT_STOCK_TRIGGERS))
+event.listen(ProductStock.__table__, "after_create", DDL(PRODUCT_STOCK_REBUILD.format(where="")))
 
 
 # --- DataSource Model (Existing) ---
@@ -250,4 +373,288 @@ class DataSource(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # --- Relationships ---
-    tenant = relationship("Tenant", back_populates="data_sources")
\ No newline at end of file
+    tenant = relationship("Tenant", back_populates="data_sources")
+
+
+class StockMovementDaily(Base):
+    """
+    Cumul journalier des mouvements par (produit, entrepôt, jour UTC, type de mouvement), tenu à jour
+    par des triggers sur stock_movements comme product_stock. Les tendances sur des mois ou des années
+    lisent quelques milliers de lignes au lieu de tout l'historique.
+    """
+    __tablename__ = "stock_movement_daily"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    warehouse_id = Column(UUID(as_uuid=True), ForeignKey("warehouses.id", ondelete="CASCADE"), nullable=True)
+    day = Column(Date, nullable=False)
+    movement_type = Column(String(20), nullable=False)
+    # Entries (positive quantities) and exits (negative quantities, stored as positive numbers)
+    quantity_in = Column(BigInteger, nullable=False, default=0)
+    quantity_out = Column(BigInteger, nullable=False, default=0)
+    movement_count = Column(Integer, nullable=False, default=0)
+
+    product = relationship("Product")
+    warehouse = relationship("Warehouse")
+
+    __table_args__ = (
+        Index(
+            'uq_stock_movement_daily_key',
+            product_id, func.coalesce(warehouse_id, text(f"'{NO_WAREHOUSE}'::uuid")), day, movement_type,
+            unique=True
+        ),
+        # Covering: tenant-wide trends are index-only scans
+        Index(
+            'ix_stock_movement_daily_tenant_day', tenant_id, day,
+            postgresql_include=['quantity_in', 'quantity_out', 'product_id']
+        ),
+        {'extend_existing': True}
+    )
+
+
+MOVEMENT_DAY = """("timestamp" AT TIME ZONE 'UTC')::date"""
+
+_DAILY_TOTALS = f"""
+    SELECT tenant_id, product_id, warehouse_id, {PRODUCT_STOCK_KEY} AS warehouse_key,
+           {MOVEMENT_DAY} AS day, movement_type,
+           SUM(GREATEST(quantity, 0)) AS quantity_in, SUM(GREATEST(-quantity, 0)) AS quantity_out,
+           COUNT(*) AS movement_count
+    FROM {{rows}} GROUP BY 1, 2, 3, 4, 5, 6
+"""
+
+_ADD_DAILY = f"""
+    INSERT INTO stock_movement_daily (tenant_id, product_id, warehouse_id, day, movement_type,
+                                      quantity_in, quantity_out, movement_count)
+    SELECT tenant_id, product_id, warehouse_id, day, movement_type, quantity_in, quantity_out, movement_count
+    FROM ({_DAILY_TOTALS.format(rows="new_rows")}) t
+    ON CONFLICT (product_id, ({PRODUCT_STOCK_KEY}), day, movement_type) DO UPDATE
+    SET quantity_in = stock_movement_daily.quantity_in + EXCLUDED.quantity_in,
+        quantity_out = stock_movement_daily.quantity_out + EXCLUDED.quantity_out,
+        movement_count = stock_movement_daily.movement_count + EXCLUDED.movement_count;
+"""
+
+# Days left without any movement are removed, so that the rollup equals a GROUP BY of the movements.
+# They are deleted by id as returned by the UPDATE: joining old_rows again (no statistics, estimated
+# at a few rows) with "movement_count <= 0" made the planner pick a nested loop, quadratic when a
+# whole import is deleted.
+_REMOVE_DAILY = f"""
+    WITH changed AS (
+        UPDATE stock_movement_daily d
+        SET quantity_in = d.quantity_in - t.quantity_in,
+            quantity_out = d.quantity_out - t.quantity_out,
+            movement_count = d.movement_count - t.movement_count
+        FROM ({_DAILY_TOTALS.format(rows="old_rows")}) t
+        WHERE d.product_id = t.product_id AND COALESCE(d.warehouse_id, '{NO_WAREHOUSE}'::uuid) = t.warehouse_key
+          AND d.day = t.day AND d.movement_type = t.movement_type
+        RETURNING d.id, d.movement_count
+    )
+    SELECT array_agg(id) INTO emptied FROM changed WHERE movement_count <= 0;
+    DELETE FROM stock_movement_daily WHERE id = ANY(emptied);
+"""
+
+STOCK_MOVEMENT_DAILY_TRIGGERS = f"""
+CREATE OR REPLACE FUNCTION stock_movement_daily_insert() RETURNS trigger AS $$
+BEGIN {_ADD_DAILY} RETURN NULL; END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION stock_movement_daily_delete() RETURNS trigger AS $$
+DECLARE emptied uuid[];
+BEGIN {_REMOVE_DAILY} RETURN NULL; END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION stock_movement_daily_update() RETURNS trigger AS $$
+DECLARE emptied uuid[];
+BEGIN {_REMOVE_DAILY} {_ADD_DAILY} RETURN NULL; END $$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_stock_movement_daily_insert ON stock_movements;
+CREATE TRIGGER trg_stock_movement_daily_insert AFTER INSERT ON stock_movements
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stock_movement_daily_insert();
+
+DROP TRIGGER IF EXISTS trg_stock_movement_daily_delete ON stock_movements;
+CREATE TRIGGER trg_stock_movement_daily_delete AFTER DELETE ON stock_movements
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION stock_movement_daily_delete();
+
+DROP TRIGGER IF EXISTS trg_stock_movement_daily_update ON stock_movements;
+CREATE TRIGGER trg_stock_movement_daily_update AFTER UPDATE ON stock_movements
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stock_movement_daily_update();
+"""
+
+# Rebuilds the rollup from the full history (creation backfill, scripts/rebuild_movement_daily.py).
+STOCK_MOVEMENT_DAILY_REBUILD = f"""
+INSERT INTO stock_movement_daily (tenant_id, product_id, warehouse_id, day, movement_type,
+                                  quantity_in, quantity_out, movement_count)
+SELECT tenant_id, product_id, warehouse_id, day, movement_type, quantity_in, quantity_out, movement_count
+FROM ({_DAILY_TOTALS.format(rows="stock_movements {where}")}) t
+"""
+
+# Same creation order as product_stock: triggers on stock_movements first, then backfill.
+StockMovementDaily.__table__.add_is_dependent_on(StockMovement.__table__)
+event.listen(StockMovementDaily.__table__, "after_create", DDL(STOCK_MOVEMENT_DAILY_TRIGGERS))
+event.listen(StockMovementDaily.__table__, "after_create", DDL(STOCK_MOVEMENT_DAILY_REBUILD.format(where="")))
+
+
+class StockSnapshotRun(Base):
+    """Point de contrôle du stock d'un tenant (ex: fin de mois) : les lignes sont dans stock_snapshots."""
+    __tablename__ = "stock_snapshot_runs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    # Stock on hand just before this instant (movements with timestamp < as_of)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    products = Column(Integer, nullable=False, default=0)
+    taken_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'as_of', name='uq_stock_snapshot_run'),
+        {'extend_existing': True}
+    )
+
+
+class StockSnapshot(Base):
+    """
+    Stock d'un produit (par entrepôt) à un point de contrôle. Le stock à une date quelconque est le
+    point de contrôle précédent plus les mouvements de l'intervalle, sans relire tout l'historique.
+    Les mouvements antidatés (avant un point existant) corrigent les points suivants par trigger.
+    """
+    __tablename__ = "stock_snapshots"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    warehouse_id = Column(UUID(as_uuid=True), ForeignKey("warehouses.id", ondelete="CASCADE"), nullable=True)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    on_hand = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        Index(
+            'uq_stock_snapshot_key',
+            product_id, func.coalesce(warehouse_id, text(f"'{NO_WAREHOUSE}'::uuid")), as_of,
+            unique=True
+        ),
+        Index('ix_stock_snapshots_tenant_as_of', tenant_id, as_of),
+        {'extend_existing': True}
+    )
+
+
+# A movement dated before existing checkpoints changes the stock of each of them. Movements removed by a
+# product deletion are skipped (the product, hence its snapshots, is already gone when the trigger runs).
+_SNAPSHOT_APPLY = f"""
+    INSERT INTO stock_snapshots (tenant_id, product_id, warehouse_id, as_of, on_hand)
+    SELECT m.tenant_id, m.product_id, m.warehouse_id, r.as_of, {{sign}} SUM(m.quantity)
+    FROM {{rows}} m
+    JOIN products p ON p.id = m.product_id
+    JOIN stock_snapshot_runs r ON r.tenant_id = m.tenant_id AND r.as_of > m."timestamp"
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (product_id, ({PRODUCT_STOCK_KEY}), as_of) DO UPDATE
+    SET on_hand = stock_snapshots.on_hand + EXCLUDED.on_hand;
+"""
+_SNAPSHOT_ADD = _SNAPSHOT_APPLY.format(sign="", rows="new_rows")
+_SNAPSHOT_REMOVE = _SNAPSHOT_APPLY.format(sign="-", rows="old_rows")
+
+STOCK_SNAPSHOT_TRIGGERS = f"""
+CREATE OR REPLACE FUNCTION stock_snapshot_insert() RETURNS trigger AS $$
+BEGIN {_SNAPSHOT_ADD} RETURN NULL; END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION stock_snapshot_delete() RETURNS trigger AS $$
+BEGIN {_SNAPSHOT_REMOVE} RETURN NULL; END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION stock_snapshot_update() RETURNS trigger AS $$
+BEGIN {_SNAPSHOT_REMOVE} {_SNAPSHOT_ADD} RETURN NULL; END $$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_stock_snapshot_insert ON stock_movements;
+CREATE TRIGGER trg_stock_snapshot_insert AFTER INSERT ON stock_movements
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stock_snapshot_insert();
+
+DROP TRIGGER IF EXISTS trg_stock_snapshot_delete ON stock_movements;
+CREATE TRIGGER trg_stock_snapshot_delete AFTER DELETE ON stock_movements
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION stock_snapshot_delete();
+
+DROP TRIGGER IF EXISTS trg_stock_snapshot_update ON stock_movements;
+CREATE TRIGGER trg_stock_snapshot_update AFTER UPDATE ON stock_movements
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stock_snapshot_update();
+"""
+
+StockSnapshot.__table__.add_is_dependent_on(StockMovement.__table__)
+StockSnapshot.__table__.add_is_dependent_on(StockSnapshotRun.__table__)
+event.listen(StockSnapshot.__table__, "after_create", DDL(STOCK_SNAPSHOT_TRIGGERS))
+
+
+class TenantDataVersion(Base):
+    """
+    Version des données d'un tenant, incrémentée une fois par transaction, à sa validation, dès qu'elle
+    a écrit sur ses produits, mouvements, catégories, fournisseurs, entrepôts ou sources (imports,
+    synchronisations, API). Sert à invalider les réponses mises en cache par le chat.
+    """
+    __tablename__ = "tenant_data_versions"
+    __table_args__ = {'extend_existing': True}
+
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TenantDataChange(Base):
+    """
+    Tenants modifiés par les transactions en cours, une ligne par (tenant, transaction) : écrite par les
+    triggers d'instruction, consommée à la validation (la ligne ne survit jamais à sa transaction).
+    """
+    __tablename__ = "tenant_data_changes"
+    # Rows never outlive their transaction: nothing to recover after a crash
+    __table_args__ = {'extend_existing': True, 'prefixes': ['UNLOGGED']}
+
+    tenant_id = Column(UUID(as_uuid=True), primary_key=True)
+    transaction_id = Column(BigInteger, primary_key=True)
+
+
+DATA_VERSION_TABLES = ("products", "stock_movements", "categories", "suppliers", "warehouses", "data_sources")
+
+# Statements only mark the tenant as changed by their transaction: the key includes the transaction
+# id, so concurrent writers never wait on each other (a shared per-tenant row would stay locked from
+# the first write to the commit).
+_MARK_DATA_CHANGE = """
+    INSERT INTO tenant_data_changes (tenant_id, transaction_id)
+    SELECT DISTINCT tenant_id, txid_current() FROM {rows}
+    ON CONFLICT DO NOTHING;
+"""
+
+# Deferred: runs once per (tenant, transaction) at commit, so the version row is locked only while
+# the transaction commits. Tenants deleted by the transaction are skipped (cascade from tenants).
+DATA_VERSION_TRIGGERS = f"""
+CREATE OR REPLACE FUNCTION bump_data_version_new() RETURNS trigger AS $$
+BEGIN {_MARK_DATA_CHANGE.format(rows="new_rows")} RETURN NULL; END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_data_version_old() RETURNS trigger AS $$
+BEGIN {_MARK_DATA_CHANGE.format(rows="old_rows")} RETURN NULL; END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION commit_data_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO tenant_data_versions (tenant_id, version, updated_at)
+    SELECT t.id, 1, now() FROM tenants t WHERE t.id = NEW.tenant_id
+    ON CONFLICT (tenant_id) DO UPDATE
+    SET version = tenant_data_versions.version + 1, updated_at = EXCLUDED.updated_at;
+    DELETE FROM tenant_data_changes WHERE tenant_id = NEW.tenant_id AND transaction_id = NEW.transaction_id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_commit_data_version ON tenant_data_changes;
+CREATE CONSTRAINT TRIGGER trg_commit_data_version AFTER INSERT ON tenant_data_changes
+    DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION commit_data_version();
+""" + "".join(f"""
+DROP TRIGGER IF EXISTS trg_data_version_insert ON {table};
+CREATE TRIGGER trg_data_version_insert AFTER INSERT ON {table}
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version_new();
+
+DROP TRIGGER IF EXISTS trg_data_version_update ON {table};
+CREATE TRIGGER trg_data_version_update AFTER UPDATE ON {table}
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version_new();
+
+DROP TRIGGER IF EXISTS trg_data_version_delete ON {table};
+CREATE TRIGGER trg_data_version_delete AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version_old();
+""" for table in DATA_VERSION_TABLES)
+
+# Created with tenant_data_changes, which is new on existing databases: create_all replaces the
+# per-statement bump of earlier versions.
+for _model in (Product, StockMovement, Category, Supplier, Warehouse, DataSource, TenantDataVersion):
+    TenantDataChange.__table__.add_is_dependent_on(_model.__table__)
+event.listen(TenantDataChange.__table__, "after_create", DDL(DATA_VERSION_TRIGGERS))
+
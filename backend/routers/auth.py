@@ -1,5 +1,5 @@
 # routers/auth.py
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query
 import uuid
 from fastapi.security import OAuth2PasswordRequestForm # Formulaire standard pour login
 from sqlalchemy.orm import Session
@@ -142,3 +142,15 @@ async def get_current_user_or_default(
     
     # Should not happen in seeded DB, but valid fallback
     raise HTTPException(status_code=401, detail="No default user found")
+
+async def get_current_user_for_stream(
+    token: str = Depends(oauth2_scheme_optional),
+    x_client_id: str | None = Header(default=None),
+    client_id: str | None = Query(default=None),
+    db: Session = Depends(get_db)
+) -> models.User:
+    """
+    Variante de get_current_user_or_default pour les flux SSE :
+    EventSource ne sait pas envoyer d'en-têtes, le client_id peut donc venir de la query string.
+    """
+    return await get_current_user_or_default(token=token, x_client_id=x_client_id or client_id, db=db)
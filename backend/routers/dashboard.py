@@ -5,6 +5,8 @@ from typing import Dict, Any, List
 from database import get_db
 from routers.auth import get_current_user_or_default
 import models
+from services.stock import stock_level_subquery, warehouse_totals
+from services.query import query_service, data_version
 
 router = APIRouter(
     prefix="/api/v1/dashboard",
@@ -25,13 +27,19 @@ def get_dashboard_stats(
     product_count = db.query(models.Product).filter_by(tenant_id=tenant_id).count()
     supplier_count = db.query(models.Supplier).filter_by(tenant_id=tenant_id).count()
     
-    # 2. Stock Value (approx)
-    # Sum of (quantity * unit_price) for all stock movements (snapshot) or just active products?
-    # Better to use the query logic: sum(stock_level * unit_price)
-    # But for speed, let's just sum (product.unit_price) for now or just return count.
-    # Let's do a proper calculation if possible, or just "N/A" if expensive.
-    # Simple calculation: Sum of Products priced * quantity (if we had a materialized view).
-    # For now, let's mock the value or do a simple count.
+    # 2. Stock Value, from the per-product stock table (no scan of the movements history)
+    stock = stock_level_subquery(db, tenant_id)
+    stock_level = func.coalesce(stock.c.current_stock, 0)
+    stock_value, out_of_stock_count = (
+        db.query(
+            func.coalesce(func.sum(stock_level * models.Product.unit_price), 0),
+            func.count().filter(stock_level <= 0)
+        )
+        .select_from(models.Product)
+        .outerjoin(stock, stock.c.product_id == models.Product.id)
+        .filter(models.Product.tenant_id == tenant_id)
+        .one()
+    )
     
     # 3. Data Sources
     data_sources = db.query(models.DataSource).filter_by(tenant_id=tenant_id).all()
@@ -48,14 +56,41 @@ def get_dashboard_stats(
         
     # 4. Warehouse/Categories
     category_count = db.query(models.Category).filter_by(tenant_id=tenant_id).count()
+    warehouse_count = db.query(models.Warehouse).filter_by(tenant_id=tenant_id).count()
 
     return {
         "global_stats": {
             "total_products": product_count,
             "total_suppliers": supplier_count,
             "total_categories": category_count,
+            "total_warehouses": warehouse_count,
+            "stock_value": float(stock_value),
+            "out_of_stock_products": out_of_stock_count,
             "connected_sources": len(data_sources)
         },
         "data_sources": sources_data,
         "recent_alerts": [] # Placeholder
     }
+
+@router.get("/warehouses")
+def get_warehouse_stock(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_or_default)
+) -> List[Dict[str, Any]]:
+    """
+    Stock par entrepôt (unités, références en stock / en rupture, valeur), agrégé sur product_stock
+    par l'index (tenant, entrepôt).
+    """
+    return warehouse_totals(db, current_user.tenant_id)
+
+@router.get("/query-cache")
+def get_query_cache_stats(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_or_default)
+) -> Dict[str, Any]:
+    """
+    Cache des réponses du chat : hits/misses du tenant, occupation globale et version des données.
+    """
+    stats = query_service.cache_stats(current_user.tenant_id)
+    stats["data_version"] = data_version(db, current_user.tenant_id)
+    return stats
@@ -1,51 +1,38 @@
 # routers/data_source.py
+import os
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response, Query
+from fastapi.responses import StreamingResponse, FileResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, create_engine
+from sqlalchemy import func
 from sqlalchemy.exc import OperationalError
 from typing import List 
 import json 
-from encryption import encrypt_data, decrypt_data 
+import asyncio
+from encryption import encrypt_connection_config, decrypt_connection_config
 import models, schemas
 from database import get_db
 import time
-from routers.auth import get_current_user, get_current_user_or_default
+from routers.auth import get_current_user, get_current_user_or_default, get_current_user_for_stream
+from services.ingestion import (
+    register_upload, run_upload_job, run_batch_job, run_reprocess_job, error_report_path,
+    UPLOAD_DUPLICATE, UPLOAD_DELTA
+)
+from services.sql_sync import run_sync_job
+from services.engine_pool import engine_pool
+from services.deletion import run_delete_job, mark_deleting, is_deleting, not_deleting
+from services.scheduler import sync_scheduler
+from services.parsing import SUPPORTED_EXTENSIONS
+from services.upload_store import store_upload
+from services.jobs import job_manager, Job
 
 router = APIRouter(
     prefix="/api/v1/datasources",
     tags=['Data Sources']
 )
 
-def encrypt_connection_config(config: dict | None) -> dict | None:
-    if config is None:
-        return None
-    encrypted_config = {}
-    sensitive_keys = ["password", "secret", "token", "key", "pwd"] 
-    for key, value in config.items():
-        if any(sk in key.lower() for sk in sensitive_keys) and isinstance(value, str) and value:
-            encrypted_config[key] = encrypt_data(value)
-        else:
-            encrypted_config[key] = value 
-    return encrypted_config
-
-def decrypt_connection_config(config: dict | None) -> dict | None:
-    if config is None:
-        return None
-    decrypted_config = {}
-    sensitive_keys = ["password", "secret", "token", "key", "pwd"]
-    for key, value in config.items():
-        if any(sk in key.lower() for sk in sensitive_keys) and isinstance(value, str):
-            try:
-                if value.startswith('gAAAAA'):
-                    decrypted_config[key] = decrypt_data(value)
-                else:
-                     decrypted_config[key] = value 
-            except ValueError:
-                decrypted_config[key] = "DECRYPTION_FAILED"
-        else:
-            decrypted_config[key] = value
-    return decrypted_config
+# Delay between two progress events on the SSE stream.
+JOB_EVENTS_INTERVAL_SECONDS = 0.5
 
 @router.post("/{ds_id}/validate", response_model=schemas.DataSourceOut)
 async def validate_data_source_connection(
@@ -87,20 +74,10 @@ async def validate_data_source_connection(
     if config_to_test:
         try:
             if db_data_source.type == models.DataSourceType.SQL_CONNECTOR:
-                db_user = config_to_test.get("username")
-                db_password = config_to_test.get("password")
-                db_host = config_to_test.get("host")
-                db_port = config_to_test.get("port", 5432) 
-                db_name = config_to_test.get("database")
-
-                if not all([db_user, db_password, db_host, db_name]):
-                    raise ValueError("Missing required connection details (username, password, host, database).")
-
-                connection_url = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-                temp_engine = create_engine(connection_url, connect_args={'connect_timeout': 5}) 
-                with temp_engine.connect() as connection:
+                # Warm engine from the registry: no decryption nor handshake on repeated validations
+                engine = engine_pool.get(db_data_source)
+                with engine.connect() as connection:
                     connection_successful = True
-                temp_engine.dispose() 
 
             elif db_data_source.type == models.DataSourceType.FILE_UPLOAD:
                 connection_successful = True 
@@ -108,6 +85,7 @@ async def validate_data_source_connection(
                 error_message = f"Validation not implemented for type '{db_data_source.type.value}'."
 
         except OperationalError as e:
+            engine_pool.invalidate(ds_id)
             error_message = f"Connection failed: {e.orig}" 
         except ValueError as e: 
              error_message = f"Configuration error: {e}"
@@ -204,6 +182,8 @@ async def update_data_source(
 
     for key, value in update_data.items():
         setattr(db_data_source, key, value)
+    if "connection_config" in update_data:
+        engine_pool.invalidate(ds_id)
 
     # ... (try/except pour db.commit, db.refresh) ...
     try:
@@ -225,7 +205,7 @@ async def list_data_sources(db: Session = Depends(get_db), current_user: models.
     Nécessite une authentification valide (ou fallback dev).
     """
     data_sources = db.query(models.DataSource)\
-        .filter(models.DataSource.tenant_id == current_user.tenant_id)\
+        .filter(models.DataSource.tenant_id == current_user.tenant_id, not_deleting())\
         .order_by(models.DataSource.created_at.desc())\
         .all()
     return data_sources
@@ -254,6 +234,30 @@ async def get_data_source(
         )
     return data_source
 
+@router.get("/{ds_id}/errors")
+async def download_error_report(
+    ds_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_for_stream)
+):
+    """
+    Download the full report (CSV: source, row, sku, error) of the rows rejected
+    by the last import of a data source.
+    Also accepts ?client_id= so that it can be opened as a plain browser link.
+    """
+    db_data_source = db.query(models.DataSource).filter(
+        models.DataSource.id == ds_id,
+        models.DataSource.tenant_id == current_user.tenant_id
+    ).first()
+
+    path = error_report_path(ds_id)
+    if db_data_source is None or not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No error report for data source {ds_id}."
+        )
+    return FileResponse(path, media_type="text/csv", filename=f"{db_data_source.name}.errors.csv")
+
 @router.put("/{ds_id}", response_model=schemas.DataSourceOut)
 async def update_data_source(
     ds_id: uuid.UUID,
@@ -288,6 +292,8 @@ async def update_data_source(
     # Mettre à jour les champs fournis dans l'objet SQLAlchemy
     for key, value in update_data.items():
         setattr(db_data_source, key, value)
+    if "connection_config" in update_data:
+        engine_pool.invalidate(ds_id)
 
     try:
         db.commit()
@@ -302,14 +308,15 @@ async def update_data_source(
 
     return db_data_source
 
-@router.delete("/{ds_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{ds_id}", status_code=status.HTTP_202_ACCEPTED)
 async def delete_data_source(
     ds_id: uuid.UUID,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user_or_default)
 ):
     """
-    Supprime une source de données et le fichier associé si c'est un upload.
+    Marque la source comme en cours de suppression et rend la main immédiatement ;
+    ses mouvements, produits et fichiers sont supprimés par lots dans un job d'arrière-plan.
     """
     db_data_source = db.query(models.DataSource).filter(
         models.DataSource.id == ds_id,
@@ -321,30 +328,14 @@ async def delete_data_source(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Data source with id {ds_id} not found."
         )
-
-    # If it's a file upload, delete the file from disk
-    if db_data_source.type == models.DataSourceType.FILE_UPLOAD:
-        config = db_data_source.connection_config
-        if config and "file_path" in config:
-            import os
-            file_path = config["file_path"]
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    print(f"DEBUG: Deleted file {file_path}")
-                except Exception as e:
-                    print(f"DEBUG: Error deleting file {file_path}: {e}")
+    if is_deleting(db_data_source):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Data source '{db_data_source.name}' is already being deleted."
+        )
 
     try:
-        # Delete associated products (and their stock movements via cascade)
-        # We use synchronize_session=False for bulk delete performance
-        deleted_products = db.query(models.Product).filter(
-            models.Product.data_source_id == ds_id
-        ).delete(synchronize_session=False)
-        
-        print(f"DEBUG: Deleted {deleted_products} products associated with source {ds_id}")
-
-        db.delete(db_data_source)
+        mark_deleting(db_data_source)
         db.commit()
     except Exception as e:
         db.rollback()
@@ -352,212 +343,263 @@ async def delete_data_source(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Could not delete data source: {e}"
         )
-    
-    return None
 
-@router.post("/upload", status_code=status.HTTP_201_CREATED)
+    engine_pool.invalidate(ds_id)
+    job = job_manager.submit("delete", current_user.tenant_id, ds_id, run_delete_job, ds_id)
+    return {
+        "message": f"Deleting '{db_data_source.name}'.",
+        "data_source_id": str(ds_id),
+        "job_id": job.id
+    }
+
+@router.post("/upload", status_code=status.HTTP_202_ACCEPTED)
 async def upload_file(
+    response: Response,
     file: UploadFile = File(...),
+    delta: bool = Query(True, description="Re-import a new version of an already imported file as a delta"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user_or_default)
 ):
     """
     Upload a file (Excel or CSV) to ingest data.
-    Parses the file and creates/updates Products and StockMovements.
+    The upload is hashed (SHA-256) and stored compressed under its content hash,
+    then a background ingestion job is queued; the response returns the job id
+    immediately. Follow the job with GET /jobs/{job_id} (polling) or
+    GET /jobs/{job_id}/events (SSE).
+    If the tenant already imported the exact same bytes, nothing is parsed or
+    written: the existing data source is returned with `duplicate: true`.
+    If it uploads a new version of a file it imported before (same name), only
+    the difference with the previous archive is written (`delta: true`).
     """
     print(f"DEBUG: Received file upload request: {file.filename}")
-    
-    # DEV HACK REMOVED: Now using actual authenticated user.
-            
-    try:
-        import pandas as pd
-        import io
-        print("DEBUG: pandas imported successfully.")
-    except ImportError as e:
-        print(f"DEBUG: ImportError - {e}")
-        raise HTTPException(status_code=500, detail="Server misconfiguration: pandas not installed.")
-
-    # 1. Read file content
-    try:
-        contents = await file.read()
-        filename = file.filename.lower()
-        print(f"DEBUG: Read {len(contents)} bytes from {filename}")
-    except Exception as e:
-        print(f"DEBUG: Error reading file: {e}")
-        raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
-
-    # 2. Save file to disk immediately to ensure we have a record
-    import os
-    upload_dir = "uploads"
-    if not os.path.exists(upload_dir):
-        os.makedirs(upload_dir)
-        
-    file_path = os.path.join(upload_dir, f"{uuid.uuid4()}_{filename}")
+
+    filename = file.filename.lower()
+    if not filename.endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Invalid file format.")
+
+    # Store file (hashed + compressed) immediately to ensure we have a record
     try:
-        with open(file_path, "wb") as f:
-            f.write(contents)
-        print(f"DEBUG: Saved file to {file_path}")
+        stored = await store_upload(file)
+        print(f"DEBUG: Stored {stored.size} bytes from {filename} as {stored.path}")
     except Exception as e:
         print(f"DEBUG: Error saving file: {e}")
         raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
 
-    # 3. Parse Data
-    # 3. Parse Data Helpers
-    import pandas as pd
-    import io
-
-    # Create DataSource Record FIRST
     try:
-        new_ds = models.DataSource(
-            name=filename,
-            type=models.DataSourceType.FILE_UPLOAD,
-            connection_config={"file_path": file_path, "original_name": filename},
-            tenant_id=current_user.tenant_id,
-            status=models.DataSourceStatus.PENDING,
-            last_sync_at=func.now()
-        )
-        db.add(new_ds)
-        db.flush() # Get ID
-        
-        # 3. Parse Data
-        df = None
-        if filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
-        elif filename.endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(io.BytesIO(contents))
-        else:
-            # Should normally be caught earlier but safe check
-            # No need to remove file, it's linked to new_ds
-            raise HTTPException(status_code=400, detail="Invalid file format.")
-            
-        # Process Content if CSV/Excel
-        ingest_status = "COMPLETED"
-        processed_count = 0
-        errors = []
-
-        if df is not None:
-             # Standardize columns
-            df.columns = [str(col).lower().strip() for col in df.columns]
-            
-            # Use specific mapping
-            column_mapping = {
-                'product': 'name', 'product name': 'name', 'nom produit': 'name', 'nom': 'name', 'designation': 'name', 'libelle': 'name', 'product_name': 'name',
-                'sku': 'sku', 'ref': 'sku', 'reference': 'sku', 'code': 'sku', 'product_id': 'sku',
-                'category': 'category', 'catégorie': 'category', 'famille': 'category',
-                'quantity': 'quantity', 'qty': 'quantity', 'quantité': 'quantity', 'stock': 'quantity', 'qte': 'quantity', 'stock reel': 'quantity', 'quantity_in_stock': 'quantity',
-                'price': 'unit_price', 'prix': 'unit_price', 'unit price': 'unit_price', 'prix unitaire': 'unit_price', 'pamp': 'cost_price', 'coût': 'cost_price', 'cost': 'cost_price',
-                'supplier': 'supplier_name', 'fournisseur': 'supplier_name'
-            }
-            
-            # Rename columns based on mapping
-            # This logic is simplified; a robust one would check existence
-            # Let's map whatever we find
-            found_mapping = {}
-            for col in df.columns:
-                 if col in column_mapping:
-                     found_mapping[col] = column_mapping[col]
-            df.rename(columns=found_mapping, inplace=True)
-
-            for index, row in df.iterrows():
-                try:
-                    product_name = row.get('name')
-                    sku = row.get('sku')
-                    if pd.isna(sku) and pd.isna(product_name):
-                        continue
-                        
-                    if pd.isna(sku):
-                        continue # strict about SKU
-
-                    # Ensure Category
-                    category_name = row.get('category', 'General')
-                    if pd.isna(category_name): category_name = 'General'
-                    
-                    category = db.query(models.Category).filter(
-                        models.Category.name == str(category_name),
-                        models.Category.tenant_id == current_user.tenant_id
-                    ).first()
-                    
-                    if not category:
-                        category = models.Category(name=str(category_name), tenant_id=current_user.tenant_id)
-                        db.add(category)
-                        db.flush()
-
-                    # Ensure Supplier (if present)
-                    supplier_id = None
-                    supplier_name = row.get('supplier_name')
-                    if not pd.isna(supplier_name):
-                        supplier = db.query(models.Supplier).filter(models.Supplier.name == str(supplier_name), models.Supplier.tenant_id == current_user.tenant_id).first()
-                        if not supplier:
-                            supplier = models.Supplier(name=str(supplier_name), tenant_id=current_user.tenant_id)
-                            db.add(supplier)
-                            db.flush()
-                        supplier_id = supplier.id
-
-                    # Create/Update Product
-                    product = db.query(models.Product).filter(
-                        models.Product.sku == str(sku),
-                        models.Product.tenant_id == current_user.tenant_id
-                    ).first()
-                    
-                    price = row.get('unit_price')
-                    cost = row.get('cost_price')
-                    
-                    if not product:
-                        product = models.Product(
-                            sku=str(sku),
-                            name=str(product_name) if not pd.isna(product_name) else f"Product {sku}",
-                            category_id=category.id,
-                            unit_price=float(price) if not pd.isna(price) else 0.0,
-                            cost_price=float(cost) if not pd.isna(cost) else 0.0,
-                            supplier_id=supplier_id,
-                            tenant_id=current_user.tenant_id,
-                            data_source_id=new_ds.id # LINKED VIA CASCADE
-                        )
-                        db.add(product)
-                        db.flush() # Need ID for movement
-                    else:
-                        # Update fields and link to NEW source if relevant? 
-                        # Usually we don't overwrite source ID if it already exists, or we do?
-                        # If user wants "Delete source -> Delete data", overwriting source ID implies only oldest source matters?
-                        # Or if we upload same product from Source B, should deleting Source B delete the product?
-                        # Complex. Let's assume Master Data.
-                        # For now, let's NOT overwrite data_source_id of existing products to prevent accidental cascades.
-                        pass
-
-                    # Stock Movement
-                    qty = row.get('quantity')
-                    if not pd.isna(qty):
-                        qty = int(qty)
-                        if qty > 0:
-                            mv = models.StockMovement(
-                                product_id=product.id,
-                                movement_type="INBOUND",
-                                quantity=qty,
-                                notes=f"Import via {filename}",
-                                user_id=current_user.id,
-                                tenant_id=current_user.tenant_id
-                            )
-                            db.add(mv)
-
-                    processed_count += 1
-                except Exception as inner_e:
-                     errors.append(f"Row {index}: {str(inner_e)}")
-
-        new_ds.status = models.DataSourceStatus.ACTIVE
-        new_ds.last_sync_status = "COMPLETED"
-        db.commit()
-        
+        mode, data_source = register_upload(db, current_user.tenant_id, stored, filename, delta=delta)
     except Exception as e:
-        db.rollback()
-        print(f"Upload failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Could not register data source: {e}")
+
+    if mode == UPLOAD_DUPLICATE:
+        response.status_code = status.HTTP_200_OK
+        return {
+            "message": f"File '{filename}' was already imported as '{data_source.name}'. Nothing to do.",
+            "data_source_id": str(data_source.id),
+            "job_id": None,
+            "duplicate": True
+        }
+
+    # Queue the ingestion (the job updates the data source status as it goes)
+    job = job_manager.submit(
+        "file_delta" if mode == UPLOAD_DELTA else "file_upload", current_user.tenant_id, data_source.id,
+        run_upload_job, mode, data_source.id, current_user.id, stored.path, filename
+    )
 
-    message = f"File '{filename}' processed. "
-    if processed_count > 0:
-        message += f"{processed_count} items."
-    
+    if mode == UPLOAD_DELTA:
+        message = f"New version of '{filename}' received. Delta import in progress."
+    else:
+        message = f"File '{filename}' received. Import in progress."
     return {
         "message": message,
-        "data_source_id": str(new_ds.id),
-        "errors": errors[:10]
-    }
\ No newline at end of file
+        "data_source_id": str(data_source.id),
+        "job_id": job.id,
+        "duplicate": False,
+        "delta": mode == UPLOAD_DELTA
+    }
+
+@router.post("/upload/batch", status_code=status.HTTP_202_ACCEPTED)
+async def upload_files(
+    files: List[UploadFile] = File(...),
+    all_sheets: bool = Query(True, description="Import every sheet of Excel workbooks, not only the first one"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_or_default)
+):
+    """
+    Upload several files (Excel or CSV) at once, optionally with all the sheets of
+    each workbook (e.g. one sheet per warehouse).
+    Each file gets its own data source; sheets and files are parsed in parallel
+    in a process pool and written by a single background job.
+    Files already imported with the exact same bytes are skipped (`duplicates`).
+    Follow the job with GET /jobs/{job_id} or GET /jobs/{job_id}/events.
+    """
+    print(f"DEBUG: Received batch upload request: {[f.filename for f in files]}")
+
+    for file in files:
+        if not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            raise HTTPException(status_code=400, detail=f"Invalid file format: {file.filename}")
+
+    uploads, duplicates = [], []
+    for file in files:
+        filename = file.filename.lower()
+        try:
+            stored = await store_upload(file)
+        except Exception as e:
+            print(f"DEBUG: Error saving file: {e}")
+            raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
+
+        # Batches are always full imports: no delta against previous versions
+        try:
+            mode, data_source = register_upload(db, current_user.tenant_id, stored, filename, delta=False)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Could not register data source: {e}")
+
+        if mode == UPLOAD_DUPLICATE:
+            duplicates.append({"filename": filename, "data_source_id": str(data_source.id)})
+        else:
+            uploads.append((data_source.id, stored.path, filename))
+
+    job = None
+    if uploads:
+        job = job_manager.submit(
+            "file_batch", current_user.tenant_id, uploads[0][0] if len(uploads) == 1 else None,
+            run_batch_job, current_user.tenant_id, current_user.id, uploads, all_sheets
+        )
+
+    return {
+        "message": f"{len(uploads)} file(s) received, {len(duplicates)} already imported.",
+        "data_source_ids": [str(ds_id) for ds_id, _, _ in uploads],
+        "duplicates": duplicates,
+        "job_id": job.id if job else None
+    }
+
+@router.post("/{ds_id}/reprocess", status_code=status.HTTP_202_ACCEPTED)
+async def reprocess_data_source(
+    ds_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_or_default)
+):
+    """
+    Rebuild the products and stock movements of an imported file from its columnar
+    archive (normalized rows, memory-mapped), without parsing the original file again.
+    Runs as a background job.
+    """
+    db_data_source = db.query(models.DataSource).filter(
+        models.DataSource.id == ds_id,
+        models.DataSource.tenant_id == current_user.tenant_id
+    ).first()
+
+    if db_data_source is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Data source with id {ds_id} not found."
+        )
+    if is_deleting(db_data_source):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Data source '{db_data_source.name}' is being deleted."
+        )
+    archive = (db_data_source.connection_config or {}).get("archive_path")
+    if not archive or not os.path.exists(archive):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This data source has no archive to reprocess. Upload the file again."
+        )
+
+    job = job_manager.submit(
+        "reprocess", current_user.tenant_id, ds_id,
+        run_reprocess_job, ds_id, current_user.id
+    )
+    return {
+        "message": f"Reprocessing '{db_data_source.name}' from its archive.",
+        "data_source_id": str(ds_id),
+        "job_id": job.id
+    }
+
+@router.post("/{ds_id}/sync", status_code=status.HTTP_202_ACCEPTED)
+async def sync_data_source(
+    ds_id: uuid.UUID,
+    full: bool = Query(False, description="Ignore the watermarks and read the remote tables entirely"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_or_default)
+):
+    """
+    Synchronize a SQL connector source: stream the rows changed on the remote database since the
+    last watermark (server-side cursor) and apply them locally. Runs as a background job.
+    """
+    db_data_source = db.query(models.DataSource).filter(
+        models.DataSource.id == ds_id,
+        models.DataSource.tenant_id == current_user.tenant_id
+    ).first()
+
+    if db_data_source is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Data source with id {ds_id} not found."
+        )
+    if is_deleting(db_data_source):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Data source '{db_data_source.name}' is being deleted."
+        )
+    if db_data_source.type != models.DataSourceType.SQL_CONNECTOR:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only SQL connector sources can be synchronized."
+        )
+
+    job = job_manager.submit(
+        "sql_sync", current_user.tenant_id, ds_id,
+        run_sync_job, ds_id, current_user.id, full
+    )
+    return {
+        "message": f"Synchronizing '{db_data_source.name}'.",
+        "data_source_id": str(ds_id),
+        "job_id": job.id
+    }
+
+def _get_tenant_job(job_id: str, current_user: models.User) -> Job:
+    job = job_manager.get(job_id)
+    if job is None or job.tenant_id != str(current_user.tenant_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found.")
+    return job
+
+@router.get("/sync/queue")
+async def get_sync_queue(
+    current_user: models.User = Depends(get_current_user_or_default)
+):
+    """
+    Scheduled syncs of the tenant: queue depth, running syncs and lag behind their due time.
+    """
+    return sync_scheduler.stats(current_user.tenant_id)
+
+@router.get("/jobs/{job_id}")
+async def get_job_progress(
+    job_id: str,
+    current_user: models.User = Depends(get_current_user_or_default)
+):
+    """
+    Avancement d'une tâche d'ingestion (lignes traitées, lignes/s, erreurs).
+    """
+    return _get_tenant_job(job_id, current_user).to_dict()
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_progress(
+    job_id: str,
+    current_user: models.User = Depends(get_current_user_for_stream)
+):
+    """
+    Flux Server-Sent Events de l'avancement d'une tâche, jusqu'à sa fin.
+    Accepte `?client_id=` car EventSource ne permet pas d'envoyer d'en-têtes.
+    """
+    job = _get_tenant_job(job_id, current_user)
+
+    async def event_stream():
+        while True:
+            payload = json.dumps(job.to_dict())
+            if job.is_finished:
+                yield f"event: done\ndata: {payload}\n\n"
+                break
+            yield f"data: {payload}\n\n"
+            await asyncio.sleep(JOB_EVENTS_INTERVAL_SECONDS)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -1,12 +1,16 @@
 # routers/product.py
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from typing import List, Optional # Ensure List and Optional are imported
 
 import models, schemas
 from database import get_db
 from routers.data_source import get_current_user
+from services.stock import stock_by_warehouse
+from services.search import search_products
+from services.pagination import encode_cursor, decode_cursor
 
 router = APIRouter(
     prefix="/api/v1/products",
@@ -14,6 +18,17 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)] # Secure all routes in this router
 )
 
+# Listing name of the pagination cursors (a cursor only resumes the listing it came from).
+PRODUCTS_CURSOR = "products"
+
+def with_stock_levels(db: Session, tenant_id, products: List[models.Product]) -> List[models.Product]:
+    """Renseigne stock_level et stock_by_warehouse (lus dans product_stock, une requête) sur les produits retournés."""
+    levels = stock_by_warehouse(db, tenant_id, [product.id for product in products])
+    for product in products:
+        product.stock_by_warehouse = levels.get(product.id, [])
+        product.stock_level = sum(level["on_hand"] for level in product.stock_by_warehouse)
+    return products
+
 @router.post("/", response_model=schemas.ProductOut, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_request: schemas.ProductCreate,
@@ -68,39 +83,64 @@ async def create_product(
 
 @router.get("/", response_model=List[schemas.ProductOut])
 async def list_products(
-    skip: int = 0,
-    limit: int = 100,
-    search: Optional[str] = Query(None, description="Search term for product name or description"),
+    response: Response,
+    skip: int = Query(0, ge=0, description="Offset, for search results (prefer `cursor` otherwise)"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    search: Optional[str] = Query(None, description="Search terms (name, description, exact SKU), ranked by relevance"),
     category_id: Optional[uuid.UUID] = Query(None, description="Filter by category ID"),
     supplier_id: Optional[uuid.UUID] = Query(None, description="Filter by supplier ID"),
+    warehouse_id: Optional[uuid.UUID] = Query(None, description="Only products with stock in this warehouse"),
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
-    Liste les produits pour le tenant de l'utilisateur courant, avec pagination et filtres optionnels.
+    Liste les produits pour le tenant de l'utilisateur courant, par nom, avec filtres optionnels.
+    Pagination par clé (nom, id) : l'en-tête X-Next-Cursor de la réponse, passé en `cursor`, donne la page
+    suivante (absent sur la dernière page). Une recherche est triée par pertinence et paginée par `skip`.
     """
     query = db.query(models.Product).filter(models.Product.tenant_id == current_user.tenant_id)
 
     # Apply filters
-    if search:
-         # Basic search on name/description (adjust for full-text search if index exists)
-         search_term = f"%{search}%"
-         query = query.filter(
-             (models.Product.name.ilike(search_term)) |
-             (models.Product.description.ilike(search_term)) |
-             (models.Product.sku.ilike(search_term)) # Also search SKU
-        )
     if category_id:
          query = query.filter(models.Product.category_id == category_id)
     if supplier_id:
          query = query.filter(models.Product.supplier_id == supplier_id)
+    if warehouse_id:
+         # (tenant, warehouse) range of ix_product_stock_tenant_warehouse
+         stocked = db.query(models.ProductStock.product_id).filter(
+             models.ProductStock.tenant_id == current_user.tenant_id,
+             models.ProductStock.warehouse_id == warehouse_id,
+             models.ProductStock.on_hand != 0
+         )
+         query = query.filter(models.Product.id.in_(stocked))
     if is_active is not None:
          query = query.filter(models.Product.is_active == is_active)
 
+    if search:
+         if cursor:
+              raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search results are paginated with skip, not cursor.")
+         # Full-text search (name/description), exact SKU and typo tolerance, most relevant first
+         products = search_products(db, query, search, limit=limit, offset=skip)
+         return with_stock_levels(db, current_user.tenant_id, products)
 
-    products = query.order_by(models.Product.name).offset(skip).limit(limit).all()
-    return products
+    # Keyset pagination: the next page starts after the last (name, id), found by a descent of
+    # ix_products_tenant_name_id whatever the page number
+    if cursor:
+         try:
+              name, last_id = decode_cursor(PRODUCTS_CURSOR, cursor, str, uuid.UUID)
+         except ValueError as e:
+              raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+         query = query.filter(tuple_(models.Product.name, models.Product.id) > tuple_(name, last_id))
+    query = query.order_by(models.Product.name, models.Product.id)
+    if skip and not cursor:
+         query = query.offset(skip)
+    products = query.limit(limit + 1).all()
+    if len(products) > limit:
+         products = products[:limit]
+         response.headers["X-Next-Cursor"] = encode_cursor(PRODUCTS_CURSOR, products[-1].name, products[-1].id)
+    return with_stock_levels(db, current_user.tenant_id, products)
 
 @router.get("/{product_id}", response_model=schemas.ProductOut)
 async def get_product(
@@ -122,7 +162,7 @@ async def get_product(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Product with id {product_id} not found."
         )
-    return product
+    return with_stock_levels(db, current_user.tenant_id, [product])[0]
 
 # TODO: Ajouter endpoints PUT pour la mise à jour et DELETE pour la suppression
 # TODO: Considérer l'ajout de relations imbriquées (category, supplier) dans ProductOut si nécessaire
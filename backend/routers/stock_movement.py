@@ -1,11 +1,14 @@
 # routers/stock_movement.py
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import models, schemas
 from database import get_db
 from routers.data_source import get_current_user
+from services.pagination import encode_cursor, decode_cursor
 
 router = APIRouter(
     prefix="/api/v1/movements",
@@ -13,6 +16,9 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
+# Listing name of the pagination cursors (a cursor only resumes the listing it came from).
+MOVEMENTS_CURSOR = "movements"
+
 @router.post("/", response_model=schemas.StockMovementOut, status_code=status.HTTP_201_CREATED)
 async def create_movement(movement: schemas.StockMovementCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     # Vérifier que le produit appartient bien au tenant
@@ -35,5 +41,46 @@ async def create_movement(movement: schemas.StockMovementCreate, db: Session = D
     return new_movement
 
 @router.get("/", response_model=List[schemas.StockMovementOut])
-async def list_movements(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return db.query(models.StockMovement).filter(models.StockMovement.tenant_id == current_user.tenant_id).limit(100).all()
+async def list_movements(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    product_id: Optional[uuid.UUID] = Query(None, description="Filter by product ID"),
+    warehouse_id: Optional[uuid.UUID] = Query(None, description="Filter by warehouse ID"),
+    movement_type: Optional[str] = Query(None, description="Filter by type (INBOUND, OUTBOUND, ADJUSTMENT...)"),
+    start: Optional[datetime] = Query(None, description="Movements at or after this instant"),
+    end: Optional[datetime] = Query(None, description="Movements before this instant"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Mouvements du tenant, du plus récent au plus ancien, avec filtres optionnels.
+    Pagination par clé (timestamp, id) : l'en-tête X-Next-Cursor de la réponse, passé en `cursor` avec les
+    mêmes filtres, donne la page suivante (absent sur la dernière page).
+    """
+    movement = models.StockMovement
+    query = db.query(movement).filter(movement.tenant_id == current_user.tenant_id)
+    if product_id:
+        query = query.filter(movement.product_id == product_id)
+    if warehouse_id:
+        query = query.filter(movement.warehouse_id == warehouse_id)
+    if movement_type:
+        query = query.filter(movement.movement_type == movement_type)
+    if start:
+        query = query.filter(movement.timestamp >= start)
+    if end:
+        query = query.filter(movement.timestamp < end)
+    if cursor:
+        try:
+            timestamp, last_id = decode_cursor(MOVEMENTS_CURSOR, cursor, datetime.fromisoformat, uuid.UUID)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        # The timestamp bound is a range condition on ix_stock_movements_tenant_timestamp_desc
+        # (ix_stock_movements_product_timestamp_desc for one product); id breaks ties
+        query = query.filter(movement.timestamp <= timestamp, or_(movement.timestamp < timestamp, movement.id < last_id))
+
+    movements = query.order_by(movement.timestamp.desc(), movement.id.desc()).limit(limit + 1).all()
+    if len(movements) > limit:
+        movements = movements[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(MOVEMENTS_CURSOR, movements[-1].timestamp, movements[-1].id)
+    return movements
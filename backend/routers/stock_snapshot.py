@@ -0,0 +1,53 @@
+# routers/stock_snapshot.py
+import uuid
+from datetime import date
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.orm import Session
+import models
+from database import get_db
+from routers.auth import get_current_user_or_default
+from services.jobs import job_manager
+from services.snapshots import stock_as_of, end_of_day, run_snapshot_job
+
+router = APIRouter(
+    prefix="/api/v1/stock",
+    tags=['Stock Snapshots']
+)
+
+@router.get("/as-of")
+async def get_stock_as_of(
+    as_of: date = Query(..., alias="date", description="Stock at the end of this day (UTC)"),
+    product_id: uuid.UUID | None = None,
+    category: str | None = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_or_default)
+):
+    """
+    Stock des produits à la fin du jour `date` : totaux et produits par stock décroissant.
+    Calculé depuis le point de contrôle mensuel le plus proche (ou le stock courant) et les mouvements intermédiaires.
+    """
+    result = stock_as_of(
+        db, current_user.tenant_id, end_of_day(as_of),
+        product_id=product_id, category=category, limit=limit, offset=skip
+    )
+    result["date"] = as_of
+    return result
+
+@router.get("/snapshots")
+async def list_snapshots(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user_or_default)):
+    """Points de contrôle mensuels du tenant, du plus récent au plus ancien."""
+    runs = db.query(models.StockSnapshotRun).filter(
+        models.StockSnapshotRun.tenant_id == current_user.tenant_id
+    ).order_by(models.StockSnapshotRun.as_of.desc()).all()
+    return [{"as_of": run.as_of, "products": run.products, "taken_at": run.taken_at} for run in runs]
+
+@router.post("/snapshots", status_code=status.HTTP_202_ACCEPTED)
+async def take_snapshots(current_user: models.User = Depends(get_current_user_or_default)):
+    """
+    Prend en arrière-plan les points de contrôle mensuels manquants du tenant.
+    Suivre la tâche avec GET /api/v1/datasources/jobs/{job_id}.
+    """
+    job = job_manager.submit("stock_snapshot", current_user.tenant_id, None, run_snapshot_job, current_user.tenant_id)
+    return {"message": "Taking monthly stock snapshots.", "job_id": job.id}
@@ -176,11 +176,19 @@ class SupplierOut(SupplierBase):
     class Config:
         from_attributes = True
 
+class WarehouseStockOut(BaseModel):
+    warehouse_id: uuid.UUID | None = None # None: stock moved without a warehouse
+    warehouse_code: str | None = None
+    warehouse_name: str
+    on_hand: int
+
 class ProductOut(ProductBase):
     id: uuid.UUID
     tenant_id: uuid.UUID
     created_at: datetime
     updated_at: datetime
+    stock_level: int | None = None # Current stock (product_stock), filled by the list/detail endpoints
+    stock_by_warehouse: List[WarehouseStockOut] = [] # Non-zero stock per warehouse, same source
     # Optionally include nested Category/Supplier info here if needed for specific endpoints
     # category: Optional[CategoryOut] = None
     # supplier: Optional[SupplierOut] = None
@@ -0,0 +1,43 @@
+# scripts/create_listing_indexes.py
+import sys
+import os
+import argparse
+
+# Ajouter le dossier parent au path pour pouvoir importer les modules backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from database import get_engine
+import models
+
+# Keys of the keyset pagination of GET /api/v1/products and GET /api/v1/movements.
+LISTING_INDEXES = (
+    (models.Product, "ix_products_tenant_name_id"),
+    (models.StockMovement, "ix_stock_movements_warehouse_timestamp_desc"),
+)
+
+
+def _index_ddl(model, name: str) -> str:
+    index = next(idx for idx in model.__table__.indexes if idx.name == name)
+    ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    return ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY IF NOT EXISTS", 1)
+
+
+def main():
+    """
+    Crée les index de pagination des listes sur une base existante (create_all ne les ajoute qu'aux
+    tables neuves), sans bloquer les écritures (CONCURRENTLY, hors transaction).
+    """
+    with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for model, name in LISTING_INDEXES:
+            print(f"🔧 Index {name}...")
+            conn.execute(text(_index_ddl(model, name)))
+    print("✅ Index de pagination prêts.")
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Crée les index de pagination des listes de produits et de mouvements.").parse_args()
+    main()
@@ -0,0 +1,55 @@
+# scripts/create_search_indexes.py
+import sys
+import os
+import argparse
+
+# Ajouter le dossier parent au path pour pouvoir importer les modules backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from database import get_engine
+import models
+
+# Former full-text index: NULL for every product without description, replaced by ix_products_search_tsv.
+OLD_INDEX = "ix_products_name_description_tsv"
+
+
+def _search_index_ddl() -> str:
+    index = next(idx for idx in models.Product.__table__.indexes if idx.name == "ix_products_search_tsv")
+    ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    return ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY IF NOT EXISTS", 1)
+
+
+def main(keep_old: bool):
+    """
+    Crée les index de recherche sur une base existante (create_all ne les ajoute qu'aux tables neuves),
+    sans bloquer les écritures (CONCURRENTLY, hors transaction).
+    """
+    with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        print("🔧 Index plein texte ix_products_search_tsv...")
+        conn.execute(text(_search_index_ddl()))
+
+        available = conn.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first()
+        if available:
+            print("🔧 Extension pg_trgm et index trigramme ix_products_name_trgm...")
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)"
+            ))
+        else:
+            print("⚠️ pg_trgm indisponible sur ce serveur : pas de tolérance aux fautes de frappe.")
+
+        if not keep_old:
+            print(f"🧹 Suppression de l'ancien index {OLD_INDEX}...")
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {OLD_INDEX}"))
+    print("✅ Index de recherche prêts.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crée les index de recherche produits (plein texte, trigrammes).")
+    parser.add_argument("--keep-old", action="store_true", help=f"Conserver l'ancien index {OLD_INDEX}")
+    args = parser.parse_args()
+    main(args.keep_old)
@@ -0,0 +1,50 @@
+# scripts/create_warehouse_index.py
+import sys
+import os
+import argparse
+
+# Ajouter le dossier parent au path pour pouvoir importer les modules backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from database import get_engine
+from models import Base
+import models
+
+# The former warehouse_stock totals table: one row per warehouse, upserted by every product_stock
+# write, which serialized (and could deadlock) concurrent imports into the same warehouse.
+DROP_WAREHOUSE_STOCK = """
+DROP FUNCTION IF EXISTS warehouse_stock_insert() CASCADE;
+DROP FUNCTION IF EXISTS warehouse_stock_delete() CASCADE;
+DROP FUNCTION IF EXISTS warehouse_stock_update() CASCADE;
+DROP FUNCTION IF EXISTS warehouse_stock_reprice() CASCADE;
+DROP FUNCTION IF EXISTS warehouse_stock_product_delete() CASCADE;
+DROP TABLE IF EXISTS warehouse_stock;
+"""
+
+
+def main():
+    """
+    Ajoute à une base existante ce que create_all ne crée que pour les tables neuves : l'index
+    (tenant, entrepôt) de product_stock, sans bloquer les écritures, et le trigger de version sur
+    warehouses. Supprime l'ancienne table warehouse_stock et ses triggers : les totaux par entrepôt
+    sont agrégés à la lecture.
+    """
+    Base.metadata.create_all(bind=get_engine())
+    with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        print("🔧 Index ix_product_stock_tenant_warehouse...")
+        conn.execute(text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_product_stock_tenant_warehouse "
+            "ON product_stock (tenant_id, warehouse_id, product_id) INCLUDE (on_hand)"
+        ))
+        print("🔧 Triggers de version des données...")
+        conn.execute(text(models.DATA_VERSION_TRIGGERS))
+        print("🔧 Suppression de warehouse_stock et de ses triggers...")
+        conn.execute(text(DROP_WAREHOUSE_STOCK))
+    print("✅ Stock par entrepôt prêt.")
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Crée l'index du stock par entrepôt et supprime l'ancienne table warehouse_stock.").parse_args()
+    main()
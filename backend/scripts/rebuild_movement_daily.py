@@ -0,0 +1,52 @@
+# scripts/rebuild_movement_daily.py
+import sys
+import os
+import argparse
+
+# Ajouter le dossier parent au path pour pouvoir importer les modules backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from database import get_session, get_engine
+from models import Base
+import models
+from services.stock import verify_movement_daily, rebuild_movement_daily
+
+
+def _upgrade_existing_database():
+    """Remplace les fonctions des triggers du cumul journalier sur une base existante (create_all ne les recrée pas)."""
+    with get_engine().begin() as conn:
+        print("🔧 Triggers de stock_movement_daily...")
+        conn.execute(text(models.STOCK_MOVEMENT_DAILY_TRIGGERS))
+
+
+def main(tenant_id: str | None, verify_only: bool, force: bool):
+    Base.metadata.create_all(bind=get_engine())
+    if not verify_only:
+        _upgrade_existing_database()
+    db = get_session()
+    try:
+        report = verify_movement_daily(db, tenant_id)
+        print(f"🔎 {report['mismatches']} écart(s) entre stock_movement_daily et les mouvements.")
+        for row in report["sample"]:
+            print(f"   - produit {row['product_id']} le {row['day']} ({row['movement_type']}) : {row['expected']} mouvement(s) attendu(s), {row['actual']} cumulé(s)")
+        if verify_only or not (report["mismatches"] or force):
+            return report["mismatches"]
+
+        rows = rebuild_movement_daily(db, tenant_id)
+        print(f"🔧 stock_movement_daily reconstruit : {rows} ligne(s).")
+        remaining = verify_movement_daily(db, tenant_id)["mismatches"]
+        print(f"✅ {remaining} écart(s) après reconstruction.")
+        return remaining
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vérifie (et reconstruit) le cumul journalier stock_movement_daily à partir des mouvements.")
+    parser.add_argument("--tenant", default=None, help="Limiter à un tenant (UUID)")
+    parser.add_argument("--verify", action="store_true", help="Vérifier seulement, sans reconstruire")
+    parser.add_argument("--force", action="store_true", help="Reconstruire même sans écart détecté")
+    args = parser.parse_args()
+    sys.exit(1 if main(args.tenant, args.verify, args.force) else 0)
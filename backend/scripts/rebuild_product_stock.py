@@ -0,0 +1,40 @@
+# scripts/rebuild_product_stock.py
+import sys
+import os
+import argparse
+
+# Ajouter le dossier parent au path pour pouvoir importer les modules backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_session, get_engine
+from models import Base
+from services.stock import verify_product_stock, rebuild_product_stock
+
+
+def main(tenant_id: str | None, verify_only: bool, force: bool):
+    Base.metadata.create_all(bind=get_engine())
+    db = get_session()
+    try:
+        report = verify_product_stock(db, tenant_id)
+        print(f"🔎 {report['mismatches']} écart(s) entre product_stock et les mouvements.")
+        for row in report["sample"]:
+            print(f"   - produit {row['product_id']} : attendu {row['expected']}, trouvé {row['actual']}")
+        if verify_only or not (report["mismatches"] or force):
+            return report["mismatches"]
+
+        rows = rebuild_product_stock(db, tenant_id)
+        print(f"🔧 product_stock reconstruit : {rows} ligne(s).")
+        remaining = verify_product_stock(db, tenant_id)["mismatches"]
+        print(f"✅ {remaining} écart(s) après reconstruction.")
+        return remaining
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vérifie (et reconstruit) la table product_stock à partir des mouvements.")
+    parser.add_argument("--tenant", default=None, help="Limiter à un tenant (UUID)")
+    parser.add_argument("--verify", action="store_true", help="Vérifier seulement, sans reconstruire")
+    parser.add_argument("--force", action="store_true", help="Reconstruire même sans écart détecté")
+    args = parser.parse_args()
+    sys.exit(1 if main(args.tenant, args.verify, args.force) else 0)
@@ -1,7 +1,9 @@
 # scripts/seed_db.py
 import sys
 import os
+import uuid
 import random
+import argparse
 from datetime import datetime, timedelta
 
 # Ajouter le dossier parent au path pour pouvoir importer les modules backend
@@ -13,11 +15,12 @@ from database import get_session, get_engine
 from models import Base
 import models
 import hashing
+from services.bulk_writer import write_products, write_movements
 
 # Initialisation de la session
 db = get_session()
 
-def seed():
+def seed(product_count: int = 50, movement_count: int = 200):
     print("🌱 Début du peuplement de la base de données...")
 
     # 1. Créer le Tenant
@@ -85,42 +88,48 @@ def seed():
         suppliers.append(sup)
     print(f"✅ {len(suppliers)} Fournisseurs créés")
 
-    # 6. Créer des Produits
+    # 6. Créer des Produits (COPY automatique au-delà de COPY_THRESHOLD_ROWS)
     products = []
     existing_products_count = db.query(models.Product).filter_by(tenant_id=tenant.id).count()
-    if existing_products_count < 50:
-        print("📦 Création de 50 produits...")
-        for i in range(50):
+    if existing_products_count < product_count:
+        print(f"📦 Création de {product_count} produits...")
+        for i in range(product_count):
             cat_name = random.choice(list(categories.keys()))
             sku = f"{cat_name[:3].upper()}-{1000+i}"
             price = random.uniform(10.0, 500.0)
 
-            prod = models.Product(
-                tenant_id=tenant.id,
-                sku=sku,
-                name=f"Produit {cat_name} {i+1}",
-                description=f"Description superbe pour {cat_name} {i+1}",
-                category_id=categories[cat_name].id,
-                supplier_id=random.choice(suppliers).id,
-                unit_price=round(price, 2),
-                cost_price=round(price * 0.6, 2),
-                reorder_point=random.randint(5, 20),
-                reorder_quantity=random.randint(20, 100),
-                lead_time_days=random.randint(3, 14)
-            )
-            db.add(prod)
-            products.append(prod)
+            products.append({
+                "id": uuid.uuid4(),
+                "tenant_id": tenant.id,
+                "sku": sku,
+                "name": f"Produit {cat_name} {i+1}",
+                "description": f"Description superbe pour {cat_name} {i+1}",
+                "category_id": categories[cat_name].id,
+                "supplier_id": random.choice(suppliers).id,
+                "unit_price": round(price, 2),
+                "cost_price": round(price * 0.6, 2),
+                "reorder_point": random.randint(5, 20),
+                "reorder_quantity": random.randint(20, 100),
+                "lead_time_days": random.randint(3, 14)
+            })
+        remapped = write_products(db, products)
+        for prod in products:
+            prod["id"] = remapped.get(prod["sku"], prod["id"])
         db.commit()
         print(f"✅ {len(products)} Produits ajoutés")
     else:
-        products = db.query(models.Product).filter_by(tenant_id=tenant.id).all()
+        products = [
+            {"id": id_, "cost_price": cost}
+            for id_, cost in db.query(models.Product.id, models.Product.cost_price).filter_by(tenant_id=tenant.id)
+        ]
         print("ℹ️ Produits déjà existants")
 
     # 7. Simuler des Mouvements de Stock (Historique)
     movements_count = db.query(models.StockMovement).filter_by(tenant_id=tenant.id).count()
-    if movements_count < 200:
-        print("🚚 Simulation de 200 mouvements de stock...")
-        for _ in range(200):
+    if movements_count < movement_count:
+        print(f"🚚 Simulation de {movement_count} mouvements de stock...")
+        movements = []
+        for _ in range(movement_count):
             prod = random.choice(products)
             wh = random.choice(warehouses)
 
@@ -133,18 +142,19 @@ def seed():
             days_ago = random.randint(0, 90)
             move_date = datetime.now() - timedelta(days=days_ago)
 
-            movement = models.StockMovement(
-                tenant_id=tenant.id,
-                product_id=prod.id,
-                warehouse_id=wh.id,
-                movement_type=m_type,
-                quantity=qty if is_in else -qty, # Négatif pour les sorties
-                unit_cost=prod.cost_price,
-                timestamp=move_date,
-                user_id=user.id,
-                notes="Simulation auto"
-            )
-            db.add(movement)
+            movements.append({
+                "id": uuid.uuid4(),
+                "tenant_id": tenant.id,
+                "product_id": prod["id"],
+                "warehouse_id": wh.id,
+                "movement_type": m_type,
+                "quantity": qty if is_in else -qty, # Négatif pour les sorties
+                "unit_cost": prod["cost_price"],
+                "timestamp": move_date,
+                "user_id": user.id,
+                "notes": "Simulation auto"
+            })
+        write_movements(db, movements)
         db.commit()
         print("✅ Mouvements de stock simulés")
     else:
@@ -153,8 +163,12 @@ def seed():
     print("🌱 Peuplement terminé avec succès !")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peuple la base avec un tenant de démonstration.")
+    parser.add_argument("--products", type=int, default=50, help="Nombre de produits à créer")
+    parser.add_argument("--movements", type=int, default=200, help="Nombre de mouvements de stock à simuler")
+    args = parser.parse_args()
     try:
-        seed()
+        seed(product_count=args.products, movement_count=args.movements)
     except Exception as e:
         print(f"❌ Erreur : {e}")
     finally:
@@ -0,0 +1,59 @@
+# scripts/tag_source_movements.py
+import sys
+import os
+import argparse
+
+# Ajouter le dossier parent au path pour pouvoir importer les modules backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from database import get_session
+from services.ingestion import SOURCE_REFERENCE_TYPE
+
+# Movements written before imports tagged them are found by the notes the import gave them
+# ("Import via <file>", "Import via <a>, <b>" for a batch, "Delta import via <file>", "Sync <name>").
+# When several sources of a tenant share a name, only movements on the source's own products are tagged.
+TAG_LEGACY_MOVEMENTS = """
+WITH named AS (
+    SELECT id, tenant_id, name, COUNT(*) OVER (PARTITION BY tenant_id, name) AS homonyms
+    FROM data_sources
+    WHERE CAST(:tenant_id AS uuid) IS NULL OR tenant_id = CAST(:tenant_id AS uuid)
+)
+UPDATE stock_movements m
+SET reference_type = :reference_type, reference_id = s.id::text
+FROM named s
+WHERE m.tenant_id = s.tenant_id
+  AND m.reference_type IS NULL
+  AND (m.notes IN ('Import via ' || s.name, 'Delta import via ' || s.name, 'Sync ' || s.name)
+       OR (m.notes LIKE 'Import via %, %' AND s.name = ANY(string_to_array(substr(m.notes, 12), ', '))))
+  AND (s.homonyms = 1 OR EXISTS (
+       SELECT 1 FROM products p WHERE p.id = m.product_id AND p.data_source_id = s.id))
+"""
+
+
+def main(tenant_id: str | None, dry_run: bool):
+    db = get_session()
+    try:
+        tagged = db.execute(
+            text(TAG_LEGACY_MOVEMENTS),
+            {"tenant_id": tenant_id, "reference_type": SOURCE_REFERENCE_TYPE}
+        ).rowcount
+        if dry_run:
+            db.rollback()
+            print(f"🔎 {tagged} mouvement(s) d'import à rattacher à leur source (rien n'a été écrit).")
+        else:
+            db.commit()
+            print(f"✅ {tagged} mouvement(s) d'import rattaché(s) à leur source.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rattache à leur source les mouvements écrits par les imports avant leur marquage."
+    )
+    parser.add_argument("--tenant", default=None, help="Limiter à un tenant (UUID)")
+    parser.add_argument("--dry-run", action="store_true", help="Compter seulement, sans écrire")
+    args = parser.parse_args()
+    main(args.tenant, args.dry_run)
@@ -0,0 +1,37 @@
+# scripts/take_stock_snapshots.py
+import sys
+import os
+import argparse
+
+# Ajouter le dossier parent au path pour pouvoir importer les modules backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_session, get_engine
+from models import Base
+import models
+from services.snapshots import take_missing_snapshots
+
+
+def main(tenant_id: str | None):
+    """
+    Prend les points de contrôle mensuels de stock manquants (tous les tenants ou un seul).
+    À lancer par cron en début de mois (ex: `5 0 1 * *`) ; sans effet pour les points déjà pris.
+    """
+    Base.metadata.create_all(bind=get_engine())
+    db = get_session()
+    try:
+        tenant_ids = [tenant_id] if tenant_id else [tid for (tid,) in db.query(models.Tenant.id).all()]
+        for tid in tenant_ids:
+            taken = take_missing_snapshots(db, tid)
+            if taken:
+                print(f"📸 Tenant {tid} : {taken} point(s) de contrôle pris.")
+        print(f"✅ Points de contrôle à jour pour {len(tenant_ids)} tenant(s).")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prend les points de contrôle mensuels du stock (stock au 1er du mois).")
+    parser.add_argument("--tenant", default=None, help="Limiter à un tenant (UUID)")
+    args = parser.parse_args()
+    main(args.tenant)
@@ -0,0 +1,341 @@
+# services/analytics.py
+"""
+Agrégats analytiques calculés côté base (fonctions de fenêtre, width_bucket / ntile) : seules
+quelques lignes de résultat remontent, quelle que soit la taille du catalogue. NumPy prend le
+relais pour des valeurs déjà en mémoire.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Sequence
+
+import numpy as np
+from sqlalchemy import func, case, literal, or_, select
+from sqlalchemy.orm import Session
+
+import models
+from services.stock import stock_level_subquery
+
+UNCATEGORIZED = "Sans catégorie"
+
+# Bars of a distribution chart by default, and the most a user can ask for.
+HISTOGRAM_BINS = int(os.getenv("HISTOGRAM_BINS", "10"))
+HISTOGRAM_MAX_BINS = 50
+
+# Default period of a movement trend, in days, and the most curves drawn on one chart.
+TREND_DAYS = int(os.getenv("TREND_DAYS", "90"))
+TREND_MAX_SERIES = 5
+
+# Measures a distribution can be computed on: name -> (label, unit)
+MEASURES = {
+    "price": ("Prix de vente", "€"),
+    "cost": ("Coût de revient", "€"),
+    "margin": ("Marge unitaire", "€"),
+    "stock": ("Quantité en stock", ""),
+    "stock_value": ("Valeur du stock", "€"),
+}
+
+
+def margin_summary(db: Session, tenant_id, top_n: int = 5, max_categories: int = 10) -> Dict[str, Any] | None:
+    """
+    Marges des produits dont prix de vente et coût sont connus : moyenne, taux global, marge
+    pondérée par le stock (marge × quantité en stock), top N produits et cumul par catégorie.
+    Retourne None si aucun produit n'a de prix et de coût.
+    """
+    stock = stock_level_subquery(db, tenant_id)
+    on_hand = func.greatest(func.coalesce(stock.c.current_stock, 0), 0)
+    margin = models.Product.unit_price - models.Product.cost_price
+    margin_percent = case(
+        (models.Product.unit_price > 0, margin * 100 / models.Product.unit_price), else_=literal(0)
+    )
+    category = func.coalesce(models.Category.name, UNCATEGORIZED)
+
+    priced = (
+        db.query(
+            models.Product.name.label("name"),
+            category.label("category"),
+            models.Product.unit_price.label("unit_price"),
+            margin.label("margin"),
+            margin_percent.label("margin_percent"),
+            on_hand.label("on_hand"),
+        )
+        .outerjoin(models.Category, models.Category.id == models.Product.category_id)
+        .outerjoin(stock, stock.c.product_id == models.Product.id)
+        .filter(
+            models.Product.tenant_id == tenant_id,
+            models.Product.unit_price.isnot(None),
+            models.Product.cost_price.isnot(None)
+        )
+        .subquery()
+    )
+
+    # One pass over the catalogue: overall and per-category figures as window aggregates, next to
+    # the rank of each product overall and within its category. Only the top N rows and the best
+    # row of each category come back.
+    by_category = {"partition_by": priced.c.category}
+    stock_margin = priced.c.margin * priced.c.on_hand
+    ranked = db.query(
+        priced.c.name, priced.c.category, priced.c.margin, priced.c.margin_percent, priced.c.on_hand,
+        func.count().over().label("products"),
+        func.avg(priced.c.margin).over().label("avg_margin"),
+        func.sum(priced.c.margin).over().label("total_margin"),
+        func.sum(priced.c.unit_price).over().label("total_price"),
+        func.sum(stock_margin).over().label("stock_margin"),
+        func.count().over(**by_category).label("category_products"),
+        func.avg(priced.c.margin).over(**by_category).label("category_avg_margin"),
+        func.sum(stock_margin).over(**by_category).label("category_stock_margin"),
+        func.row_number().over(order_by=(priced.c.margin.desc(), priced.c.name)).label("rank"),
+        func.row_number().over(
+            order_by=(priced.c.margin.desc(), priced.c.name), **by_category
+        ).label("category_rank"),
+    ).subquery()
+    rows = db.query(ranked).filter(or_(ranked.c.rank <= top_n, ranked.c.category_rank == 1)).all()
+    if not rows:
+        return None
+
+    top = sorted((row for row in rows if row.rank <= top_n), key=lambda row: row.rank)
+    # Categories carrying the most margin in stock first
+    categories = sorted(
+        (row for row in rows if row.category_rank == 1),
+        key=lambda row: (-(row.category_stock_margin or 0), row.category)
+    )[:max_categories]
+
+    first = top[0]
+    return {
+        "products": first.products,
+        "avg_margin": float(first.avg_margin or 0),
+        "margin_rate": float(first.total_margin / first.total_price * 100) if first.total_price else 0.0,
+        "stock_margin": float(first.stock_margin or 0),
+        "top": [
+            {
+                "name": row.name,
+                "margin": float(row.margin),
+                "margin_percent": float(row.margin_percent),
+                "on_hand": int(row.on_hand),
+            }
+            for row in top
+        ],
+        "categories": [
+            {
+                "category": row.category,
+                "products": row.category_products,
+                "avg_margin": float(row.category_avg_margin or 0),
+                "stock_margin": float(row.category_stock_margin or 0),
+                "best_product": row.name,
+            }
+            for row in categories
+        ],
+    }
+
+
+def measure_expression(measure: str, unit_price, cost_price, stock_level):
+    """Expression SQL d'une mesure de MEASURES à partir des colonnes prix, coût et stock."""
+    return {
+        "price": unit_price,
+        "cost": cost_price,
+        "margin": unit_price - cost_price,
+        "stock": stock_level,
+        "stock_value": stock_level * unit_price,
+    }[measure]
+
+
+def histogram_bins(requested) -> int:
+    """Nombre de tranches demandé (entité NLP, paramètre), borné à [2, HISTOGRAM_MAX_BINS]."""
+    try:
+        bins = int(requested)
+    except (TypeError, ValueError):
+        return HISTOGRAM_BINS
+    return min(max(bins, 2), HISTOGRAM_MAX_BINS)
+
+
+def histogram_statement(values, bins: int, quantiles: bool = False):
+    """
+    Requête d'histogramme sur `values` (sous-requête à une colonne `value`, sans NULL), une ligne par
+    tranche non vide : (bucket, borne basse, borne haute, effectif).
+    Tranches de même largeur via width_bucket entre min et max, ou de même effectif via ntile.
+    """
+    if quantiles:
+        ranked = select(
+            values.c.value, func.ntile(bins).over(order_by=values.c.value).label("bucket")
+        ).subquery()
+        return (
+            select(ranked.c.bucket, func.min(ranked.c.value), func.max(ranked.c.value), func.count())
+            .group_by(ranked.c.bucket).order_by(ranked.c.bucket)
+        )
+
+    bounded = select(
+        values.c.value,
+        func.min(values.c.value).over().label("low"),
+        func.max(values.c.value).over().label("high"),
+    ).subquery()
+    # width_bucket needs low < high; the maximum itself falls in the last bucket
+    high = case((bounded.c.high > bounded.c.low, bounded.c.high), else_=bounded.c.low + 1)
+    bucket = func.least(func.width_bucket(bounded.c.value, bounded.c.low, high, bins), bins)
+    return (
+        select(bucket, func.min(bounded.c.low), func.max(bounded.c.high), func.count())
+        .group_by(bucket).order_by(bucket)
+    )
+
+
+def histogram(run, values, bins: int = HISTOGRAM_BINS, quantiles: bool = False) -> List[Dict[str, Any]]:
+    """
+    Histogramme calculé par la base ; `run` exécute une requête et retourne ses lignes
+    (session locale ou base connectée en mode fédéré). Liste de {"low", "high", "count"}.
+    """
+    rows = run(histogram_statement(values, bins, quantiles))
+    if not rows:
+        return []
+    if quantiles:
+        return _merge_equal_ranges([
+            {"low": float(low), "high": float(high), "count": count} for _, low, high, count in rows
+        ])
+
+    low, high = float(rows[0][1]), float(rows[0][2])
+    if high == low:
+        return [{"low": low, "high": high, "count": rows[0][3]}]
+    step = (high - low) / bins
+    counts = {bucket: count for bucket, _, _, count in rows}
+    return [
+        {"low": low + i * step, "high": low + (i + 1) * step, "count": counts.get(i + 1, 0)}
+        for i in range(bins)
+    ]
+
+
+def histogram_from_values(values: Sequence[float], bins: int = HISTOGRAM_BINS, quantiles: bool = False) -> List[Dict[str, Any]]:
+    """Même résultat que `histogram` pour des valeurs déjà en mémoire (NumPy)."""
+    data = np.asarray(values, dtype=float)
+    if not data.size:
+        return []
+    if data.min() == data.max():
+        return [{"low": float(data[0]), "high": float(data[0]), "count": int(data.size)}]
+    edges = bins
+    if quantiles:
+        edges = np.unique(np.quantile(data, np.linspace(0, 1, bins + 1)))
+    counts, edges = np.histogram(data, bins=edges)
+    return [
+        {"low": float(edges[i]), "high": float(edges[i + 1]), "count": int(count)}
+        for i, count in enumerate(counts)
+    ]
+
+
+def _merge_equal_ranges(buckets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # ntile splits runs of equal values over several buckets: they are shown as one bar
+    merged = []
+    for bucket in buckets:
+        if merged and merged[-1]["low"] == bucket["low"] and merged[-1]["high"] == bucket["high"]:
+            merged[-1]["count"] += bucket["count"]
+        else:
+            merged.append(dict(bucket))
+    return merged
+
+
+def bucket_label(bucket: Dict[str, Any], unit: str = "") -> str:
+    def edge(value):
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    if bucket["low"] == bucket["high"]:
+        return f"{edge(bucket['low'])}{unit}"
+    return f"{edge(bucket['low'])}–{edge(bucket['high'])}{unit}"
+
+
+def histogram_answer(buckets: List[Dict[str, Any]], measure: str, quantiles: bool = False) -> Dict[str, Any]:
+    """Réponse du chat (texte + bar chart) pour un histogramme de `measure`."""
+    from services.visualization import viz_service
+    label, unit = MEASURES[measure]
+    hist_data = [{"range": bucket_label(b, unit), "count": b["count"]} for b in buckets]
+    chart_config = viz_service.create_bar_chart(
+        data=hist_data, x_key="range", y_key="count",
+        title=f"Distribution : {label}", x_label=f"Plage ({label.lower()})", y_label="Nombre de produits"
+    )
+    kind = "de même effectif" if quantiles else "de même largeur"
+    total = sum(b["count"] for b in buckets)
+    return {
+        "text": f"Voici la distribution ({label.lower()}) de vos {total} produits, en {len(buckets)} tranches {kind}.",
+        "chart": chart_config
+    }
+
+def distribution(db: Session, tenant_id, measure: str = "price", bins: int = HISTOGRAM_BINS,
+                 quantiles: bool = False) -> List[Dict[str, Any]]:
+    """Distribution d'une mesure de MEASURES sur les produits du tenant, en une requête agrégée."""
+    stock = stock_level_subquery(db, tenant_id) if measure in ("stock", "stock_value") else None
+    stock_level = func.coalesce(stock.c.current_stock, 0) if stock is not None else literal(0)
+    value = measure_expression(measure, models.Product.unit_price, models.Product.cost_price, stock_level)
+
+    values = select(value.label("value")).select_from(models.Product)
+    if stock is not None:
+        values = values.outerjoin(stock, stock.c.product_id == models.Product.id)
+    values = values.where(models.Product.tenant_id == tenant_id, value.isnot(None))
+
+    if db.get_bind().dialect.name != "postgresql":
+        # No width_bucket / ntile on this backend: bin in memory
+        return histogram_from_values([float(v) for (v,) in db.execute(values)], bins, quantiles)
+    return histogram(lambda statement: db.execute(statement).all(), values.subquery(), bins, quantiles)
+
+
+def trend_granularity(days: int) -> str:
+    """Pas de temps d'une tendance : jour jusqu'à 3 mois, semaine jusqu'à 2 ans, mois au-delà."""
+    if days <= 92:
+        return "day"
+    if days <= 731:
+        return "week"
+    return "month"
+
+
+def movement_trend(db: Session, tenant_id, direction: str = "out", days: int = TREND_DAYS, group_by: str | None = None,
+                   category: str | None = None, supplier: str | None = None) -> Dict[str, Any]:
+    """
+    Évolution des sorties ("out"), entrées ("in") ou du solde ("net") sur les `days` derniers jours,
+    lue dans le cumul journalier stock_movement_daily, éventuellement par catégorie ou fournisseur.
+    Au plus TREND_MAX_SERIES courbes : les groupes suivants sont réunis dans "Autres".
+    """
+    daily = models.StockMovementDaily
+    granularity = trend_granularity(days)
+    period = func.date_trunc(granularity, daily.day).label("period")
+    quantity = {
+        "in": func.sum(daily.quantity_in),
+        "net": func.sum(daily.quantity_in - daily.quantity_out),
+    }.get(direction, func.sum(daily.quantity_out)).label("quantity")
+
+    group = None
+    if group_by == "category":
+        group = func.coalesce(models.Category.name, UNCATEGORIZED)
+    elif group_by == "supplier":
+        group = func.coalesce(models.Supplier.name, "Sans fournisseur")
+    columns = [period, group.label("series"), quantity] if group is not None else [period, quantity]
+
+    query = db.query(*columns).filter(
+        daily.tenant_id == tenant_id,
+        # Rollup days are UTC days
+        daily.day >= datetime.now(timezone.utc).date() - timedelta(days=days)
+    )
+    if direction not in ("in", "net"):
+        # Sorties: outbound movements only, not the adjustments written by deltas and syncs
+        query = query.filter(daily.movement_type == "OUTBOUND")
+    if group is not None or category or supplier:
+        # Tenant predicate on products too, so that only this tenant's products are read
+        query = query.join(models.Product, (models.Product.id == daily.product_id) & (models.Product.tenant_id == tenant_id))
+    if group_by == "category" or category:
+        query = query.outerjoin(models.Category, models.Category.id == models.Product.category_id)
+    if group_by == "supplier" or supplier:
+        query = query.outerjoin(models.Supplier, models.Supplier.id == models.Product.supplier_id)
+    if category:
+        query = query.filter(models.Category.name.ilike(f"%{category}%"))
+    if supplier:
+        query = query.filter(models.Supplier.name.ilike(f"%{supplier}%"))
+    rows = query.group_by(*columns[:-1]).order_by(period).all()
+
+    points = [
+        {"period": row.period.date(), "series": row.series if group is not None else None, "quantity": int(row.quantity or 0)}
+        for row in rows
+    ]
+    if group is not None:
+        totals = {}
+        for point in points:
+            totals[point["series"]] = totals.get(point["series"], 0) + point["quantity"]
+        kept = set(sorted(totals, key=lambda name: -totals[name])[:TREND_MAX_SERIES])
+        merged = {}
+        for point in points:
+            name = point["series"] if point["series"] in kept else "Autres"
+            key = (point["period"], name)
+            merged[key] = merged.get(key, 0) + point["quantity"]
+        points = [{"period": period, "series": name, "quantity": value} for (period, name), value in sorted(merged.items())]
+
+    return {"granularity": granularity, "days": days, "direction": direction, "points": points}
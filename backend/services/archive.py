@@ -0,0 +1,134 @@
+# services/archive.py
+"""
+Archive colonnaire (Arrow IPC) des lignes normalisées et validées de chaque source de données.
+
+Le fichier est écrit au fil de l'import, non compressé pour pouvoir être ouvert par memory-mapping
+(lecture en quelques millisecondes, sans re-parser le CSV/Excel d'origine). Il sert aux ré-ingestions,
+aux diffs des imports delta et aux analyses hors ligne (pyarrow / pandas / DuckDB...).
+"""
+import os
+from typing import Dict, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from services.parsing import RECORD_COLUMNS
+
+ARCHIVE_DIR = os.path.join("uploads", "archives")
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("source", pa.string()),  # file name, or file[sheet] for workbooks imported sheet by sheet
+    ("sku", pa.string()),
+    ("name", pa.string()),
+    ("category", pa.string()),
+    ("supplier_name", pa.string()),
+    ("unit_price", pa.float64()),
+    ("cost_price", pa.float64()),
+    ("quantity", pa.int64()),
+    ("warehouse", pa.string()),  # absent from archives written before warehouses were imported
+])
+
+# Attributes compared by delta imports (quantities are diffed separately).
+SNAPSHOT_COLUMNS = ('name', 'category', 'supplier_name', 'unit_price', 'cost_price')
+
+
+def archive_path(data_source_id) -> str:
+    return os.path.join(ARCHIVE_DIR, f"{data_source_id}.arrow")
+
+
+def delete_archive(data_source_id):
+    path = archive_path(data_source_id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _to_batch(clean: pd.DataFrame, source: str) -> pa.RecordBatch:
+    frame = clean[list(RECORD_COLUMNS)].assign(source=source, quantity=clean["quantity"].astype("Int64"))
+    return pa.RecordBatch.from_pandas(frame, schema=ARCHIVE_SCHEMA, preserve_index=False)
+
+
+class SourceArchive:
+    """
+    Écrit les frames validées d'un import dans l'archive de leur source (une par data source).
+    Les fichiers sont écrits à côté (.tmp) et ne remplacent l'archive précédente qu'au commit(),
+    une fois l'import réussi : un import delta lit encore l'ancienne archive pendant qu'il écrit la nouvelle.
+    """
+
+    def __init__(self):
+        self._writers: Dict[object, pa.ipc.RecordBatchFileWriter] = {}
+        self._closed: Dict[object, str] = {}
+
+    def write(self, data_source_id, clean: pd.DataFrame, source: str):
+        if data_source_id is None:
+            return
+        writer = self._writers.get(data_source_id)
+        if writer is None:
+            os.makedirs(ARCHIVE_DIR, exist_ok=True)
+            writer = pa.ipc.new_file(archive_path(data_source_id) + ".tmp", ARCHIVE_SCHEMA)
+            self._writers[data_source_id] = writer
+        if not clean.empty:
+            writer.write_batch(_to_batch(clean, source))
+
+    def close(self) -> Dict[object, str]:
+        """Termine l'écriture sans remplacer les archives en place ; retourne {data_source_id: fichier .tmp}."""
+        for writer in self._writers.values():
+            writer.close()
+        self._closed.update({data_source_id: archive_path(data_source_id) + ".tmp" for data_source_id in self._writers})
+        self._writers = {}
+        return dict(self._closed)
+
+    def commit(self) -> Dict[object, str]:
+        """Remplace les archives précédentes par celles de cet import ; retourne {data_source_id: chemin}."""
+        paths = {}
+        for data_source_id, tmp_path in self.close().items():
+            paths[data_source_id] = archive_path(data_source_id)
+            os.replace(tmp_path, paths[data_source_id])
+        self._closed = {}
+        return paths
+
+    def discard(self):
+        for tmp_path in self.close().values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._closed = {}
+
+
+def read_archive(path: str) -> pa.Table:
+    """Ouvre une archive par memory-mapping (sans copie) et retourne la table Arrow (schéma ARCHIVE_SCHEMA)."""
+    with pa.memory_map(path, "r") as source:
+        return _with_warehouse(pa.ipc.open_file(source).read_all())
+
+
+def _with_warehouse(data):
+    """Ajoute une colonne warehouse vide aux tables / blocs des archives antérieures aux entrepôts."""
+    if "warehouse" in data.schema.names:
+        return data
+    return data.append_column("warehouse", pa.nulls(data.num_rows, pa.string()))
+
+
+def iter_archive_frames(path: str) -> Iterator[pd.DataFrame]:
+    """Itère l'archive bloc par bloc (un bloc = un morceau de l'import d'origine)."""
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            frame = _with_warehouse(reader.get_batch(i)).to_pandas()
+            frame["quantity"] = frame["quantity"].astype(float)
+            yield frame
+
+
+def archive_snapshot(path: str) -> pd.DataFrame:
+    """
+    État agrégé d'une archive, indexé par (sku, warehouse) : attributs de la première occurrence du SKU
+    et somme des quantités entrées (positives) dans chaque entrepôt. Référence des imports delta.
+    Les lignes sans entrepôt ont warehouse = "" (clé d'index comparable, contrairement à NaN).
+    """
+    frame = read_archive(path).select(["sku", "warehouse", *SNAPSHOT_COLUMNS, "quantity"]).to_pandas()
+    frame["warehouse"] = frame["warehouse"].fillna("")
+    quantity = frame["quantity"].where(frame["quantity"] > 0, 0).fillna(0)
+    totals = quantity.groupby([frame["sku"], frame["warehouse"]], sort=False).sum().astype(np.int64)
+    attributes = frame.drop_duplicates("sku", keep="first").set_index("sku")[list(SNAPSHOT_COLUMNS)]
+    snapshot = attributes.reindex(totals.index.get_level_values("sku"))
+    snapshot.index = totals.index
+    snapshot["quantity"] = totals
+    return snapshot
@@ -0,0 +1,155 @@
+# services/bulk_writer.py
+import os
+import io
+import csv
+from typing import Dict, List, Sequence
+
+from sqlalchemy import insert, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+import models
+
+# Number of rows sent per multi-row INSERT statement (ORM path).
+BATCH_SIZE = 5000
+
+# Above this many rows in one write, products and movements go through
+# PostgreSQL COPY FROM STDIN instead of multi-row INSERTs.
+COPY_THRESHOLD_ROWS = int(os.getenv("COPY_THRESHOLD_ROWS", "10000"))
+
+PRODUCT_COPY_COLUMNS = (
+    "id", "tenant_id", "sku", "name", "description", "category_id", "supplier_id",
+    "unit_price", "cost_price", "reorder_point", "reorder_quantity", "lead_time_days", "data_source_id",
+)
+MOVEMENT_COPY_COLUMNS = (
+    "id", "tenant_id", "product_id", "warehouse_id", "movement_type", "quantity",
+    "unit_cost", "reference_type", "reference_id", "user_id", "notes", "timestamp",
+)
+
+
+def _batched(rows: List[dict], size: int = BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def insert_rows(db: Session, model, rows: List[dict]):
+    """INSERT multi-lignes par lots de BATCH_SIZE (chemin ORM, tous dialectes)."""
+    for batch in _batched(rows):
+        db.execute(insert(model), batch)
+
+
+def copy_supported(db: Session) -> bool:
+    """COPY n'est disponible qu'avec PostgreSQL via psycopg2 (cursor.copy_expert)."""
+    bind = db.get_bind()
+    return bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2"
+
+
+def _column_list(columns: Sequence[str]) -> str:
+    # Quoted: "timestamp" is a keyword in PostgreSQL
+    return ", ".join(f'"{col}"' for col in columns)
+
+
+def _use_copy(db: Session, rows: List[dict]) -> bool:
+    return len(rows) >= COPY_THRESHOLD_ROWS and copy_supported(db)
+
+
+def _copy_to_staging(db: Session, staging: str, source_table: str, columns: Sequence[str], rows: List[dict]):
+    """
+    Crée (ou vide) une table temporaire avec les colonnes `columns` de `source_table`, sans contraintes,
+    et y charge `rows` par COPY CSV. La table est détruite automatiquement à la fin de la transaction.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # None is written as an unquoted empty field, i.e. NULL for COPY ... CSV
+        writer.writerow([row.get(col) for col in columns])
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS "
+            f"SELECT {_column_list(columns)} FROM {source_table} WITH NO DATA"
+        )
+        cursor.execute(f"TRUNCATE {staging}")
+        cursor.copy_expert(f"COPY {staging} ({_column_list(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def _existing_products(db: Session, rows: List[dict]) -> Dict[str, object]:
+    """{sku: id} des produits déjà en base pour des lignes écartées par ON CONFLICT sur uq_product_sku."""
+    existing = {}
+    for batch in _batched(rows):
+        keys = [(row["tenant_id"], row["sku"]) for row in batch]
+        existing.update(db.query(models.Product.sku, models.Product.id).filter(
+            tuple_(models.Product.tenant_id, models.Product.sku).in_(keys)
+        ).all())
+    return existing
+
+
+def write_products(db: Session, rows: List[dict]) -> Dict[str, object]:
+    """
+    Écrit de nouveaux produits avec ON CONFLICT DO NOTHING sur uq_product_sku : par INSERT multi-lignes,
+    ou au-delà de COPY_THRESHOLD_ROWS par COPY + table de staging.
+
+    Retourne {sku: id} pour les SKUs déjà présents en base (insérés entre-temps par un autre import) :
+    l'appelant doit rattacher ses mouvements à ces ids plutôt qu'à ceux qu'il avait générés.
+    """
+    if not rows:
+        return {}
+    if not _use_copy(db, rows):
+        inserted = set()
+        for batch in _batched(rows):
+            statement = (
+                pg_insert(models.Product)
+                .on_conflict_do_nothing(constraint="uq_product_sku")
+                .returning(models.Product.id)
+            )
+            inserted.update(db.scalars(statement, batch))
+        return _existing_products(db, [row for row in rows if row["id"] not in inserted])
+
+    _copy_to_staging(db, "_staging_products", "products", PRODUCT_COPY_COLUMNS, rows)
+    cursor = db.connection().connection.cursor()
+    try:
+        # custom_data / currency / is_active are Python-side defaults on the model,
+        # so they are set explicitly here to match the ORM path.
+        cursor.execute(f"""
+            INSERT INTO products ({_column_list(PRODUCT_COPY_COLUMNS)}, currency, custom_data, is_active)
+            SELECT {_column_list(PRODUCT_COPY_COLUMNS)}, 'EUR', '{{}}'::json, true
+            FROM _staging_products
+            ON CONFLICT ON CONSTRAINT uq_product_sku DO NOTHING
+        """)
+        cursor.execute("""
+            SELECT s.sku, p.id
+            FROM _staging_products s
+            JOIN products p ON p.tenant_id = s.tenant_id AND p.sku = s.sku
+            WHERE p.id <> s.id
+        """)
+        return {sku: id_ for sku, id_ in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def write_movements(db: Session, rows: List[dict]):
+    """
+    Écrit des mouvements de stock. Au-delà de COPY_THRESHOLD_ROWS, passe par COPY + table de staging.
+    """
+    if not rows:
+        return
+    if not _use_copy(db, rows):
+        insert_rows(db, models.StockMovement, rows)
+        return
+
+    _copy_to_staging(db, "_staging_movements", "stock_movements", MOVEMENT_COPY_COLUMNS, rows)
+    cursor = db.connection().connection.cursor()
+    try:
+        # timestamp falls back to now() like the server default of the ORM path
+        select_list = _column_list(MOVEMENT_COPY_COLUMNS).replace('"timestamp"', 'COALESCE("timestamp", now())')
+        cursor.execute(f"""
+            INSERT INTO stock_movements ({_column_list(MOVEMENT_COPY_COLUMNS)}, movement_metadata)
+            SELECT {select_list}, '{{}}'::json
+            FROM _staging_movements
+        """)
+    finally:
+        cursor.close()
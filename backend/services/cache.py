@@ -0,0 +1,72 @@
+# services/cache.py
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+
+class TTLCache:
+    """
+    Cache mémoire borné (LRU) dont les entrées expirent après `ttl_seconds`.
+    Partagé entre threads (workers FastAPI, jobs) : toutes les opérations sont sous verrou.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # key -> (expires_at, value)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def normalize_entities(entities: dict) -> tuple:
+    """Entités comparables (clé de cache) : clés triées, valeurs vides ignorées, textes en minuscules."""
+    normalized = []
+    for key, value in sorted((entities or {}).items()):
+        if value is None or value == "":
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.lower().split())
+        elif isinstance(value, (list, dict)):
+            value = repr(value)
+        normalized.append((key, value))
+    return tuple(normalized)
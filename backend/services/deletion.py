@@ -0,0 +1,131 @@
+# services/deletion.py
+"""
+Suppression d'une source de données par petits lots, en arrière-plan.
+
+La requête HTTP se contente de marquer la source (INACTIVE / DELETING) ; le job supprime ensuite
+ses mouvements puis ses produits par lots de DELETE_BATCH_ROWS lignes, une transaction courte par lot
+(verrous brefs, WAL étalé), avec une pause entre deux lots pour laisser passer les autres requêtes.
+"""
+import os
+import time
+
+from sqlalchemy import select, delete, or_
+from sqlalchemy.orm import Session
+
+import models
+from services.archive import delete_archive
+from services.engine_pool import engine_pool
+from services.ingestion import SOURCE_REFERENCE_TYPE, delete_error_report
+from services.jobs import job_manager
+from services.upload_store import release_object
+
+DELETING = "DELETING"
+
+# Rows deleted per transaction.
+DELETE_BATCH_ROWS = int(os.getenv("DELETE_BATCH_ROWS", "5000"))
+# Pause between two batches, so that other tenants' queries get the I/O and locks.
+DELETE_PAUSE_SECONDS = float(os.getenv("DELETE_PAUSE_SECONDS", "0.05"))
+
+
+def is_deleting(data_source: models.DataSource) -> bool:
+    return data_source.last_sync_status == DELETING
+
+
+def not_deleting():
+    """Filtre SQL excluant les sources en cours de suppression."""
+    return or_(models.DataSource.last_sync_status.is_(None), models.DataSource.last_sync_status != DELETING)
+
+
+def mark_deleting(data_source: models.DataSource):
+    data_source.status = models.DataSourceStatus.INACTIVE
+    data_source.last_sync_status = DELETING
+    data_source.last_sync_error = None
+    data_source.sync_enabled = False
+
+
+def _delete_in_batches(db: Session, table, id_subquery_factory, on_batch) -> int:
+    total = 0
+    while True:
+        ids = id_subquery_factory().limit(DELETE_BATCH_ROWS).scalar_subquery()
+        deleted = db.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+        db.commit()
+        if not deleted:
+            return total
+        total += deleted
+        on_batch(deleted)
+        time.sleep(DELETE_PAUSE_SECONDS)
+
+
+def delete_data_source_in_batches(db: Session, data_source: models.DataSource, on_progress=None) -> dict:
+    """
+    Supprime les mouvements écrits par la source et ceux de ses produits, puis ses produits, par lots,
+    puis la source elle-même et ses fichiers (objet stocké, rapport d'erreurs, archive). Reprenable :
+    chaque lot est commité.
+    """
+    ds_id = data_source.id
+    counts = {"movements_deleted": 0, "products_deleted": 0}
+    products = models.Product.__table__
+    movements = models.StockMovement.__table__
+
+    def progress(key):
+        def on_batch(deleted):
+            counts[key] += deleted
+            if on_progress:
+                on_progress(counts)
+        return on_batch
+
+    source_products = select(products.c.id).where(products.c.data_source_id == ds_id)
+    # Movements written by the source, also on products it does not own (delta adjustments, syncs)
+    _delete_in_batches(
+        db, movements,
+        lambda: select(movements.c.id).where(
+            movements.c.tenant_id == data_source.tenant_id,
+            movements.c.reference_type == SOURCE_REFERENCE_TYPE,
+            movements.c.reference_id == str(ds_id)
+        ),
+        progress("movements_deleted")
+    )
+    # Then its products' other movements: the product cascade would otherwise delete them in one statement
+    _delete_in_batches(
+        db, movements,
+        lambda: select(movements.c.id).where(movements.c.product_id.in_(source_products)),
+        progress("movements_deleted")
+    )
+    _delete_in_batches(db, products, lambda: source_products, progress("products_deleted"))
+
+    if data_source.type == models.DataSourceType.FILE_UPLOAD:
+        release_object(db, data_source)
+    db.delete(data_source)
+    db.commit()
+
+    delete_error_report(ds_id)
+    delete_archive(ds_id)
+    engine_pool.invalidate(ds_id)
+    return counts
+
+
+def run_delete_job(job, db: Session, data_source_id):
+    """Point d'entrée exécuté par le JobManager pour la suppression d'une source."""
+    data_source = db.get(models.DataSource, data_source_id)
+    if data_source is None:
+        job.message = "Data source already deleted."
+        return
+    name = data_source.name
+
+    def report(counts):
+        job.report(counts["movements_deleted"] + counts["products_deleted"], **counts)
+
+    counts = delete_data_source_in_batches(db, data_source, on_progress=report)
+    report(counts)
+    job.message = (
+        f"Data source '{name}' deleted: {counts['products_deleted']} products, "
+        f"{counts['movements_deleted']} stock movements."
+    )
+
+
+def resume_pending_deletions(db: Session):
+    """Relance les suppressions interrompues (ex: redémarrage de l'API pendant un job)."""
+    pending = db.query(models.DataSource).filter(models.DataSource.last_sync_status == DELETING).all()
+    for data_source in pending:
+        job_manager.submit("delete", data_source.tenant_id, data_source.id, run_delete_job, data_source.id)
+    return len(pending)
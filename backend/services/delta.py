@@ -0,0 +1,194 @@
+# services/delta.py
+import os
+from typing import Dict, List, Any, Callable
+
+import pandas as pd
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+import models
+from services.ingestion import (
+    BulkIngestor, mark_imported, mark_failed, apply_pending_upload, discard_pending_upload
+)
+from services.archive import SNAPSHOT_COLUMNS, archive_snapshot
+from services.parsing import iter_file_chunks
+from services.bulk_writer import write_movements
+from services.upload_store import open_for_parsing, release_file
+
+
+def find_previous_version(db: Session, tenant_id, filename: str) -> models.DataSource | None:
+    """
+    Dernière source du tenant importée sous le même nom de fichier et disposant d'une archive colonnaire.
+    """
+    candidates = db.query(models.DataSource).filter(
+        models.DataSource.tenant_id == tenant_id,
+        models.DataSource.type == models.DataSourceType.FILE_UPLOAD,
+        models.DataSource.name == filename,
+        models.DataSource.status != models.DataSourceStatus.INACTIVE,
+        models.DataSource.connection_config["archive_path"].as_string().isnot(None)
+    ).order_by(models.DataSource.created_at.desc()).all()
+    for data_source in candidates:
+        if os.path.exists(data_source.connection_config["archive_path"]):
+            return data_source
+    return None
+
+
+def _attributes(snapshot: pd.DataFrame) -> pd.DataFrame:
+    """Attributs d'un snapshot (sku, warehouse), une ligne par SKU."""
+    skus = snapshot.index.get_level_values("sku")
+    return snapshot.loc[~skus.duplicated(), list(SNAPSHOT_COLUMNS)].droplevel("warehouse")
+
+
+def diff_snapshots(previous: pd.DataFrame, current: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Compare deux snapshots indexés par (sku, warehouse) (voir archive_snapshot).
+    - added : lignes des SKUs nouveaux (une par entrepôt)
+    - changed : SKUs communs dont un attribut (nom, catégorie, fournisseur, prix) a changé, indexés par SKU
+    - quantity_delta : écart de quantité par (sku, warehouse) (les lignes disparues passent à 0)
+    """
+    is_new = ~current.index.get_level_values("sku").isin(previous.index.get_level_values("sku"))
+    added = current[is_new]
+
+    current_attributes, previous_attributes = _attributes(current), _attributes(previous)
+    common = current_attributes.index.intersection(previous_attributes.index)
+    cur, prev = current_attributes.loc[common], previous_attributes.loc[common]
+    differs = (cur != prev) & ~(cur.isna() & prev.isna())
+    changed = cur[differs.any(axis=1)]
+
+    quantities = pd.concat(
+        [current["quantity"].rename("new"), previous["quantity"].rename("old")], axis=1
+    ).fillna(0)
+    quantities = quantities[~quantities.index.isin(added.index)]
+    delta = (quantities["new"] - quantities["old"]).astype("int64")
+
+    return {"added": added, "changed": changed, "quantity_delta": delta[delta != 0]}
+
+
+def ingest_delta(db: Session, data_source: models.DataSource, user_id, file_path: str, filename: str,
+                 on_progress: Callable[[BulkIngestor], None] | None = None) -> Dict[str, Any]:
+    """
+    Ré-import d'une nouvelle version d'un fichier : seul l'écart avec l'archive précédente est écrit
+    (nouveaux produits, produits modifiés, mouvements ADJUSTMENT pour les écarts de quantité).
+    Les écritures se font en une transaction : en cas d'échec, l'archive et le fichier précédents restent
+    en place ; le fichier précédent n'est libéré qu'après le commit.
+    """
+    ingestor = BulkIngestor(
+        db,
+        tenant_id=data_source.tenant_id,
+        user_id=user_id,
+        data_source_id=data_source.id,
+        source_label=filename
+    )
+    timer = ingestor.timer
+    try:
+        # The new version is validated and archived next to the previous archive
+        with open_for_parsing(file_path, filename) as parse_path:
+            for chunk in timer.iterate("read", iter_file_chunks(parse_path, filename)):
+                ingestor.parse(chunk)
+                if on_progress:
+                    on_progress(ingestor)
+        with timer.stage("diff"):
+            new_archive = ingestor.archive.close()[data_source.id]
+            previous = archive_snapshot(data_source.connection_config["archive_path"])
+            current = archive_snapshot(new_archive)
+            diff = diff_snapshots(previous, current)
+
+        # 1. New SKUs: regular ingestion (product creation + INBOUND movement per warehouse)
+        added = diff["added"].reset_index()
+        added["warehouse"] = added["warehouse"].where(added["warehouse"] != "", None)
+        added = added.to_dict("records")
+        ingestor.write_records(added)
+
+        # 2. Changed attributes, only on products owned by this source (master data rule)
+        # 3. Quantity deltas as signed ADJUSTMENT movements
+        changed = diff["changed"]
+        with timer.stage("write"):
+            update_owned_products(db, ingestor, data_source, changed)
+            movements = _adjustments(ingestor, diff["quantity_delta"], filename)
+            write_movements(db, movements)
+
+        with timer.stage("archive"):
+            paths = ingestor.archive.commit()
+        replaced = apply_pending_upload(data_source)
+        mark_imported(data_source, paths[data_source.id])
+        with timer.stage("commit"):
+            db.commit()
+    except Exception as e:
+        ingestor.archive.discard()
+        db.rollback()
+        mark_failed(data_source, e)
+        discard_pending_upload(db, data_source)
+        db.commit()
+        raise
+
+    if replaced:
+        release_file(db, replaced.get("file_path"), replaced.get("content_hash"))
+        db.commit()
+
+    return {
+        "ingestor": ingestor,
+        "added": len(added),
+        "updated": len(changed),
+        "adjusted": len(movements),
+    }
+
+
+def _stored_values(values: dict) -> tuple:
+    """Attributs d'un produit comparables entre une ligne de fichier et la ligne en base (prix en float, NaN = NULL)."""
+    prices = tuple(None if pd.isna(values[col]) else float(values[col]) for col in ("unit_price", "cost_price"))
+    return (values["name"], values["category_id"], values["supplier_id"]) + prices
+
+
+def update_owned_products(db: Session, ingestor: BulkIngestor, data_source: models.DataSource,
+                          changed: pd.DataFrame) -> int:
+    """
+    Met à jour en masse les attributs modifiés (frame indexée par SKU), uniquement sur les produits
+    appartenant à cette source et dont les valeurs diffèrent de celles en base. Retourne le nombre
+    de produits mis à jour.
+    """
+    if changed.empty:
+        return 0
+    owned = {
+        row.sku: row for row in db.query(
+            models.Product.sku, models.Product.id, models.Product.name, models.Product.category_id,
+            models.Product.supplier_id, models.Product.unit_price, models.Product.cost_price
+        ).filter(
+            models.Product.tenant_id == data_source.tenant_id,
+            models.Product.data_source_id == data_source.id,
+            models.Product.sku.in_(list(changed.index))
+        )
+    }
+    updates = []
+    for sku, row in zip(changed.index, changed.to_dict("records")):
+        current = owned.get(sku)
+        if current is None:
+            continue
+        values = {
+            "name": row["name"],
+            "category_id": ingestor.category_id(row["category"]),
+            "supplier_id": ingestor.supplier_id(row["supplier_name"]),
+            "unit_price": row["unit_price"],
+            "cost_price": row["cost_price"],
+        }
+        # Each UPDATE fires the product triggers: unchanged rows (e.g. a reprocess) are skipped
+        if _stored_values(values) != _stored_values(current._asdict()):
+            updates.append({"id": current.id, **values})
+    ingestor.flush_references()
+    if updates:
+        db.execute(update(models.Product), updates)
+    return len(updates)
+
+
+def _adjustments(ingestor: BulkIngestor, quantity_delta: pd.Series, filename: str) -> List[dict]:
+    """Un mouvement ADJUSTMENT signé par écart de quantité, dans l'entrepôt concerné."""
+    movements = []
+    for (sku, warehouse), delta in quantity_delta.items():
+        product_id = ingestor.product_id(sku)
+        if product_id is not None:
+            movements.append(ingestor.movement(
+                product_id, int(delta), movement_type="ADJUSTMENT", notes=f"Delta import via {filename}",
+                warehouse_id=ingestor.warehouse_id(warehouse or None)
+            ))
+    # Warehouses first seen in this version
+    ingestor.flush_references()
+    return movements
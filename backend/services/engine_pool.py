@@ -0,0 +1,138 @@
+# services/engine_pool.py
+"""
+Registre des engines SQLAlchemy vers les bases des clients (sources SQL_CONNECTOR).
+
+Un engine (petit pool de connexions) est conservé par data source et réutilisé par la validation,
+les synchronisations et les requêtes fédérées : ni déchiffrement de la configuration, ni nouvelle
+poignée de main TCP/TLS à chaque appel. L'entrée est indexée par une empreinte de la configuration
+de connexion : une configuration modifiée produit un nouvel engine, l'ancien est libéré.
+"""
+import os
+import time
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any
+
+from sqlalchemy.engine import Engine, URL, create_engine
+
+import models
+from encryption import decrypt_connection_config
+
+# Engines kept at most (least recently used ones are disposed first).
+ENGINE_POOL_MAX = int(os.getenv("ENGINE_POOL_MAX", "32"))
+# Engines unused for this long are disposed (their connections closed).
+ENGINE_IDLE_SECONDS = int(os.getenv("ENGINE_IDLE_SECONDS", "600"))
+# Connections per remote database: syncs and queries of a source are few and short.
+ENGINE_POOL_SIZE = int(os.getenv("ENGINE_POOL_SIZE", "2"))
+ENGINE_MAX_OVERFLOW = int(os.getenv("ENGINE_MAX_OVERFLOW", "2"))
+
+CONNECTION_KEYS = ("username", "password", "host", "port", "database")
+
+
+def remote_url(config: dict) -> URL:
+    """URL de connexion à la base du client (config déchiffrée)."""
+    missing = [key for key in ("username", "password", "host", "database") if not config.get(key)]
+    if missing:
+        raise ValueError(f"Missing required connection details: {', '.join(missing)}.")
+    return URL.create(
+        "postgresql+psycopg2",
+        username=config["username"],
+        password=config["password"],
+        host=config["host"],
+        port=int(config.get("port") or 5432),
+        database=config["database"],
+    )
+
+
+def create_remote_engine(config: dict) -> Engine:
+    return create_engine(
+        remote_url(config),
+        pool_size=ENGINE_POOL_SIZE,
+        max_overflow=ENGINE_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=ENGINE_IDLE_SECONDS,
+        connect_args={"connect_timeout": 5},
+    )
+
+
+def config_fingerprint(config: dict | None) -> str:
+    """Empreinte des paramètres de connexion (valeurs chiffrées : aucun déchiffrement nécessaire)."""
+    params = {key: (config or {}).get(key) for key in CONNECTION_KEYS}
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class EnginePool:
+    """Engines par data source, avec éviction LRU, libération des engines inactifs et invalidation."""
+
+    def __init__(self, max_engines: int = ENGINE_POOL_MAX, idle_seconds: int = ENGINE_IDLE_SECONDS):
+        self.max_engines = max_engines
+        self.idle_seconds = idle_seconds
+        # data_source_id -> (fingerprint, engine, last_used)
+        self._engines: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, data_source: models.DataSource) -> Engine:
+        key = str(data_source.id)
+        fingerprint = config_fingerprint(data_source.connection_config)
+        with self._lock:
+            self._dispose_idle()
+            entry = self._engines.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self.hits += 1
+                self._engines[key] = (fingerprint, entry[1], time.time())
+                self._engines.move_to_end(key)
+                return entry[1]
+            self.misses += 1
+
+        config = decrypt_connection_config(data_source.connection_config) or {}
+        if any(value == "DECRYPTION_FAILED" for value in config.values()):
+            raise ValueError("Failed to decrypt sensitive connection details.")
+        engine = create_remote_engine(config)
+
+        stale = []
+        with self._lock:
+            previous = self._engines.pop(key, None)
+            if previous is not None:
+                stale.append(previous[1])
+            self._engines[key] = (fingerprint, engine, time.time())
+            while len(self._engines) > self.max_engines:
+                stale.append(self._engines.popitem(last=False)[1][1])
+        for old in stale:
+            old.dispose()
+        return engine
+
+    def invalidate(self, data_source_id):
+        """À appeler quand la configuration d'une source change ou qu'elle est supprimée."""
+        with self._lock:
+            entry = self._engines.pop(str(data_source_id), None)
+        if entry is not None:
+            entry[1].dispose()
+
+    def dispose_all(self):
+        with self._lock:
+            entries, self._engines = list(self._engines.values()), OrderedDict()
+        for _, engine, _ in entries:
+            engine.dispose()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "engines": len(self._engines),
+                "max_engines": self.max_engines,
+                "hits": self.hits,
+                "misses": self.misses,
+                "checked_out": sum(engine.pool.checkedout() for _, engine, _ in self._engines.values()),
+            }
+
+    def _dispose_idle(self):
+        # Called with the lock held; disposing only closes idle pooled connections
+        cutoff = time.time() - self.idle_seconds
+        for key in [key for key, (_, _, last_used) in self._engines.items() if last_used < cutoff]:
+            self._engines.pop(key)[1].dispose()
+
+
+engine_pool = EnginePool()
@@ -0,0 +1,429 @@
+# services/federated.py
+"""
+Mode fédéré : les questions du chat sont exécutées directement sur la base du client
+(source SQL_CONNECTOR), sans copier ses données chez nous.
+
+connection_config :
+    "mode": "federated",
+    "federated": {
+        "products": {"table": "erp.articles", "columns": {"ref_art": "sku", "libelle": "name", "famille": "category",
+                                                          "fourn": "supplier_name", "pv": "unit_price", "pa": "cost_price",
+                                                          "qte": "quantity", "seuil": "reorder_point"}},
+        "stock": {"table": "erp.mouvements", "columns": {"ref_art": "sku", "qte": "quantity"}}   (optionnel)
+    }
+
+Les colonnes suivent le même sens que la synchronisation (distant -> local) ; seuls sku et name sont requis.
+Le stock vient de la somme des mouvements de la table "stock" si elle est déclarée, sinon de la colonne
+quantity des produits. Les requêtes passent par l'engine_pool, avec un statement_timeout, et les réponses
+sont gardées brièvement en cache par (tenant, intention, entités). L'historique des mouvements (dates,
+entrepôts) n'est pas mappé : tendances, stock passé et stock par entrepôt restent réservés aux données
+importées.
+"""
+import os
+from typing import Dict, Any
+
+from sqlalchemy import table, column, select, func, literal, null, distinct, case, tuple_
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import Session
+
+import models
+from services.analytics import MEASURES, measure_expression, histogram, histogram_bins, histogram_answer
+from services.cache import TTLCache, normalize_entities
+from services.engine_pool import engine_pool
+from services.pagination import LIST_PAGE_SIZE, LIST_PAGE_TTL_SECONDS
+from services.parsing import DEFAULT_CATEGORY
+from services.stock import status_condition
+
+# Remote statements taking longer than this are cancelled by the customer's server.
+FEDERATED_STATEMENT_TIMEOUT_MS = int(os.getenv("FEDERATED_STATEMENT_TIMEOUT_MS", "5000"))
+# Chat answers computed on a remote database are reused for this long.
+FEDERATED_CACHE_SECONDS = int(os.getenv("FEDERATED_CACHE_SECONDS", "60"))
+
+# (tenant_id, intent, entities) -> (answer, product list state)
+result_cache = TTLCache(ttl_seconds=FEDERATED_CACHE_SECONDS, max_entries=512)
+# tenant_id -> {"entities", "cursor": (sort key, sku), "shown"} of the last product list
+list_pages = TTLCache(ttl_seconds=LIST_PAGE_TTL_SECONDS, max_entries=1000)
+
+# Intents answered from the movement history (dates, warehouses) of imported data only.
+LOCAL_ONLY_INTENTS = {
+    "MOVEMENT_TREND": "l'évolution des entrées et sorties",
+    "STOCK_AS_OF": "le stock à une date passée",
+    "WAREHOUSE_STOCK": "le stock par entrepôt",
+}
+
+
+def federated_source(db: Session, tenant_id) -> models.DataSource | None:
+    """Source SQL du tenant configurée en mode fédéré (la plus récente), s'il y en a une."""
+    return db.query(models.DataSource).filter(
+        models.DataSource.tenant_id == tenant_id,
+        models.DataSource.type == models.DataSourceType.SQL_CONNECTOR,
+        models.DataSource.connection_config["mode"].as_string() == "federated",
+        models.DataSource.status != models.DataSourceStatus.INACTIVE
+    ).order_by(models.DataSource.created_at.desc()).first()
+
+
+def _remote_table(spec: dict, required: tuple):
+    """Table distante (sans réflexion) et ses colonnes indexées par nom local."""
+    if not spec or not spec.get("table"):
+        raise ValueError("Federated mode needs a 'table' for each mapped entity.")
+    local_to_remote = {local: remote for remote, local in (spec.get("columns") or {}).items()}
+    for field in required:
+        local_to_remote.setdefault(field, field)
+    schema, _, name = spec["table"].rpartition(".")
+    remote = table(name, *[column(c) for c in local_to_remote.values()], schema=schema or None)
+    return remote, {local: remote.c[name] for local, name in local_to_remote.items()}
+
+
+def product_view(config: dict):
+    """
+    Sous-requête normalisée sur la base distante : sku, name, category, supplier_name,
+    unit_price, cost_price, reorder_point, stock_level. Toutes les intentions sont compilées dessus.
+    """
+    mapping = config.get("federated") or {}
+    products, cols = _remote_table(mapping.get("products"), ("sku", "name"))
+
+    def field(name):
+        return cols[name] if name in cols else null()
+
+    source = products
+    if mapping.get("stock"):
+        _, stock_cols = _remote_table(mapping["stock"], ("sku", "quantity"))
+        totals = select(
+            stock_cols["sku"].label("sku"), func.sum(stock_cols["quantity"]).label("quantity")
+        ).group_by(stock_cols["sku"]).subquery("stock_totals")
+        source = products.outerjoin(totals, totals.c.sku == cols["sku"])
+        stock_level = func.coalesce(totals.c.quantity, 0)
+    elif "quantity" in cols:
+        stock_level = func.coalesce(cols["quantity"], 0)
+    else:
+        stock_level = literal(0)
+
+    return select(
+        cols["sku"].label("sku"),
+        cols["name"].label("name"),
+        func.coalesce(field("category"), DEFAULT_CATEGORY).label("category"),
+        field("supplier_name").label("supplier_name"),
+        field("unit_price").label("unit_price"),
+        field("cost_price").label("cost_price"),
+        field("reorder_point").label("reorder_point"),
+        stock_level.label("stock_level"),
+    ).select_from(source).subquery("products")
+
+
+class FederatedQueryService:
+    """Équivalent de QueryService pour une base distante (SQLAlchemy Core, sans ORM local)."""
+
+    def execute(self, data_source: models.DataSource, intent: str, entities: dict) -> Dict[str, Any]:
+        entities = entities or {}
+        tenant_id = str(data_source.tenant_id)
+        key = (tenant_id, intent, normalize_entities(entities))
+        # "page suivante" continues the tenant's last list: it depends on that state, not only on the question
+        cacheable = entities.get("page") != "next"
+        cached = result_cache.get(key) if cacheable else None
+        if cached is not None:
+            result, list_page = cached
+            if intent == "LIST_PRODUCTS":
+                # A cached first page must still be continuable with "page suivante"
+                if list_page is None:
+                    list_pages.delete(tenant_id)
+                else:
+                    list_pages.set(tenant_id, list_page)
+            return result
+
+        try:
+            result = self._dispatch(data_source, intent, entities)
+        except OperationalError as e:
+            # Timeouts (QueryCanceled) keep the engine; broken connections get a fresh one next time
+            if "statement timeout" not in str(e.orig):
+                engine_pool.invalidate(data_source.id)
+            print(f"DEBUG: Federated query failed on {data_source.name}: {e.orig}")
+            return {"text": f"La base connectée '{data_source.name}' n'a pas répondu à temps. Réessayez dans un instant."}
+        except (DBAPIError, ValueError, KeyError) as e:
+            print(f"DEBUG: Federated query failed on {data_source.name}: {getattr(e, 'orig', e)}")
+            return {"text": f"Impossible d'interroger la base connectée '{data_source.name}' : vérifiez le mapping des tables et colonnes."}
+
+        if cacheable:
+            list_page = list_pages.get(tenant_id) if intent == "LIST_PRODUCTS" else None
+            result_cache.set(key, (result, list_page))
+        return result
+
+    def _run(self, data_source: models.DataSource, statement):
+        engine = engine_pool.get(data_source)
+        with engine.begin() as connection:
+            # SET LOCAL does not take bind parameters; the value is an int from the environment
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(FEDERATED_STATEMENT_TIMEOUT_MS)}")
+            return connection.execute(statement).all()
+
+    def _dispatch(self, data_source: models.DataSource, intent: str, entities: dict) -> Dict[str, Any]:
+        view = product_view(data_source.connection_config or {})
+        run = lambda statement: self._run(data_source, statement)
+
+        if intent == "LIST_PRODUCTS":
+            return self._list_products(run, view, entities, str(data_source.tenant_id))
+        elif intent == "GET_STATS":
+            return self._get_stats(run, view, entities)
+        elif intent == "SEARCH_PRODUCT":
+            return self._search_product(run, view, entities.get("product_name", ""), entities)
+        elif intent == "LIST_SUPPLIERS":
+            return self._list_suppliers(run, view, entities)
+        elif intent == "SUPPLIER_STATS":
+            return self._supplier_stats(run, view)
+        elif intent == "PLOT_CHART":
+            return self._plot_chart(run, view, entities)
+        elif intent in LOCAL_ONLY_INTENTS:
+            return {"text": (
+                f"Je ne peux pas donner {LOCAL_ONLY_INTENTS[intent]} en mode fédéré : la base connectée "
+                f"'{data_source.name}' n'est interrogée que pour le catalogue et le stock courant."
+            )}
+        elif intent == "unknown":
+            return {"text": "Je n'ai pas bien compris votre demande. Essayez de reformuler (ex: 'Produits en rupture', 'Statistiques')."}
+        return {"text": f"Je comprends l'intention '{intent}', mais je ne sais pas encore la traiter sur une base connectée."}
+
+    @staticmethod
+    def _order(view, entities: dict):
+        sort_field, sort_order = entities.get("sort_field"), entities.get("sort_order")
+        target = {"price": view.c.unit_price, "quantity": view.c.stock_level}.get(sort_field)
+        if target is None:
+            return None
+        return target.desc() if sort_order == "DESC" else target.asc()
+
+    def _list_products(self, run, view, entities: dict, tenant_id: str) -> Dict[str, Any]:
+        """
+        Même logique que QueryService._handle_list_products : total réel via count(*) OVER (), page
+        suivante par keyset (clé de tri, sku) mémorisée pour le tenant ("page suivante").
+        """
+        page = None
+        if entities.get("page") == "next":
+            page = list_pages.get(tenant_id)
+            if page is None:
+                return {"text": "Il n'y a pas de liste en cours. Demandez d'abord des produits (ex: 'Produits en rupture')."}
+            entities = page["entities"]
+
+        query = select(view)
+        category_filter = entities.get("category")
+        if category_filter:
+            query = query.where(view.c.category.ilike(f"%{category_filter}%"))
+        supplier_filter = entities.get("supplier_name")
+        if supplier_filter:
+            query = query.where(view.c.supplier_name.ilike(f"%{supplier_filter}%"))
+
+        status_filter = entities.get("filter_status")
+        condition = status_condition(status_filter, view.c.stock_level, view.c.reorder_point)
+        if condition is not None:
+            query = query.where(condition)
+
+        # Sorting: (key, sku) is unique, so it can resume exactly after the last row shown
+        sort_field = entities.get("sort_field")
+        descending = entities.get("sort_order") == "DESC"
+        if sort_field == "price":
+            sort_key = func.coalesce(view.c.unit_price, 0)
+        elif sort_field == "quantity":
+            sort_key = view.c.stock_level
+        else:
+            sort_key = view.c.name
+        if page:
+            position = tuple_(sort_key, view.c.sku)
+            cursor = tuple_(*page["cursor"])
+            query = query.where(position < cursor if descending else position > cursor)
+        if descending:
+            query = query.order_by(sort_key.desc(), view.c.sku.desc())
+        else:
+            query = query.order_by(sort_key.asc(), view.c.sku.asc())
+
+        rows = run(query.add_columns(
+            sort_key.label("sort_key"),
+            func.count().over().label("total_count")
+        ).limit(LIST_PAGE_SIZE))
+
+        if not rows:
+            if page:
+                return {"text": "Il n'y a pas d'autres produits dans cette liste."}
+            msg = "Aucun produit trouvé"
+            if category_filter: msg += f" dans la catégorie '{category_filter}'"
+            if status_filter == "OUT_OF_STOCK": msg += " en rupture de stock"
+            elif status_filter == "LOW_STOCK": msg += " en stock faible"
+            return {"text": msg + "."}
+
+        shown_before = page["shown"] if page else 0
+        shown = shown_before + len(rows)
+        total = shown_before + rows[0].total_count
+
+        if page:
+            response = f"Produits {shown_before + 1} à {shown} sur {total} :\n"
+        else:
+            response = f"Voici les produits trouvés ({total}) :\n"
+        for row in rows:
+            stock = row.stock_level or 0
+            icon = "🔴" if stock <= 0 else "🟠" if stock < 10 else "🟢"
+            supp_str = f" | Fournisseur: {row.supplier_name}" if row.supplier_name else ""
+            response += f"{icon} **{row.name}** ({row.category})\n   Stock : {int(stock)} | Prix : {row.unit_price}€{supp_str}\n"
+
+        if shown < total:
+            last = rows[-1]
+            list_pages.set(tenant_id, {"entities": entities, "cursor": (last.sort_key, last.sku), "shown": shown})
+            response += f"... et {total - shown} autres. Dites « page suivante » pour voir la suite."
+        else:
+            list_pages.delete(tenant_id)
+        return {"text": response}
+
+    def _search_product(self, run, view, search_term: str, entities: dict) -> Dict[str, Any]:
+        order = self._order(view, entities)
+        if entities.get("sort_order") and order is not None:
+            rows = run(select(view).order_by(order).limit(1))
+            if not rows:
+                return {"text": "Aucun produit trouvé."}
+            row = rows[0]
+            sort_order, sort_field = entities.get("sort_order"), entities.get("sort_field")
+            supp_str = f" (Fournisseur: {row.supplier_name})" if row.supplier_name else ""
+            price_str = f", Prix: {row.unit_price}€" if row.unit_price else ""
+            return {"text": f"Le produit le { 'plus' if sort_order == 'DESC' else 'moins' } { 'cher' if sort_field == 'price' else 'disponible' } est **{row.name}** ({row.category}){supp_str}.\nStock: {int(row.stock_level or 0)}{price_str}"}
+
+        if not search_term:
+            return {"text": "Quel produit cherchez-vous ?"}
+
+        # Same tiers as the local search (exact > starts with > contains), ranked in one round-trip
+        rank = case(
+            (func.lower(view.c.name) == search_term.lower(), 0),
+            (view.c.name.istartswith(search_term, autoescape=True), 1),
+            else_=2
+        )
+        rows = run(
+            select(view).where(view.c.name.icontains(search_term, autoescape=True))
+            .order_by(rank, view.c.name).limit(11)
+        )
+        if not rows:
+            return {"text": f"Je n'ai pas trouvé de produit correspondant à '{search_term}'."}
+
+        response = f"Résultats pour '{search_term}' :\n"
+        for row in rows[:10]:
+            stock = row.stock_level or 0
+            supp_str = f" via {row.supplier_name}" if row.supplier_name else ""
+            response += f"{'🟢' if stock > 10 else '🔴'} **{row.name}** ({row.category}){supp_str} : {int(stock)} en stock\n"
+        if len(rows) > 10:
+            response += "... et d'autres."
+        return {"text": response}
+
+    def _get_stats(self, run, view, entities: dict) -> Dict[str, Any]:
+        from services.visualization import viz_service
+
+        if entities.get("stat_type") in ("by_product", "margin"):
+            priced = select(view).where(view.c.unit_price.isnot(None), view.c.cost_price.isnot(None)).subquery()
+            margin = (priced.c.unit_price - priced.c.cost_price)
+            top_5 = run(select(priced.c.name, priced.c.unit_price, margin.label("margin"))
+                        .order_by(margin.desc()).limit(5))
+            if not top_5:
+                return {"text": "Impossible de calculer les marges : prix de vente ou coût de revient manquants pour les produits."}
+            avg_margin = run(select(func.avg(margin)))[0][0]
+
+            chart_config = viz_service.create_bar_chart(
+                data=[{"product": row.name, "margin": float(row.margin)} for row in top_5],
+                x_key="product", y_key="margin", title="Top 5 Produits par Marge (Unit)",
+                x_label="Produit", y_label="Marge (€)"
+            )
+            response = f"**Analyse de Marge** :\nMarge moyenne par produit : {float(avg_margin):.2f}€.\n\nTop 5 produits les plus rentables :\n"
+            for row in top_5:
+                percent = float(row.margin) / float(row.unit_price) * 100 if row.unit_price else 0
+                response += f"- {row.name} : Marge {float(row.margin):.2f}€ ({percent:.1f}%)\n"
+            return {"text": response, "chart": chart_config}
+
+        by_category = self._category_counts(run, view)
+        product_count = sum(count for _, count in by_category)
+        chart_config = viz_service.create_bar_chart(
+            data=[{"category": name, "count": count} for name, count in by_category],
+            x_key="category", y_key="count", title="Nombre de produits par Catégorie",
+            x_label="Catégorie", y_label="Nombre de produits"
+        )
+        return {
+            "text": f" **Statistiques Globales** : Nous avons {product_count} produits répartis dans {len(by_category)} catégories.",
+            "chart": chart_config
+        }
+
+    @staticmethod
+    def _category_counts(run, view):
+        return run(select(view.c.category, func.count()).group_by(view.c.category))
+
+    def _list_suppliers(self, run, view, entities: dict) -> Dict[str, Any]:
+        category_filter = entities.get("category")
+        query = select(distinct(view.c.supplier_name)).where(view.c.supplier_name.isnot(None))
+        if category_filter:
+            query = query.where(view.c.category.ilike(f"%{category_filter}%"))
+        suppliers = [name for (name,) in run(query.order_by(view.c.supplier_name).limit(20))]
+
+        if not suppliers:
+            msg = "Aucun fournisseur trouvé"
+            if category_filter: msg += f" pour la catégorie '{category_filter}'"
+            return {"text": msg + "."}
+        response = f"Voici les fournisseurs trouvés ({len(suppliers)})"
+        if category_filter: response += f" pour '{category_filter}'"
+        response += " :\n"
+        for name in suppliers:
+            response += f"- **{name}**\n"
+        return {"text": response}
+
+    def _supplier_stats(self, run, view) -> Dict[str, Any]:
+        from services.visualization import viz_service
+
+        count = func.count().label("count")
+        stats = run(
+            select(view.c.supplier_name, count).where(view.c.supplier_name.isnot(None))
+            .group_by(view.c.supplier_name).order_by(count.desc()).limit(10)
+        )
+        if not stats:
+            return {"text": "Pas assez de données pour les statistiques fournisseurs."}
+        chart_config = viz_service.create_bar_chart(
+            data=[{"supplier": name, "count": n} for name, n in stats],
+            x_key="supplier", y_key="count", title="Top Fournisseurs (nombre de produits)",
+            x_label="Fournisseur", y_label="Nombre de produits"
+        )
+        return {
+            "text": f"Voici les fournisseurs avec le plus de produits. Le top est **{stats[0][0]}**.",
+            "chart": chart_config
+        }
+
+    def _plot_chart(self, run, view, entities: dict) -> Dict[str, Any]:
+        from services.visualization import viz_service
+
+        graph_type = entities.get("graph_type")
+        stat_type = entities.get("stat_type") or ("by_product" if graph_type == "histogram" else "by_category")
+
+        if stat_type == "by_category":
+            chart_data = [{"category": name, "count": n} for name, n in self._category_counts(run, view)]
+            if graph_type == "bar":
+                chart_config = viz_service.create_bar_chart(
+                    data=chart_data, x_key="category", y_key="count",
+                    title="Répartition par Catégorie", x_label="Catégorie", y_label="Nombre"
+                )
+            else:
+                chart_config = viz_service.create_pie_chart(
+                    data=chart_data, labels_key="category", values_key="count",
+                    title="Répartition du Stock par Catégorie"
+                )
+            return {"text": "Voici la répartition du stock par catégorie.", "chart": chart_config}
+
+        elif stat_type == "by_supplier":
+            return self._supplier_stats(run, view)
+
+        elif stat_type == "by_product":
+            if graph_type == "histogram":
+                # Binned on the remote server: one row per bucket, whatever the catalogue size
+                measure = entities.get("measure") if entities.get("measure") in MEASURES else "price"
+                quantiles = entities.get("bucket_mode") == "quantile"
+                value = measure_expression(measure, view.c.unit_price, view.c.cost_price, view.c.stock_level)
+                values = select(value.label("value")).where(value.isnot(None)).subquery()
+                buckets = histogram(run, values, histogram_bins(entities.get("bins")), quantiles)
+                if not buckets:
+                    return {"text": "Pas de données pour cette distribution."}
+                return histogram_answer(buckets, measure, quantiles)
+
+            rows = run(select(view).limit(20))
+            chart_config = viz_service.create_bar_chart(
+                data=[{"name": row.name, "price": float(row.unit_price) if row.unit_price else 0} for row in rows],
+                x_key="name", y_key="price", title="Prix des Produits (Top 20)",
+                x_label="Produit", y_label="Prix Unitaire (€)"
+            )
+            return {"text": "Voici le graphique des prix pour les premiers produits.", "chart": chart_config}
+
+        return {"text": "Je ne peux pas encore générer ce type de graphique."}
+
+
+federated_query_service = FederatedQueryService()
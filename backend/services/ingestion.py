@@ -0,0 +1,710 @@
+# services/ingestion.py
+import os
+import time
+import uuid
+from contextlib import contextmanager, ExitStack
+from typing import Dict, List, Any, Callable, Iterable
+
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+from services.bulk_writer import insert_rows, write_products, write_movements
+from services.upload_store import (
+    PENDING_UPLOAD, StoredUpload, open_for_parsing, find_duplicate, keep_object, discard_upload, release_file
+)
+from services.parsing import MAX_REPORTED_ERRORS, iter_file_chunks, list_sheets, validate_frame, to_records, parse_parts
+from services.archive import SNAPSHOT_COLUMNS, SourceArchive, iter_archive_frames
+
+# Full per-source report of the rows rejected by validation (downloadable).
+REPORT_DIR = os.path.join("uploads", "reports")
+REPORT_COLUMNS = ['source', 'row', 'sku', 'error']
+
+# Movements written by an import / sync carry the source that wrote them, so that a reprocess or a
+# failed import can remove exactly those (reference_id = data source id).
+SOURCE_REFERENCE_TYPE = "DATA_SOURCE"
+
+# Outcome of register_upload: what the stored upload has to go through.
+UPLOAD_DUPLICATE = "duplicate"
+UPLOAD_DELTA = "delta"
+UPLOAD_FULL = "full"
+
+
+class StageTimer:
+    """
+    Cumule le temps passé (en secondes) dans chaque étape d'un import : lecture du fichier,
+    parsing, chargement des référentiels, écritures, commits...
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+    def iterate(self, name: str, iterable: Iterable):
+        """Itère `iterable` en comptant le temps de production de chaque élément dans l'étape `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def to_dict(self) -> Dict[str, float]:
+        return {name: round(seconds, 3) for name, seconds in self.seconds.items()}
+
+
+def error_report_path(data_source_id) -> str:
+    return os.path.join(REPORT_DIR, f"{data_source_id}.csv")
+
+
+def delete_error_report(data_source_id):
+    path = error_report_path(data_source_id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class ErrorReport:
+    """
+    Rapport complet des lignes rejetées (source, ligne, SKU, motif), écrit en CSV au fil de l'import,
+    un fichier par source de données. Chaque import remplace le rapport du précédent.
+    """
+
+    def __init__(self):
+        self._started = set()
+
+    def write(self, data_source_id, rejected: pd.DataFrame):
+        if data_source_id is None:
+            return
+        first = data_source_id not in self._started
+        if not first and rejected.empty:
+            return
+        if first:
+            os.makedirs(REPORT_DIR, exist_ok=True)
+            self._started.add(data_source_id)
+        rejected.reindex(columns=REPORT_COLUMNS).to_csv(
+            error_report_path(data_source_id), mode="w" if first else "a", header=first, index=False
+        )
+
+
+class BulkIngestor:
+    """
+    Moteur d'ingestion ensembliste pour une source de données.
+
+    Les catégories, fournisseurs, entrepôts et SKUs existants du tenant sont chargés
+    une seule fois en mémoire ; les entités manquantes, les produits et les
+    mouvements de stock sont ensuite écrits par INSERT multi-lignes au lieu
+    d'un aller-retour SQL par ligne.
+    """
+
+    def __init__(self, db: Session, tenant_id, user_id, data_source_id, source_label: str,
+                 keep_archive: bool = True):
+        self.db = db
+        self.tenant_id = tenant_id
+        self.user_id = user_id
+        self.data_source_id = data_source_id
+        self.source_label = source_label
+        self.timer = StageTimer()
+
+        self.rows_read = 0
+        self.processed_count = 0
+        self.error_count = 0
+        self.errors: List[str] = []
+        self.error_report = ErrorReport()
+        self.archive = SourceArchive() if keep_archive else None
+        # Date given to the movements written (None: now(), the column default), and per
+        # (product, warehouse) dates that take precedence over it
+        self.movement_timestamp = None
+        self.movement_timestamps: Dict[tuple, Any] = {}
+
+        self._categories: Dict[str, Any] | None = None
+        self._suppliers: Dict[str, Any] = {}
+        self._warehouses: Dict[str, Any] = {}
+        self._products: Dict[str, Any] = {}
+
+        self._new_categories: List[dict] = []
+        self._new_suppliers: List[dict] = []
+        self._new_warehouses: List[dict] = []
+
+    def _load_lookups(self):
+        """Charge les référentiels existants du tenant (un SELECT par table)."""
+        with self.timer.stage("lookups"):
+            self._fetch_lookups()
+
+    def _fetch_lookups(self):
+        self._categories = {
+            name: id_ for name, id_ in self.db.query(models.Category.name, models.Category.id)
+            .filter(models.Category.tenant_id == self.tenant_id)
+        }
+        self._suppliers = {
+            name: id_ for name, id_ in self.db.query(models.Supplier.name, models.Supplier.id)
+            .filter(models.Supplier.tenant_id == self.tenant_id)
+        }
+        # Files name a warehouse by its code or its name
+        self._warehouses = {}
+        for code, name, id_ in self.db.query(models.Warehouse.code, models.Warehouse.name, models.Warehouse.id).filter(
+            models.Warehouse.tenant_id == self.tenant_id
+        ):
+            self._warehouses.setdefault(name, id_)
+            self._warehouses[code] = id_
+        self._products = {
+            sku: id_ for sku, id_ in self.db.query(models.Product.sku, models.Product.id)
+            .filter(models.Product.tenant_id == self.tenant_id)
+        }
+
+    def product_id(self, sku: str):
+        if self._categories is None:
+            self._load_lookups()
+        return self._products.get(sku)
+
+    def parse(self, df: pd.DataFrame) -> List[dict]:
+        """
+        Normalise et convertit un DataFrame en enregistrements {sku, name, category, supplier_name,
+        unit_price, cost_price, quantity, warehouse}, sans écriture en base. Les lignes invalides sont comptées
+        dans self.errors (contrat 'processed_count'/'errors').
+        """
+        with self.timer.stage("parse"):
+            return self._parse(df)
+
+    def _parse(self, df: pd.DataFrame) -> List[dict]:
+        clean, rejected = validate_frame(df)
+        rejected.insert(0, "source", self.source_label)
+        return self.absorb(len(df), clean, rejected)
+
+    def absorb(self, rows_read: int, clean: pd.DataFrame, rejected: pd.DataFrame,
+               data_source_id=None, source: str | None = None) -> List[dict]:
+        """
+        Cumule les compteurs d'un morceau validé (ici ou dans un processus du pool), archive ses lignes
+        propres, ajoute ses lignes rejetées au rapport d'erreurs de la source et retourne ses enregistrements.
+        """
+        data_source_id = data_source_id or self.data_source_id
+        self.rows_read += rows_read
+        self.processed_count += len(clean)
+        self.error_count += len(rejected)
+        kept = rejected.iloc[:MAX_REPORTED_ERRORS - len(self.errors)]
+        for source, row, error in zip(kept["source"], kept["row"], kept["error"]):
+            prefix = "" if source == self.source_label else f"{source} "
+            self.errors.append(f"{prefix}Row {row}: {error}")
+        self.error_report.write(data_source_id, rejected)
+        if self.archive is not None:
+            self.archive.write(data_source_id, clean, source or self.source_label)
+        return to_records(clean)
+
+    def ingest(self, df: pd.DataFrame) -> int:
+        """
+        Ingère un DataFrame (ou un morceau de fichier) et retourne le nombre de lignes traitées.
+        """
+        if self._categories is None:
+            self._load_lookups()
+        records = self.parse(df)
+        self.write_records(records)
+        return len(records)
+
+    def category_id(self, name: str):
+        if self._categories is None:
+            self._load_lookups()
+        category_id = self._categories.get(name)
+        if category_id is None:
+            category_id = uuid.uuid4()
+            self._categories[name] = category_id
+            self._new_categories.append({"id": category_id, "name": name, "tenant_id": self.tenant_id})
+        return category_id
+
+    def supplier_id(self, name: str | None):
+        if name is None:
+            return None
+        if self._categories is None:
+            self._load_lookups()
+        supplier_id = self._suppliers.get(name)
+        if supplier_id is None:
+            supplier_id = uuid.uuid4()
+            self._suppliers[name] = supplier_id
+            self._new_suppliers.append({"id": supplier_id, "name": name, "tenant_id": self.tenant_id})
+        return supplier_id
+
+    def warehouse_id(self, name: str | None):
+        """Entrepôt désigné par son code ou son nom ; créé (code = nom = valeur du fichier) s'il est inconnu."""
+        if name is None:
+            return None
+        if self._categories is None:
+            self._load_lookups()
+        warehouse_id = self._warehouses.get(name)
+        if warehouse_id is None:
+            warehouse_id = uuid.uuid4()
+            self._warehouses[name] = warehouse_id
+            self._new_warehouses.append({"id": warehouse_id, "code": name, "name": name, "tenant_id": self.tenant_id})
+        return warehouse_id
+
+    def flush_references(self):
+        """Écrit les catégories, fournisseurs et entrepôts créés depuis le dernier appel."""
+        insert_rows(self.db, models.Category, self._new_categories)
+        insert_rows(self.db, models.Supplier, self._new_suppliers)
+        insert_rows(self.db, models.Warehouse, self._new_warehouses)
+        self._new_categories, self._new_suppliers, self._new_warehouses = [], [], []
+
+    def movement(self, product_id, quantity: int, movement_type: str = "INBOUND", notes: str | None = None,
+                 warehouse_id=None, data_source_id=None) -> dict:
+        """Mouvement à écrire, marqué de la source qui l'écrit (celle de l'ingesteur par défaut)."""
+        data_source_id = data_source_id or self.data_source_id
+        movement = {
+            "id": uuid.uuid4(),
+            "product_id": product_id,
+            "warehouse_id": warehouse_id,
+            "movement_type": movement_type,
+            "quantity": quantity,
+            "reference_type": SOURCE_REFERENCE_TYPE if data_source_id else None,
+            "reference_id": str(data_source_id) if data_source_id else None,
+            "notes": notes or f"Import via {self.source_label}",
+            "user_id": self.user_id,
+            "tenant_id": self.tenant_id
+        }
+        timestamp = self.movement_timestamps.get((product_id, warehouse_id), self.movement_timestamp)
+        if timestamp is not None:
+            movement["timestamp"] = timestamp
+        return movement
+
+    def write_records(self, records: List[dict], data_source_id=None):
+        """
+        Crée les catégories, fournisseurs, entrepôts et produits manquants puis un mouvement INBOUND
+        par enregistrement de quantité positive (dans l'entrepôt de l'enregistrement), le tout par lots.
+        `data_source_id` rattache les nouveaux produits à une autre source que celle de l'ingesteur
+        (imports groupés : un seul ingesteur, donc un seul cache de référentiels, pour plusieurs sources).
+        """
+        if self._categories is None:
+            self._load_lookups()
+        with self.timer.stage("write"):
+            self._write_records(records, data_source_id or self.data_source_id)
+
+    def _write_records(self, records: List[dict], data_source_id):
+        new_products: List[dict] = []
+        movements: List[dict] = []
+        for record in records:
+            sku = record["sku"]
+            category_id = self.category_id(record["category"])
+            supplier_id = self.supplier_id(record["supplier_name"])
+
+            # Create Product. Existing products are master data: we do NOT
+            # overwrite their data_source_id to prevent accidental cascades.
+            product_id = self._products.get(sku)
+            if product_id is None:
+                product_id = uuid.uuid4()
+                self._products[sku] = product_id
+                new_products.append({
+                    "id": product_id,
+                    "sku": sku,
+                    "name": record["name"],
+                    "category_id": category_id,
+                    "unit_price": record["unit_price"],
+                    "cost_price": record["cost_price"],
+                    "supplier_id": supplier_id,
+                    "tenant_id": self.tenant_id,
+                    "data_source_id": data_source_id  # LINKED VIA CASCADE
+                })
+
+            qty = record["quantity"]
+            if qty is not None and qty > 0:
+                warehouse_id = self.warehouse_id(record.get("warehouse"))
+                movements.append(self.movement(product_id, qty, warehouse_id=warehouse_id, data_source_id=data_source_id))
+
+        # Parents first so foreign keys resolve inside the same transaction
+        self.flush_references()
+        remapped = write_products(self.db, new_products)
+        if remapped:
+            # SKUs created concurrently by another import: link to the existing rows
+            self._products.update(remapped)
+            remapped_ids = {p["id"]: remapped[p["sku"]] for p in new_products if p["sku"] in remapped}
+            for mv in movements:
+                mv["product_id"] = remapped_ids.get(mv["product_id"], mv["product_id"])
+        write_movements(self.db, movements)
+
+
+def ingest_file(db: Session, data_source: models.DataSource, user_id, file_path: str, filename: str,
+                on_progress: Callable[[BulkIngestor], None] | None = None) -> BulkIngestor:
+    """
+    Ingère un fichier déjà sur disque, morceau par morceau (un commit par morceau),
+    et tient à jour DataSource.status / last_sync_status au fil de l'eau. En cas d'échec, les
+    morceaux déjà validés sont retirés (purge_source_data) : un nouvel envoi repart de zéro.
+    """
+    ingestor = BulkIngestor(
+        db,
+        tenant_id=data_source.tenant_id,
+        user_id=user_id,
+        data_source_id=data_source.id,
+        source_label=filename
+    )
+    timer = ingestor.timer
+    try:
+        with open_for_parsing(file_path, filename) as parse_path:
+            for chunk in timer.iterate("read", iter_file_chunks(parse_path, filename)):
+                ingestor.ingest(chunk)
+                data_source.last_sync_status = "PROCESSING"
+                with timer.stage("commit"):
+                    db.commit()
+                if on_progress:
+                    on_progress(ingestor)
+
+        with timer.stage("archive"):
+            paths = ingestor.archive.commit()
+        mark_imported(data_source, paths.get(data_source.id))
+        with timer.stage("commit"):
+            db.commit()
+    except Exception as e:
+        ingestor.archive.discard()
+        db.rollback()
+        purge_source_data(db, data_source)
+        mark_failed(data_source, e)
+        db.commit()
+        raise
+    return ingestor
+
+
+def mark_imported(data_source: models.DataSource, archive_path: str | None):
+    """Source importée avec succès ; l'archive colonnaire est référencée dans connection_config."""
+    if archive_path:
+        data_source.connection_config = {**(data_source.connection_config or {}), "archive_path": archive_path}
+    data_source.status = models.DataSourceStatus.ACTIVE
+    data_source.last_sync_status = "COMPLETED"
+    data_source.last_sync_error = None
+    data_source.last_sync_at = func.now()
+
+
+def mark_failed(data_source: models.DataSource, error: Exception):
+    data_source.status = models.DataSourceStatus.ERROR
+    data_source.last_sync_status = "FAILED"
+    data_source.last_sync_error = str(error)[:255]
+
+
+def apply_pending_upload(data_source: models.DataSource) -> Dict[str, Any] | None:
+    """
+    Le fichier reçu pour un delta (voir register_upload) devient le fichier de la source.
+    Retourne l'ancienne configuration, dont le fichier est à libérer une fois le delta commité.
+    """
+    config = dict(data_source.connection_config or {})
+    pending = config.pop(PENDING_UPLOAD, None)
+    if not pending:
+        return None
+    data_source.connection_config = {**config, **pending}
+    return config
+
+
+def discard_pending_upload(db: Session, data_source: models.DataSource):
+    """Delta abandonné : la source garde son fichier précédent, le fichier reçu est libéré."""
+    config = dict(data_source.connection_config or {})
+    pending = config.pop(PENDING_UPLOAD, None)
+    if pending:
+        data_source.connection_config = config
+        # Sessions do not autoflush: release_file must not see the pending reference
+        db.flush()
+        release_file(db, pending.get("file_path"), pending.get("content_hash"))
+
+
+def _source_movements(db: Session, data_source, *columns):
+    return db.query(*(columns or (models.StockMovement,))).filter(
+        models.StockMovement.tenant_id == data_source.tenant_id,
+        models.StockMovement.reference_type == SOURCE_REFERENCE_TYPE,
+        models.StockMovement.reference_id == str(data_source.id)
+    )
+
+
+def delete_source_movements(db: Session, data_source) -> int:
+    """Supprime les mouvements écrits par une source (imports, deltas, synchronisations) ; retourne leur nombre."""
+    return _source_movements(db, data_source).delete(synchronize_session=False)
+
+
+def purge_source_data(db: Session, data_source) -> int:
+    """
+    Retire ce qu'un import interrompu a déjà validé : ses mouvements, puis ses produits qui n'ont
+    aucun autre mouvement (ceux que d'autres sources alimentent entre-temps sont conservés).
+    Retourne le nombre de mouvements supprimés ; le commit reste à l'appelant.
+    """
+    movements = delete_source_movements(db, data_source)
+    db.query(models.Product).filter(
+        models.Product.tenant_id == data_source.tenant_id,
+        models.Product.data_source_id == data_source.id,
+        ~db.query(models.StockMovement.id).filter(
+            models.StockMovement.product_id == models.Product.id
+        ).exists()
+    ).delete(synchronize_session=False)
+    return movements
+
+
+def recover_interrupted_imports(db: Session) -> int:
+    """
+    Imports de fichiers restés en file ou en cours à l'arrêt de l'API (au démarrage, aucun job ne tourne) :
+    passés en ERROR pour pouvoir être renvoyés. Les morceaux validés d'un premier import sont retirés ;
+    une source déjà importée (delta, transaction unique) garde sa version précédente.
+    """
+    interrupted = db.query(models.DataSource).filter(
+        models.DataSource.type == models.DataSourceType.FILE_UPLOAD,
+        models.DataSource.last_sync_status.in_(["QUEUED", "PROCESSING"])
+    ).all()
+    try:
+        for data_source in interrupted:
+            if not (data_source.connection_config or {}).get("archive_path"):
+                purge_source_data(db, data_source)
+            discard_pending_upload(db, data_source)
+            mark_failed(data_source, RuntimeError("Import interrupted by a server restart. Upload the file again."))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(interrupted)
+
+
+def reprocess_data_source(db: Session, data_source: models.DataSource, user_id,
+                          on_progress: Callable[[BulkIngestor], None] | None = None) -> BulkIngestor:
+    """
+    Reconstruit les données d'une source à partir de son archive colonnaire, sans re-parser le fichier
+    d'origine, dans une seule transaction : seuls les mouvements écrits par la source sont supprimés, ses
+    produits sont mis à jour sur place (les mouvements des autres sources et les saisies manuelles restent),
+    puis l'archive est ré-ingérée bloc par bloc : chaque mouvement reconstruit garde la date de celui qu'il
+    remplace (les lignes sans mouvement d'origine sont datées du premier import de la source).
+    """
+    # Imported here: services.delta builds on this module
+    from services.delta import update_owned_products
+
+    path = (data_source.connection_config or {}).get("archive_path")
+    if not path or not os.path.exists(path):
+        raise ValueError(f"Data source {data_source.id} has no archive to reprocess.")
+
+    ingestor = BulkIngestor(
+        db,
+        tenant_id=data_source.tenant_id,
+        user_id=user_id,
+        data_source_id=data_source.id,
+        source_label=data_source.name
+    )
+    timer = ingestor.timer
+    try:
+        with timer.stage("write"):
+            # Keep the history where it was: daily rollups and snapshots are not shifted to today
+            ingestor.movement_timestamp = _source_movements(
+                db, data_source, func.min(models.StockMovement.timestamp)
+            ).scalar()
+            movement = models.StockMovement
+            ingestor.movement_timestamps = {
+                (product_id, warehouse_id): timestamp
+                for product_id, warehouse_id, timestamp in _source_movements(
+                    db, data_source, movement.product_id, movement.warehouse_id, func.min(movement.timestamp)
+                ).filter(movement.movement_type == "INBOUND").group_by(movement.product_id, movement.warehouse_id)
+            }
+            delete_source_movements(db, data_source)
+
+        for frame in timer.iterate("read", iter_archive_frames(path)):
+            records = to_records(frame)
+            ingestor.rows_read += len(records)
+            ingestor.processed_count += len(records)
+            with timer.stage("write"):
+                attributes = frame.drop_duplicates("sku").set_index("sku")[list(SNAPSHOT_COLUMNS)]
+                update_owned_products(db, ingestor, data_source, attributes)
+            ingestor.write_records(records)
+            if on_progress:
+                on_progress(ingestor)
+
+        mark_imported(data_source, path)
+        with timer.stage("commit"):
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        mark_failed(data_source, e)
+        db.commit()
+        raise
+    return ingestor
+
+
+def run_reprocess_job(job, db: Session, data_source_id, user_id):
+    """Point d'entrée exécuté par le JobManager pour une ré-ingestion depuis l'archive."""
+    data_source = db.get(models.DataSource, data_source_id)
+
+    def report(ingestor: BulkIngestor):
+        job.report(ingestor.rows_read, ingestor.error_count, ingestor.errors,
+                   processed_count=ingestor.processed_count, timings=ingestor.timer.to_dict())
+
+    ingestor = reprocess_data_source(db, data_source, user_id, on_progress=report)
+    report(ingestor)
+    job.message = f"Data source '{data_source.name}' reprocessed from its archive. {ingestor.processed_count} items."
+
+
+def register_upload(db: Session, tenant_id, stored: StoredUpload, filename: str,
+                    delta: bool = True) -> tuple[str, models.DataSource]:
+    """
+    Rattache un upload stocké à une source de données, avant toute ingestion :
+    - UPLOAD_DUPLICATE : le tenant a déjà importé ces octets, la source existante est retournée ;
+    - UPLOAD_DELTA : nouvelle version d'un fichier déjà importé sous ce nom (si `delta`) ;
+    - UPLOAD_FULL : nouvelle source, à ingérer entièrement.
+    Point d'entrée commun à l'API et à l'application Streamlit.
+    """
+    # Imported here: services.delta builds on this module
+    from services.delta import find_previous_version
+
+    duplicate = find_duplicate(db, tenant_id, stored.content_hash)
+    if duplicate:
+        discard_upload(stored)
+        return UPLOAD_DUPLICATE, duplicate
+
+    file_config = {"file_path": stored.path, "content_hash": stored.content_hash, "size": stored.size}
+    previous = find_previous_version(db, tenant_id, filename) if delta else None
+    if previous:
+        try:
+            keep_object(db, stored)
+            # The previous file stays in use until the delta is committed (see apply_pending_upload)
+            previous.connection_config = {**previous.connection_config, PENDING_UPLOAD: file_config}
+            previous.status = models.DataSourceStatus.PENDING
+            previous.last_sync_status = "QUEUED"
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return UPLOAD_DELTA, previous
+
+    # The DataSource record is created FIRST: the ingestion updates its status as it goes
+    try:
+        keep_object(db, stored)
+        data_source = models.DataSource(
+            name=filename,
+            type=models.DataSourceType.FILE_UPLOAD,
+            connection_config={**file_config, "original_name": filename},
+            tenant_id=tenant_id,
+            status=models.DataSourceStatus.PENDING,
+            last_sync_status="QUEUED",
+            last_sync_at=func.now()
+        )
+        db.add(data_source)
+        db.commit()
+        db.refresh(data_source)
+    except Exception:
+        db.rollback()
+        raise
+    return UPLOAD_FULL, data_source
+
+
+def run_upload(db: Session, mode: str, data_source: models.DataSource, user_id, file_path: str, filename: str,
+               on_progress: Callable[[BulkIngestor], None] | None = None) -> Dict[str, Any]:
+    """
+    Ingère un upload enregistré par register_upload (import complet ou delta) et retourne un résumé :
+    {message, rows_read, processed_count, error_count, errors, timings, ...}.
+    """
+    if mode == UPLOAD_DELTA:
+        from services.delta import ingest_delta
+
+        result = ingest_delta(db, data_source, user_id, file_path, filename, on_progress=on_progress)
+        ingestor = result.pop("ingestor")
+        message = (
+            f"File '{filename}' re-imported: {result['added']} new, "
+            f"{result['updated']} updated, {result['adjusted']} stock adjustments."
+        )
+    else:
+        ingestor = ingest_file(db, data_source, user_id, file_path, filename, on_progress=on_progress)
+        result = {}
+        message = f"File '{filename}' processed. {ingestor.processed_count} items."
+
+    return {
+        "message": message,
+        **ingestion_progress(ingestor),
+        **result,
+    }
+
+
+def ingestion_progress(ingestor: BulkIngestor) -> Dict[str, Any]:
+    """Compteurs et durées par étape d'un import en cours ou terminé."""
+    return {
+        "rows_read": ingestor.rows_read,
+        "processed_count": ingestor.processed_count,
+        "error_count": ingestor.error_count,
+        "errors": ingestor.errors,
+        "timings": ingestor.timer.to_dict(),
+    }
+
+
+def run_upload_job(job, db: Session, mode: str, data_source_id, user_id, file_path: str, filename: str):
+    """Point d'entrée exécuté par le JobManager pour un upload (import complet ou delta)."""
+    data_source = db.get(models.DataSource, data_source_id)
+
+    def report(ingestor: BulkIngestor):
+        job.report(ingestor.rows_read, ingestor.error_count, ingestor.errors,
+                   processed_count=ingestor.processed_count, timings=ingestor.timer.to_dict())
+
+    summary = run_upload(db, mode, data_source, user_id, file_path, filename, on_progress=report)
+    job.report(summary.pop("rows_read"), summary.pop("error_count"), summary.pop("errors"),
+               **{key: value for key, value in summary.items() if key != "message"})
+    job.message = summary["message"]
+
+
+def ingest_batch(db: Session, tenant_id, user_id, uploads: List[tuple], all_sheets: bool = True,
+                 on_progress: Callable[[BulkIngestor], None] | None = None) -> BulkIngestor:
+    """
+    Ingère plusieurs fichiers (et/ou toutes les feuilles de chaque classeur) en une fois.
+    `uploads` : liste de (data_source, file_path, filename), une source par fichier.
+
+    Chaque feuille est parsée dans un processus du pool (parse_parts) ; les résultats sont écrits
+    au fil de l'eau par un seul ingesteur (un seul cache de référentiels, un commit par feuille).
+    """
+    ingestor = BulkIngestor(
+        db,
+        tenant_id=tenant_id,
+        user_id=user_id,
+        data_source_id=None,
+        source_label=", ".join(filename for _, _, filename in uploads)
+    )
+    timer = ingestor.timer
+    try:
+        with ExitStack() as stack:
+            parts, owners = [], []
+            with timer.stage("read"):
+                for data_source, file_path, filename in uploads:
+                    parse_path = stack.enter_context(open_for_parsing(file_path, filename))
+                    sheets = list_sheets(parse_path, filename) if all_sheets else [None]
+                    for sheet_name in sheets:
+                        parts.append((parse_path, filename, sheet_name))
+                        owners.append(data_source)
+
+            for index, result in timer.iterate("parse", parse_parts(parts)):
+                data_source = owners[index]
+                records = ingestor.absorb(result["rows_read"], result["clean"], result["rejected"],
+                                          data_source_id=data_source.id, source=result["source"])
+                ingestor.write_records(records, data_source_id=data_source.id)
+                data_source.last_sync_status = "PROCESSING"
+                with timer.stage("commit"):
+                    db.commit()
+                if on_progress:
+                    on_progress(ingestor)
+
+        with timer.stage("archive"):
+            paths = ingestor.archive.commit()
+        for data_source, _, _ in uploads:
+            mark_imported(data_source, paths.get(data_source.id))
+        with timer.stage("commit"):
+            db.commit()
+    except Exception as e:
+        ingestor.archive.discard()
+        db.rollback()
+        for data_source, _, _ in uploads:
+            purge_source_data(db, data_source)
+            mark_failed(data_source, e)
+        db.commit()
+        raise
+    return ingestor
+
+
+def run_batch_job(job, db: Session, tenant_id, user_id, uploads: List[tuple], all_sheets: bool):
+    """
+    Point d'entrée exécuté par le JobManager pour un upload groupé.
+    `uploads` : liste de (data_source_id, file_path, filename).
+    """
+    resolved = [(db.get(models.DataSource, ds_id), file_path, filename) for ds_id, file_path, filename in uploads]
+
+    def report(ingestor: BulkIngestor):
+        job.report(ingestor.rows_read, ingestor.error_count, ingestor.errors,
+                   processed_count=ingestor.processed_count, timings=ingestor.timer.to_dict())
+
+    ingestor = ingest_batch(db, tenant_id, user_id, resolved, all_sheets=all_sheets, on_progress=report)
+    report(ingestor)
+    job.message = f"{len(uploads)} file(s) processed. {ingestor.processed_count} items."
@@ -0,0 +1,140 @@
+# services/jobs.py
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable
+
+from database import get_session
+
+# Background workers shared by all ingestion jobs of this API process.
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+
+# Finished jobs stay pollable for this long before being pruned.
+JOB_RETENTION_SECONDS = 3600
+
+
+class JobStatus:
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+
+class Job:
+    """
+    État d'une tâche d'arrière-plan (ingestion, synchronisation...), consultable par polling ou SSE.
+    """
+
+    def __init__(self, kind: str, tenant_id, data_source_id):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.tenant_id = str(tenant_id)
+        self.data_source_id = str(data_source_id) if data_source_id else None
+        self.status = JobStatus.QUEUED
+        self.message = None
+        self.rows_done = 0
+        self.error_count = 0
+        self.errors: List[str] = []
+        self.details: Dict[str, Any] = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def report(self, rows_done: int, error_count: int = 0, errors: List[str] | None = None, **details):
+        """Publie l'avancement courant (appelé par le worker après chaque morceau)."""
+        self.rows_done = rows_done
+        self.error_count = error_count
+        if errors is not None:
+            self.errors = errors[:10]
+        self.details.update(details)
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "data_source_id": self.data_source_id,
+            "status": self.status,
+            "message": self.message,
+            "rows_done": self.rows_done,
+            "rows_per_sec": round(self.rows_done / elapsed, 1) if elapsed else 0.0,
+            "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            **self.details,
+        }
+
+
+class JobManager:
+    """
+    File d'attente locale : les tâches tournent dans un pool de threads, hors de la boucle asyncio,
+    chacune avec sa propre session SQLAlchemy.
+    """
+
+    def __init__(self, max_workers: int = INGESTION_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, tenant_id, data_source_id, target: Callable, *args) -> Job:
+        """
+        Planifie `target(job, db, *args)` et retourne immédiatement le Job créé.
+        """
+        job = Job(kind, tenant_id, data_source_id)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, target, args)
+        return job
+
+    def run_inline(self, kind: str, tenant_id, data_source_id, target: Callable, *args) -> Job:
+        """
+        Exécute `target(job, db, *args)` dans le thread appelant (ex: planificateur qui gère
+        sa propre concurrence) ; le Job reste consultable comme ceux de submit().
+        """
+        job = Job(kind, tenant_id, data_source_id)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._run(job, target, args)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def list_for_tenant(self, tenant_id) -> List[Job]:
+        return [job for job in list(self._jobs.values()) if job.tenant_id == str(tenant_id)]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, target: Callable, args: tuple):
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        db = get_session()
+        try:
+            target(job, db, *args)
+            job.status = JobStatus.COMPLETED
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.status = JobStatus.FAILED
+            job.message = str(e)
+        finally:
+            job.finished_at = time.time()
+            db.close()
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [j.id for j in self._jobs.values() if j.is_finished and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
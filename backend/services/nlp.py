@@ -39,6 +39,9 @@ class NLPService:
         - LIST_PRODUCTS: User wants a LIST of products (filter by stock, category, supplier).
         - GET_STATS: User wants global stats or financial indicators (margin, profit).
         - PLOT_CHART: User explicitly wants a chart/visualization.
+        - MOVEMENT_TREND: User wants the evolution of stock movements over time (e.g., "évolution des sorties sur 90 jours", by category or supplier).
+        - STOCK_AS_OF: User wants the stock level at a past date (e.g., "stock au 31 mars 2025", "combien de X avions-nous fin janvier ?").
+        - WAREHOUSE_STOCK: User wants the stock of one warehouse / site / city, or the stock per warehouse (e.g., "stock à Lyon", "ruptures à l'entrepôt de Paris", "stock par entrepôt").
         - SEARCH_PRODUCT: User looks for A SINGLE specific product or "the most expensive/available" product.
         - LIST_SUPPLIERS: User wants a list of suppliers.
         - SUPPLIER_STATS: User wants stats about suppliers.
@@ -54,6 +57,15 @@ class NLPService:
         - sort_order: "DESC", "ASC"
         - sort_field: "price", "quantity"
         - graph_type: "bar", "pie", "histogram"
+        - measure: "price", "cost", "margin", "stock", "stock_value" (what a histogram / distribution is about)
+        - bins: number of bars wanted in a histogram (integer)
+        - bucket_mode: "quantile" when the user wants equal-count buckets (quartiles, deciles...)
+        - direction: "out" (sorties, ventes), "in" (entrées, réceptions) or "net" for MOVEMENT_TREND
+        - period_days: length of the period in days (e.g., 90, 365) for MOVEMENT_TREND
+        - group_by: "category" or "supplier" when a trend is asked per category / per supplier
+        - as_of_date: the date asked for STOCK_AS_OF, as YYYY-MM-DD (end of month when only a month is given)
+        - warehouse_name: warehouse name, code or city for WAREHOUSE_STOCK (e.g., "Lyon"); omitted for "stock par entrepôt"
+        - page: "next" when the user asks for the next page / more results of the previous product list (intent LIST_PRODUCTS)
         
         Expected JSON Format:
         {
@@ -0,0 +1,41 @@
+# services/pagination.py
+"""
+Pagination par clé (keyset) des listes de l'API.
+
+Une page se poursuit « après » la clé de tri de sa dernière ligne (ex: (name, id)) au lieu de sauter
+OFFSET lignes : la page 10 000 coûte une descente d'index, comme la première. Le curseur transmis au
+client est opaque (JSON encodé en base64 URL) et porte le nom de la liste pour ne pas être réutilisé
+sur une autre.
+"""
+import base64
+import binascii
+import json
+from typing import Any, List
+
+# Products per chat answer; the rest is reachable with "page suivante".
+LIST_PAGE_SIZE = 10
+# How long a chat product list can be continued.
+LIST_PAGE_TTL_SECONDS = 1800
+
+
+def encode_cursor(kind: str, *values) -> str:
+    """Curseur opaque de la clé de tri `values` (UUID et dates sérialisés en texte)."""
+    payload = json.dumps({"k": kind, "v": [str(value) for value in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(kind: str, cursor: str, *types) -> List[Any]:
+    """
+    Valeurs d'un curseur produit par encode_cursor pour la liste `kind`, converties par `types`
+    (ex: str, uuid.UUID, datetime.fromisoformat). Lève ValueError si le curseur est illisible
+    ou vient d'une autre liste.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = payload["v"] if payload["k"] == kind else None
+        if values is None or len(values) != len(types):
+            raise ValueError
+        return [convert(value) for convert, value in zip(types, values)]
+    except (binascii.Error, KeyError, TypeError, ValueError) as e:
+        # JSONDecodeError and UnicodeDecodeError are ValueErrors too
+        raise ValueError("Invalid pagination cursor.") from e
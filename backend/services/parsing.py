@@ -0,0 +1,261 @@
+# services/parsing.py
+"""
+Lecture et conversion des fichiers clients, sans dépendance à la base de données :
+ce module est importé tel quel par les processus du pool de parsing.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Maps the raw (lower-cased, stripped) column headers found in customer files
+# to our internal field names.
+COLUMN_MAPPING = {
+    'product': 'name', 'product name': 'name', 'nom produit': 'name', 'nom': 'name', 'designation': 'name', 'libelle': 'name', 'product_name': 'name',
+    'sku': 'sku', 'ref': 'sku', 'reference': 'sku', 'code': 'sku', 'product_id': 'sku',
+    'category': 'category', 'catégorie': 'category', 'famille': 'category',
+    'quantity': 'quantity', 'qty': 'quantity', 'quantité': 'quantity', 'stock': 'quantity', 'qte': 'quantity', 'stock reel': 'quantity', 'quantity_in_stock': 'quantity',
+    'price': 'unit_price', 'prix': 'unit_price', 'unit price': 'unit_price', 'prix unitaire': 'unit_price', 'pamp': 'cost_price', 'coût': 'cost_price', 'cost': 'cost_price',
+    'supplier': 'supplier_name', 'fournisseur': 'supplier_name',
+    'warehouse': 'warehouse', 'entrepôt': 'warehouse', 'entrepot': 'warehouse', 'dépôt': 'warehouse', 'depot': 'warehouse', 'magasin': 'warehouse'
+}
+
+# Streaming: rows parsed (and committed) per chunk.
+PARSE_CHUNK_ROWS = 50000
+
+# Only the first errors are kept in memory; error_count keeps the full tally.
+MAX_REPORTED_ERRORS = 1000
+
+SUPPORTED_EXTENSIONS = ('.csv', '.xls', '.xlsx')
+
+DEFAULT_CATEGORY = 'General'
+
+RECORD_COLUMNS = ('sku', 'name', 'category', 'supplier_name', 'unit_price', 'cost_price', 'quantity', 'warehouse')
+
+# Bounds of the target columns (see models.Product / Category / Supplier / Warehouse / StockMovement):
+# rows outside them are rejected up front instead of failing the whole chunk in the database.
+MAX_PRICE = 99_999_999.99  # DECIMAL(10, 2)
+MAX_QUANTITY = 2**31 - 1  # Integer
+MAX_LENGTHS = {'sku': 100, 'name': 255, 'category': 100, 'supplier_name': 255, 'warehouse': 50}
+
+# Processes used to parse several sheets / files at once (CPU-bound, GIL-bound in openpyxl).
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Standardise les en-têtes (minuscules, sans espaces) et applique COLUMN_MAPPING.
+    """
+    df.columns = [str(col).lower().strip() for col in df.columns]
+    df.rename(columns={col: COLUMN_MAPPING[col] for col in df.columns if col in COLUMN_MAPPING}, inplace=True)
+    return df
+
+
+def _iter_xlsx_chunks(file_path: str, chunksize: int, sheet_name: str | None = None):
+    """Itère une feuille .xlsx (la feuille active par défaut) en mode read-only (mémoire constante)."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(col) if col is not None else f"unnamed_{i}" for i, col in enumerate(header)]
+
+        buffer, start = [], 0
+        for values in rows:
+            buffer.append(values)
+            if len(buffer) >= chunksize:
+                yield pd.DataFrame(buffer, columns=header, index=pd.RangeIndex(start, start + len(buffer)))
+                start += len(buffer)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header, index=pd.RangeIndex(start, start + len(buffer)))
+    finally:
+        workbook.close()
+
+
+def iter_file_chunks(file_path: str, filename: str, chunksize: int = PARSE_CHUNK_ROWS,
+                     sheet_name: str | None = None):
+    """
+    Lit un fichier CSV/Excel déjà écrit sur disque par morceaux de `chunksize` lignes.
+    L'index des DataFrames produits continue d'un morceau à l'autre (numéros de ligne cohérents).
+    Pour un classeur, `sheet_name` choisit la feuille (par défaut la première / active).
+    """
+    if filename.endswith('.csv'):
+        with pd.read_csv(file_path, chunksize=chunksize) as reader:
+            yield from reader
+    elif filename.endswith('.xlsx'):
+        yield from _iter_xlsx_chunks(file_path, chunksize, sheet_name)
+    elif filename.endswith('.xls'):
+        # Legacy binary format: no streaming reader available, parse it in one go
+        yield pd.read_excel(file_path, sheet_name=sheet_name or 0)
+    else:
+        raise ValueError(f"Unsupported file format: {filename}")
+
+
+def list_sheets(file_path: str, filename: str) -> List[str | None]:
+    """Feuilles d'un classeur ; [None] pour un CSV (une seule « feuille »)."""
+    if filename.endswith('.xlsx'):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_path, read_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+    if filename.endswith('.xls'):
+        with pd.ExcelFile(file_path) as workbook:
+            return list(workbook.sheet_names)
+    return [None]
+
+
+def _reject(rejected: List[pd.DataFrame], df: pd.DataFrame, mask: pd.Series, reason) -> pd.Series:
+    """Ajoute les lignes `mask` (pas encore rejetées) au rapport avec leur motif ; retourne le masque des lignes restantes."""
+    mask = mask & df["_valid"]
+    if mask.any():
+        rows = df.loc[mask]
+        rejected.append(pd.DataFrame({
+            "row": rows.index,
+            "sku": rows["sku"].astype(object).where(rows["sku"].notna(), None).to_numpy(),
+            "error": reason(rows) if callable(reason) else reason,
+        }))
+        df.loc[mask, "_valid"] = False
+    return df["_valid"]
+
+
+def validate_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Validation vectorisée d'un morceau de fichier, sans boucle Python par ligne :
+    coercition des colonnes (pd.to_numeric), masques de valeurs manquantes, contrôles de bornes
+    (colonnes DECIMAL(10,2) / Integer / longueurs VARCHAR) puis dédoublonnage des SKUs par entrepôt.
+
+    Retourne (clean, rejected) :
+    - clean : une ligne par SKU et entrepôt (attributs de la première occurrence du SKU, somme des
+      quantités positives), colonnes RECORD_COLUMNS ; warehouse vaut None sans colonne entrepôt ;
+    - rejected : une ligne par ligne refusée, colonnes row / sku / error.
+    """
+    df = normalize_columns(df)
+    # Duplicated headers (two columns mapped to the same field): keep the first one
+    df = df.loc[:, ~df.columns.duplicated()].copy()
+    for col in RECORD_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    df["_valid"] = True
+    rejected: List[pd.DataFrame] = []
+
+    df["sku"] = df["sku"].astype(object).where(df["sku"].notna(), None)
+    _reject(rejected, df, df["sku"].isna(), "missing SKU")
+    df["sku"] = df["sku"].astype(str).where(df["sku"].notna(), None)
+
+    for col in ('unit_price', 'cost_price', 'quantity'):
+        raw = df[col]
+        values = pd.to_numeric(raw, errors="coerce")
+        _reject(rejected, df, values.isna() & raw.notna(),
+                lambda rows, col=col: [f"invalid {col}: {value!r}" for value in rows[col]])
+        df[col] = values
+
+    for col in ('unit_price', 'cost_price'):
+        _reject(rejected, df, df[col] < 0, f"negative {col}")
+        _reject(rejected, df, df[col] > MAX_PRICE, f"{col} out of range")
+    _reject(rejected, df, df["quantity"].abs() > MAX_QUANTITY, "quantity out of range")
+
+    for col, max_length in MAX_LENGTHS.items():
+        if df[col].isna().all():
+            continue
+        lengths = df[col].astype(object).where(df[col].notna(), "").astype(str).str.len()
+        _reject(rejected, df, lengths > max_length, f"{col} longer than {max_length} characters")
+
+    clean = df.loc[df["_valid"]]
+    names = clean["name"].astype(object)
+    categories = clean["category"].astype(object)
+    suppliers = clean["supplier_name"].astype(object)
+    warehouses = clean["warehouse"].astype(object)
+    warehouses = warehouses.astype(str).str.strip().where(warehouses.notna(), None)
+    clean = pd.DataFrame({
+        "sku": clean["sku"],
+        "name": names.astype(str).where(names.notna(), "Product " + clean["sku"]),
+        "category": categories.astype(str).where(categories.notna(), DEFAULT_CATEGORY),
+        "supplier_name": suppliers.astype(str).where(suppliers.notna(), None),
+        "unit_price": clean["unit_price"].fillna(0.0).astype(float),
+        "cost_price": clean["cost_price"].fillna(0.0).astype(float),
+        # Truncated like int() did; non-positive quantities create no movement
+        "quantity": np.trunc(clean["quantity"].astype(float)),
+        # Blank cells mean "no warehouse", like a file without the column
+        "warehouse": warehouses.where(warehouses.notna() & (warehouses != ""), None),
+    })
+
+    # One row per SKU and warehouse: the SKU's first occurrence wins for attributes, positive
+    # quantities add up (same result as the previous one-movement-per-row import).
+    key = ["sku", "warehouse"]
+    if clean.duplicated(key).any():
+        attributes = clean.drop_duplicates("sku", keep="first").set_index("sku")
+        quantity = clean["quantity"]
+        groups = [clean["sku"], clean["warehouse"].fillna("")]
+        totals = quantity.where(quantity > 0).groupby(groups, sort=False).sum()
+        has_quantity = quantity.notna().groupby(groups, sort=False).any()
+        clean = clean.drop_duplicates(key, keep="first")
+        rows = pd.MultiIndex.from_arrays([clean["sku"], clean["warehouse"].fillna("")])
+        for col in ('name', 'category', 'supplier_name', 'unit_price', 'cost_price'):
+            clean[col] = clean["sku"].map(attributes[col])
+        clean["quantity"] = totals.reindex(rows).where(has_quantity.reindex(rows).to_numpy()).to_numpy()
+
+    rejected_frame = (
+        pd.concat(rejected, ignore_index=True).sort_values("row", kind="stable")
+        if rejected else pd.DataFrame(columns=["row", "sku", "error"])
+    )
+    return clean.reset_index(drop=True), rejected_frame
+
+
+def to_records(clean: pd.DataFrame) -> List[dict]:
+    """Frame validée -> enregistrements {sku, name, ..., quantity} (quantity : int ou None)."""
+    # Column-wise tolist() + zip is several times faster than DataFrame.to_dict("records")
+    columns = []
+    for col in RECORD_COLUMNS:
+        values = clean[col].astype("Int64") if col == "quantity" else clean[col]
+        columns.append(values.astype(object).where(values.notna(), None).tolist())
+    return [dict(zip(RECORD_COLUMNS, row)) for row in zip(*columns)]
+
+
+def parse_part(file_path: str, filename: str, sheet_name: str | None = None) -> Dict[str, Any]:
+    """
+    Parse et valide entièrement une feuille (ou un CSV). Exécuté dans un processus du pool :
+    ne touche pas à la base. Retourne {source, rows_read, clean, rejected}.
+    """
+    source = f"{filename}[{sheet_name}]" if sheet_name else filename
+    rows_read, clean, rejected = 0, [], []
+    for chunk in iter_file_chunks(file_path, filename, sheet_name=sheet_name):
+        chunk_clean, chunk_rejected = validate_frame(chunk)
+        rows_read += len(chunk)
+        clean.append(chunk_clean)
+        rejected.append(chunk_rejected)
+    rejected = pd.concat(rejected, ignore_index=True) if rejected else pd.DataFrame(columns=["row", "sku", "error"])
+    rejected.insert(0, "source", source)
+    return {
+        "source": source,
+        "rows_read": rows_read,
+        "clean": pd.concat(clean, ignore_index=True) if clean else pd.DataFrame(columns=list(RECORD_COLUMNS)),
+        "rejected": rejected,
+    }
+
+
+def parse_parts(parts: List[Tuple[str, str, str | None]], max_workers: int = PARSE_WORKERS):
+    """
+    Parse plusieurs (file_path, filename, sheet_name) en parallèle dans un pool de processus
+    et produit (index de la partie, résultat de parse_part) au fur et à mesure qu'ils se terminent.
+    """
+    if len(parts) == 1 or max_workers <= 1:
+        for i, part in enumerate(parts):
+            yield i, parse_part(*part)
+        return
+
+    # spawn: the pool may be started from a worker thread of the API process
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(parts)), mp_context=get_context("spawn")) as pool:
+        futures = {pool.submit(parse_part, *part): i for i, part in enumerate(parts)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -1,9 +1,50 @@
+import os
+import threading
+from datetime import date
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case, text, literal_column
+from sqlalchemy import func, case, literal_column, tuple_
 from typing import Dict, Any
 import models
+from services.cache import TTLCache, normalize_entities
+from services.federated import federated_source, federated_query_service
+from services.search import search_products, SEARCH_TOP_K
+from services.analytics import (
+    margin_summary, distribution, histogram_bins, histogram_answer, movement_trend, MEASURES, TREND_DAYS
+)
+from services.pagination import LIST_PAGE_SIZE, LIST_PAGE_TTL_SECONDS
+from services.stock import (
+    stock_level_subquery, current_stock, find_warehouses, warehouse_totals, warehouse_products, status_condition
+)
+from services.snapshots import stock_as_of, end_of_day
+
+# Warehouses listed in a "stock par entrepôt" answer.
+WAREHOUSE_LIST_SIZE = 10
+# Chat answers are cached per (tenant, data version, intent, entities); a write bumps the version.
+QUERY_CACHE_SECONDS = int(os.getenv("QUERY_CACHE_SECONDS", "600"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "5000"))
+# Per-tenant hit/miss counters of the answer cache, forgotten after a day without a question.
+QUERY_COUNTERS_SECONDS = 86400
+QUERY_COUNTERS_MAX_TENANTS = 10000
+
+
+def data_version(db: Session, tenant_id) -> int:
+    """Version des données du tenant (tenant_data_versions, incrémentée à la validation de chaque écriture)."""
+    version = db.query(models.TenantDataVersion.version).filter(
+        models.TenantDataVersion.tenant_id == tenant_id
+    ).scalar()
+    return version or 0
+
 
 class QueryService:
+    def __init__(self):
+        # tenant_id -> {"entities", "cursor": (sort key, product id), "shown"} of the last product list
+        self._list_pages = TTLCache(ttl_seconds=LIST_PAGE_TTL_SECONDS, max_entries=1000)
+        # (tenant_id, version, intent, entities) -> (answer, product list state)
+        self._results = TTLCache(ttl_seconds=QUERY_CACHE_SECONDS, max_entries=QUERY_CACHE_MAX_ENTRIES)
+        # tenant_id -> {"hits", "misses"} of the answer cache
+        self._tenant_counters = TTLCache(ttl_seconds=QUERY_COUNTERS_SECONDS, max_entries=QUERY_COUNTERS_MAX_TENANTS)
+        self._counters_lock = threading.Lock()
+
     def execute(self, db: Session, tenant_id: str, nlp_result: dict) -> Dict[str, Any]:
         """
         Transforme l'intention NLP en requête SQLAlchemy complexe.
@@ -13,6 +54,52 @@ class QueryService:
         
         print(f"   [QueryService] Processing Intent: {intent} | Entities: {entities}")
 
+        # Only local answers are cached; data source writes also bump the version, so a tenant
+        # switching to federated mode never gets a stale local answer
+        key = (str(tenant_id), data_version(db, tenant_id), intent, normalize_entities(entities))
+        # "page suivante" continues the tenant's last list: it depends on that state, not only on the question
+        cacheable = entities.get("page") != "next"
+        cached = self._results.get(key) if cacheable else None
+        if cached is not None:
+            self._count(tenant_id, hit=True)
+            result, list_page = cached
+            if intent == "LIST_PRODUCTS":
+                self._restore_list_page(tenant_id, list_page)
+            return result
+
+        # Tenants whose database is connected in federated mode are answered from it directly
+        source = federated_source(db, tenant_id)
+        if source is not None:
+            return federated_query_service.execute(source, intent, entities)
+        if not cacheable:
+            return self._answer(db, tenant_id, intent, entities)
+
+        self._count(tenant_id, hit=False)
+        result = self._answer(db, tenant_id, intent, entities)
+        list_page = self._list_pages.get(tenant_id) if intent == "LIST_PRODUCTS" else None
+        self._results.set(key, (result, list_page))
+        return result
+
+    def cache_stats(self, tenant_id) -> Dict[str, Any]:
+        with self._counters_lock:
+            counters = dict(self._tenant_counters.get(str(tenant_id)) or {"hits": 0, "misses": 0})
+        return {"tenant": counters, "global": self._results.stats()}
+
+    def _count(self, tenant_id, hit: bool):
+        with self._counters_lock:
+            counters = self._tenant_counters.get(str(tenant_id)) or {"hits": 0, "misses": 0}
+            counters["hits" if hit else "misses"] += 1
+            # Set again: an active tenant's counters do not expire
+            self._tenant_counters.set(str(tenant_id), counters)
+
+    def _restore_list_page(self, tenant_id, list_page):
+        # A cached first page must still be continuable with "page suivante"
+        if list_page is None:
+            self._list_pages.delete(tenant_id)
+        else:
+            self._list_pages.set(tenant_id, list_page)
+
+    def _answer(self, db: Session, tenant_id: str, intent: str, entities: dict) -> Dict[str, Any]:
         if intent == "LIST_PRODUCTS":
             return self._handle_list_products(db, tenant_id, entities)
 
@@ -32,43 +119,60 @@ class QueryService:
         elif intent == "PLOT_CHART":
             return self._handle_plot_chart(db, tenant_id, entities)
 
+        elif intent == "MOVEMENT_TREND":
+            return self._handle_movement_trend(db, tenant_id, entities)
+
+        elif intent == "STOCK_AS_OF":
+            return self._handle_stock_as_of(db, tenant_id, entities)
+
+        elif intent == "WAREHOUSE_STOCK":
+            return self._handle_warehouse_stock(db, tenant_id, entities)
+
         elif intent == "unknown":
             return {"text": "Je n'ai pas bien compris votre demande. Essayez de reformuler (ex: 'Produits en rupture', 'Statistiques')."}
 
         return {"text": f"Je comprends l'intention '{intent}', mais je ne sais pas encore la traiter."}
 
-    def _get_stock_query(self, db: Session, tenant_id: str):
+    def _stock_query(self, db: Session, tenant_id: str):
         """
         Helper: Crée une requête de base qui calcule le stock actuel pour chaque produit.
-        Stock = Somme(quantity) dans la table StockMovement.
+        Stock = somme des stocks par entrepôt de la table product_stock (tenue à jour par triggers).
+        Retourne (query, expression du stock) pour pouvoir filtrer / trier sur le stock en SQL.
         """
-        stock_subquery = (
-            db.query(
-                models.StockMovement.product_id,
-                func.sum(models.StockMovement.quantity).label("current_stock")
-            )
-            .filter(models.StockMovement.tenant_id == tenant_id)
-            .group_by(models.StockMovement.product_id)
-            .subquery()
-        )
+        stock_subquery = stock_level_subquery(db, tenant_id)
+        stock_level = func.coalesce(stock_subquery.c.current_stock, 0)
 
         query = (
             db.query(
                 models.Product,
                 models.Category.name.label("category_name"),
                 models.Supplier.name.label("supplier_name"),
-                func.coalesce(stock_subquery.c.current_stock, 0).label("stock_level")
+                stock_level.label("stock_level")
             )
             .join(models.Category, models.Category.id == models.Product.category_id)
             .outerjoin(models.Supplier, models.Supplier.id == models.Product.supplier_id)
             .outerjoin(stock_subquery, models.Product.id == stock_subquery.c.product_id)
             .filter(models.Product.tenant_id == tenant_id)
         )
-        return query
+        return query, stock_level
+
+    def _get_stock_query(self, db: Session, tenant_id: str):
+        return self._stock_query(db, tenant_id)[0]
+
+    def _handle_list_products(self, db: Session, tenant_id: str, entities: dict) -> Dict[str, Any]:
+        """
+        Filtres de statut, tri et pagination entièrement en SQL : total réel via count(*) OVER (),
+        page suivante par keyset (clé de tri, id) mémorisée pour le tenant ("page suivante").
+        """
+        page = None
+        if entities.get("page") == "next":
+            page = self._list_pages.get(tenant_id)
+            if page is None:
+                return {"text": "Il n'y a pas de liste en cours. Demandez d'abord des produits (ex: 'Produits en rupture')."}
+            entities = page["entities"]
+
+        query, stock_level = self._stock_query(db, tenant_id)
 
-    def _handle_list_products(self, db: Session, tenant_id: str, entities: dict) -> str:
-        query = self._get_stock_query(db, tenant_id)
-        
         category_filter = entities.get("category")
         if category_filter:
             query = query.filter(models.Category.name.ilike(f"%{category_filter}%"))
@@ -78,91 +182,75 @@ class QueryService:
             query = query.filter(models.Supplier.name.ilike(f"%{supplier_filter}%"))
 
         status_filter = entities.get("filter_status")
-        
-        # Sorting
+        condition = status_condition(status_filter, stock_level, models.Product.reorder_point)
+        if condition is not None:
+            query = query.filter(condition)
+
+        # Sorting: (key, id) is unique, so it can resume exactly after the last row shown
         sort_field = entities.get("sort_field")
-        sort_order = entities.get("sort_order")
-        
+        descending = entities.get("sort_order") == "DESC"
         if sort_field == "price":
-            if sort_order == "DESC":
-                query = query.order_by(models.Product.unit_price.desc())
-            else:
-                query = query.order_by(models.Product.unit_price.asc())
+            sort_key = func.coalesce(models.Product.unit_price, 0)
         elif sort_field == "quantity":
-             if sort_order == "DESC":
-                query = query.order_by(text("stock_level DESC"))
-             else:
-                query = query.order_by(text("stock_level ASC"))
-        
-        filtered_results = []
-        
-        all_results = query.limit(50).all() 
+            sort_key = stock_level
+        else:
+            sort_key = models.Product.name
+        if page:
+            position = tuple_(sort_key, models.Product.id)
+            cursor = tuple_(*page["cursor"])
+            query = query.filter(position < cursor if descending else position > cursor)
+        if descending:
+            query = query.order_by(sort_key.desc(), models.Product.id.desc())
+        else:
+            query = query.order_by(sort_key.asc(), models.Product.id.asc())
 
-        for product, cat_name, supplier_name, stock in all_results:
-            include = True
-            
-            if status_filter == "OUT_OF_STOCK":
-                if stock > 0: include = False
-            elif status_filter == "LOW_STOCK":
-                threshold = product.reorder_point if product.reorder_point else 5
-                if stock > threshold: include = False
-            elif status_filter == "ACTIVE":
-                if stock <= 0: include = False
-            
-            if include:
-                filtered_results.append((product, cat_name, supplier_name, stock))
+        results = query.add_columns(
+            sort_key.label("sort_key"),
+            func.count().over().label("total_count")
+        ).limit(LIST_PAGE_SIZE).all()
 
-        if not filtered_results:
+        if not results:
+            if page:
+                return {"text": "Il n'y a pas d'autres produits dans cette liste."}
             msg = "Aucun produit trouvé"
             if category_filter: msg += f" dans la catégorie '{category_filter}'"
             if status_filter == "OUT_OF_STOCK": msg += " en rupture de stock"
+            elif status_filter == "LOW_STOCK": msg += " en stock faible"
             return {"text": msg + "."}
 
-        response = f"Voici les produits trouvés ({len(filtered_results)}) :\n"
-        for prod, cat, supp, stock in filtered_results[:10]:
+        shown_before = page["shown"] if page else 0
+        shown = shown_before + len(results)
+        total = shown_before + results[0].total_count
+
+        if page:
+            response = f"Produits {shown_before + 1} à {shown} sur {total} :\n"
+        else:
+            response = f"Voici les produits trouvés ({total}) :\n"
+        for prod, cat, supp, stock, _, _ in results:
             icon = "🔴" if stock <= 0 else "🟠" if stock < 10 else "🟢"
             supp_str = f" | Fournisseur: {supp}" if supp else ""
             response += f"{icon} **{prod.name}** ({cat})\n   Stock : {int(stock)} | Prix : {prod.unit_price}€{supp_str}\n"
-        
-        if len(filtered_results) > 10:
-            response += f"... et {len(filtered_results) - 10} autres."
-            
+
+        if shown < total:
+            last = results[-1]
+            self._list_pages.set(tenant_id, {"entities": entities, "cursor": (last.sort_key, last[0].id), "shown": shown})
+            response += f"... et {total - shown} autres. Dites « page suivante » pour voir la suite."
+        else:
+            self._list_pages.delete(tenant_id)
+
         return {"text": response}
 
     def _handle_get_stats(self, db: Session, tenant_id: str, entities: dict = {}) -> Dict[str, Any]:
         stat_type = entities.get("stat_type") # global, by_category, by_product, margin
         
         if stat_type == "by_product" or stat_type == "margin":
-            # Margin Analysis
-            products = db.query(models.Product).filter(
-                models.Product.tenant_id == tenant_id,
-                models.Product.unit_price.isnot(None),
-                models.Product.cost_price.isnot(None)
-            ).all()
+            # Margin Analysis, aggregated by the database (a few rows, whatever the catalogue size)
+            summary = margin_summary(db, tenant_id, top_n=5)
             
-            if not products:
+            if summary is None:
                 return {"text": "Impossible de calculer les marges : prix de vente ou coût de revient manquants pour les produits."}
                 
-            margins = []
-            for p in products:
-                margin = float(p.unit_price) - float(p.cost_price)
-                if p.unit_price > 0:
-                    margin_percent = (margin / float(p.unit_price)) * 100
-                else:
-                    margin_percent = 0
-                margins.append({
-                    "name": p.name,
-                    "margin": margin,
-                    "margin_percent": margin_percent,
-                    "price": float(p.unit_price),
-                    "cost": float(p.cost_price)
-                })
-            
-            # Sort by margin desc
-            margins.sort(key=lambda x: x["margin"], reverse=True)
-            top_5 = margins[:5]
-            avg_margin = sum(m["margin"] for m in margins) / len(margins)
-            
+            top_5 = summary["top"]
             chart_data = [{"product": m["name"], "margin": m["margin"]} for m in top_5]
             
             from services.visualization import viz_service 
@@ -175,9 +263,18 @@ class QueryService:
                 y_label="Marge (€)"
             )
             
-            response = f"**Analyse de Marge** :\nMarge moyenne par produit : {avg_margin:.2f}€.\n\nTop 5 produits les plus rentables :\n"
+            response = (
+                f"**Analyse de Marge** ({summary['products']} produits) :\n"
+                f"Marge moyenne par produit : {summary['avg_margin']:.2f}€ (taux de marge global : {summary['margin_rate']:.1f}%).\n"
+                f"Marge potentielle sur le stock actuel : {summary['stock_margin']:.2f}€.\n\n"
+                "Top 5 produits les plus rentables :\n"
+            )
             for m in top_5:
-                response += f"- {m['name']} : Marge {m['margin']:.2f}€ ({m['margin_percent']:.1f}%)\n"
+                response += f"- {m['name']} : Marge {m['margin']:.2f}€ ({m['margin_percent']:.1f}%), {m['on_hand']} en stock\n"
+                
+            response += "\nPar catégorie (marge sur stock) :\n"
+            for c in summary["categories"]:
+                response += f"- {c['category']} : {c['stock_margin']:.2f}€ ({c['products']} produits, marge moyenne {c['avg_margin']:.2f}€, meilleure : {c['best_product']})\n"
                 
             return {
                 "text": response,
@@ -242,28 +339,27 @@ class QueryService:
         if not search_term:
             return {"text": "Quel produit cherchez-vous ?"}
             
-        # Tiered Search Logic: Exact > StartsWith > Contains
-        # 1. Exact Match
-        results = query.filter(models.Product.name.ilike(search_term)).all()
-        
-        # 2. Starts With (if no exact)
-        if not results:
-             results = query.filter(models.Product.name.ilike(f"{search_term}%")).all()
-             
-        # 3. Contains (if still nothing)
-        if not results:
-             results = query.filter(models.Product.name.ilike(f"%{search_term}%")).limit(10).all()
+        # Full-text + trigram search, best matches first (one query, top-k); stock is read for those only
+        matches = (
+            db.query(models.Product, models.Category.name, models.Supplier.name)
+            .join(models.Category, models.Category.id == models.Product.category_id)
+            .outerjoin(models.Supplier, models.Supplier.id == models.Product.supplier_id)
+            .filter(models.Product.tenant_id == tenant_id)
+        )
+        results = search_products(db, matches, search_term, limit=SEARCH_TOP_K + 1)
 
         if not results:
             return {"text": f"Je n'ai pas trouvé de produit correspondant à '{search_term}'."}
 
+        stock_levels = current_stock(db, tenant_id, [prod.id for prod, _, _ in results])
         response = f"Résultats pour '{search_term}' :\n"
-        for prod, cat, supp, stock in results[:10]: # Limit display
+        for prod, cat, supp in results[:SEARCH_TOP_K]:
+            stock = stock_levels.get(prod.id, 0)
             supp_str = f" via {supp}" if supp else ""
             response += f"{'🟢' if stock > 10 else '🔴'} **{prod.name}** ({cat}){supp_str} : {int(stock)} en stock\n"
             
-        if len(results) > 10:
-            response += f"... et {len(results) - 10} autres."
+        if len(results) > SEARCH_TOP_K:
+            response += "... et d'autres résultats moins pertinents. Précisez votre recherche pour les affiner."
             
         return {"text": response}
 
@@ -387,38 +483,12 @@ class QueryService:
             graph_type = entities.get("graph_type")
             
             if graph_type == "histogram":
-                # Price distribution buckets
-                products = db.query(models.Product.unit_price).filter(models.Product.tenant_id == tenant_id).all()
-                prices = [p.unit_price for p in products if p.unit_price is not None]
-                if not prices: return {"text": "Pas de données de prix."}
-                
-                # Basic binning
-                import math
-                min_p, max_p = min(prices), max(prices)
-                if min_p == max_p: bins = [min_p]
-                else: 
-                     # 5 bins
-                     step = (max_p - min_p) / 5
-                     bins = [min_p + i*step for i in range(6)]
-                
-                # Count
-                hist_data = [{"range": f"{int(bins[i])}-{int(bins[i+1])}€", "count": 0} for i in range(5)]
-                for p in prices:
-                    for i in range(5):
-                        if bins[i] <= p < bins[i+1]:
-                            hist_data[i]["count"] += 1
-                            break
-                        elif i == 4 and p >= bins[4]: # Last bin inclusive
-                            hist_data[i]["count"] += 1
-                            
-                chart_config = viz_service.create_bar_chart(
-                    data=hist_data, x_key="range", y_key="count",
-                    title="Distribution des Prix", x_label="Plage de prix", y_label="Nombre de produits"
-                )
-                return {
-                    "text": "Voici la distribution des prix de vos produits.",
-                    "chart": chart_config
-                }
+                # Distribution binned by the database: one row per bucket, whatever the catalogue size
+                measure = entities.get("measure") if entities.get("measure") in MEASURES else "price"
+                quantiles = entities.get("bucket_mode") == "quantile"
+                buckets = distribution(db, tenant_id, measure, histogram_bins(entities.get("bins")), quantiles)
+                if not buckets: return {"text": "Pas de données pour cette distribution."}
+                return histogram_answer(buckets, measure, quantiles)
             
             # Default: Bar chart of top products by price/stock
             query = self._get_stock_query(db, tenant_id).limit(20)
@@ -451,4 +521,111 @@ class QueryService:
             
         return {"text": "Je ne peux pas encore générer ce type de graphique."}
 
-query_service = QueryService()
\ No newline at end of file
+    def _handle_movement_trend(self, db: Session, tenant_id: str, entities: dict) -> Dict[str, Any]:
+        direction = entities.get("direction") if entities.get("direction") in ("in", "out", "net") else "out"
+        try:
+            days = min(max(int(entities.get("period_days") or TREND_DAYS), 7), 3650)
+        except (TypeError, ValueError):
+            days = TREND_DAYS
+        group_by = entities.get("group_by") if entities.get("group_by") in ("category", "supplier") else None
+
+        # Read from the daily rollup: a few rows per day whatever the length of the history
+        trend = movement_trend(
+            db, tenant_id, direction, days, group_by,
+            category=entities.get("category"), supplier=entities.get("supplier_name")
+        )
+        points = trend["points"]
+        label = {"in": "des entrées", "out": "des sorties", "net": "du solde (entrées - sorties)"}[direction]
+        if not points:
+            return {"text": f"Aucun mouvement de stock sur les {days} derniers jours."}
+
+        from services.visualization import viz_service
+        step = {"day": "jour", "week": "semaine", "month": "mois"}[trend["granularity"]]
+        chart_config = viz_service.create_line_chart(
+            data=points, x_key="period", y_key="quantity", series_key="series" if group_by else None,
+            title=f"Évolution {label} sur {days} jours (par {step})",
+            x_label="Période", y_label="Quantité"
+        )
+
+        # First half of the period against the second half
+        periods = sorted({p["period"] for p in points})
+        middle = periods[len(periods) // 2]
+        before = sum(p["quantity"] for p in points if p["period"] < middle)
+        after = sum(p["quantity"] for p in points if p["period"] >= middle)
+        total = before + after
+        response = f"**Évolution {label}** sur {days} jours : {total} unités au total, {total / len(periods):.1f} par {step} en moyenne.\n"
+        if before and len(periods) > 1:
+            change = (after - before) / abs(before) * 100
+            response += f"Seconde moitié de la période : {'+' if change >= 0 else ''}{change:.1f}% par rapport à la première."
+        return {"text": response, "chart": chart_config}
+
+    def _handle_stock_as_of(self, db: Session, tenant_id: str, entities: dict) -> Dict[str, Any]:
+        try:
+            day = date.fromisoformat(str(entities.get("as_of_date")))
+        except ValueError:
+            return {"text": "Pour quelle date voulez-vous le stock ? (ex: 'Stock au 31/03/2025')"}
+
+        # Nearest monthly snapshot (or current stock) plus the movements in between, not the whole history
+        result = stock_as_of(
+            db, tenant_id, end_of_day(day),
+            product_name=entities.get("product_name"), category=entities.get("category"), limit=5
+        )
+        label = day.strftime("%d/%m/%Y")
+        if not result["total_products"]:
+            return {"text": f"Aucun stock enregistré au {label}."}
+
+        response = (
+            f"**Stock au {label}** : {result['total_units']} unités sur {result['total_products']} produits "
+            f"({result['in_stock']} en stock), valeur {result['total_value']:.2f} €.\n"
+        )
+        for item in result["items"]:
+            response += f"- {item['name']} ({item['sku']}) : {item['on_hand']}\n"
+        return {"text": response}
+
+
+    def _handle_warehouse_stock(self, db: Session, tenant_id: str, entities: dict) -> Dict[str, Any]:
+        # Totals and products both read the (tenant, warehouse) range of ix_product_stock_tenant_warehouse
+        name = entities.get("warehouse_name")
+        warehouse_ids = None
+        if name:
+            warehouse_ids = [warehouse.id for warehouse in find_warehouses(db, tenant_id, name)]
+            if not warehouse_ids:
+                return {"text": f"Aucun entrepôt ne correspond à '{name}'."}
+        totals = warehouse_totals(db, tenant_id, warehouse_ids)
+        if not totals:
+            return {"text": "Aucun stock enregistré par entrepôt."}
+
+        title = f"**Stock à {name}**" if name else "**Stock par entrepôt**"
+        response = f"{title} : {sum(t['units'] for t in totals)} unités, valeur {sum(t['stock_value'] for t in totals):.2f} €.\n"
+        for total in totals[:WAREHOUSE_LIST_SIZE]:
+            response += (
+                f"- {total['warehouse_name']} : {total['units']} unités, {total['skus_in_stock']} références en stock"
+                f" ({total['skus_out_of_stock']} en rupture), valeur {total['stock_value']:.2f} €\n"
+            )
+        if len(totals) > WAREHOUSE_LIST_SIZE:
+            response += f"... et {len(totals) - WAREHOUSE_LIST_SIZE} autres entrepôts.\n"
+
+        if warehouse_ids:
+            out_of_stock = entities.get("filter_status") == "OUT_OF_STOCK"
+            products = warehouse_products(db, tenant_id, warehouse_ids, out_of_stock=out_of_stock)
+            if products:
+                response += "\n**Ruptures** :\n" if out_of_stock else "\n**Plus gros stocks** :\n"
+                for product in products:
+                    site = f", {product['warehouse_name']}" if len(warehouse_ids) > 1 else ""
+                    response += f"- {product['name']} ({product['sku']}{site}) : {product['on_hand']}\n"
+            elif out_of_stock:
+                response += "\nAucune rupture dans cet entrepôt."
+            return {"text": response}
+
+        from services.visualization import viz_service
+        chart_config = viz_service.create_bar_chart(
+            data=[{"warehouse": t["warehouse_name"], "units": t["units"]} for t in totals[:WAREHOUSE_LIST_SIZE]],
+            x_key="warehouse",
+            y_key="units",
+            title="Stock par entrepôt",
+            x_label="Entrepôt",
+            y_label="Unités"
+        )
+        return {"text": response, "chart": chart_config}
+
+query_service = QueryService()
@@ -0,0 +1,172 @@
+# services/scheduler.py
+"""
+Planificateur des synchronisations périodiques (DataSource.sync_enabled / sync_frequency_minutes).
+
+Une boucle asyncio relève régulièrement les sources SQL dues (d'après last_sync_at) et lance leur
+synchronisation dans un thread, avec une limite globale et une limite par tenant. Chaque source
+reçoit un décalage fixe (dérivé de son id) dans une fenêtre de jitter : des centaines de sources
+à la même fréquence ne partent pas toutes à la même seconde.
+
+Activé au démarrage de l'API avec SYNC_SCHEDULER_ENABLED=1, ou lancé seul :
+    python -m services.scheduler
+"""
+import os
+import time
+import uuid
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Any, List
+
+import models
+from database import get_session
+from services.jobs import job_manager
+from services.sql_sync import run_sync_job
+
+SCHEDULER_ENABLED = os.getenv("SYNC_SCHEDULER_ENABLED", "0") == "1"
+
+# Seconds between two scans for due sources.
+SYNC_POLL_SECONDS = int(os.getenv("SYNC_POLL_SECONDS", "30"))
+# Concurrent syncs for the whole process, and for a single tenant.
+SYNC_MAX_CONCURRENT = int(os.getenv("SYNC_MAX_CONCURRENT", "4"))
+SYNC_MAX_PER_TENANT = int(os.getenv("SYNC_MAX_PER_TENANT", "1"))
+# Jitter window: this fraction of the sync period, capped.
+SYNC_JITTER_RATIO = float(os.getenv("SYNC_JITTER_RATIO", "0.1"))
+SYNC_MAX_JITTER_SECONDS = int(os.getenv("SYNC_MAX_JITTER_SECONDS", "300"))
+
+
+def jitter_seconds(data_source_id, period_seconds: float) -> float:
+    """Décalage stable d'une source dans sa fenêtre de jitter (réparti uniformément selon l'id)."""
+    window = min(period_seconds * SYNC_JITTER_RATIO, SYNC_MAX_JITTER_SECONDS)
+    return (data_source_id.int % 10_000) / 10_000 * window
+
+
+class SyncScheduler:
+    """
+    File des synchronisations dues. Une source n'est mise en file qu'une fois à la fois ;
+    les tâches en attente d'un créneau (global ou tenant) constituent la profondeur de file.
+    """
+
+    def __init__(self, max_concurrent: int = SYNC_MAX_CONCURRENT, max_per_tenant: int = SYNC_MAX_PER_TENANT):
+        self.max_concurrent = max_concurrent
+        self.max_per_tenant = max_per_tenant
+        self._global: asyncio.Semaphore | None = None
+        self._tenants: Dict[str, asyncio.Semaphore] = {}
+        # data_source_id -> {"tenant_id", "name", "due_at", "queued_at", "started_at"}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._loop_task: asyncio.Task | None = None
+        self._tasks: set = set()
+        self.started_at = time.time()
+        self.last_scan_at = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop_task is not None and not self._loop_task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._global = asyncio.Semaphore(self.max_concurrent)
+        self.started_at = time.time()
+        self._loop_task = asyncio.create_task(self.run_forever())
+        print(f"DEBUG: Sync scheduler started (max {self.max_concurrent}, {self.max_per_tenant} per tenant)")
+
+    async def stop(self):
+        for task in [self._loop_task, *self._tasks]:
+            if task is not None:
+                task.cancel()
+        self._loop_task = None
+
+    async def run_forever(self):
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrent)
+        while True:
+            try:
+                self.enqueue(await asyncio.to_thread(self.due_sources))
+            except Exception as e:
+                print(f"DEBUG: Sync scheduler scan failed: {e}")
+            await asyncio.sleep(SYNC_POLL_SECONDS)
+
+    def due_sources(self, now: float | None = None) -> List[Dict[str, Any]]:
+        """Sources SQL actives dont la prochaine synchronisation (période + jitter) est échue."""
+        now = now or time.time()
+        db = get_session()
+        try:
+            rows = db.query(
+                models.DataSource.id, models.DataSource.tenant_id, models.DataSource.name,
+                models.DataSource.sync_frequency_minutes, models.DataSource.last_sync_at
+            ).filter(
+                models.DataSource.sync_enabled.is_(True),
+                models.DataSource.sync_frequency_minutes > 0,
+                models.DataSource.type == models.DataSourceType.SQL_CONNECTOR,
+                models.DataSource.status != models.DataSourceStatus.INACTIVE
+            ).all()
+        finally:
+            db.close()
+        self.last_scan_at = now
+
+        due = []
+        for ds_id, tenant_id, name, frequency, last_sync_at in rows:
+            period = frequency * 60
+            # Never synced: spread the first runs over the window after startup
+            base = last_sync_at.timestamp() + period if last_sync_at else self.started_at
+            due_at = base + jitter_seconds(ds_id, period)
+            if due_at <= now:
+                due.append({"data_source_id": str(ds_id), "tenant_id": str(tenant_id), "name": name, "due_at": due_at})
+        return due
+
+    def enqueue(self, sources: List[Dict[str, Any]]):
+        for source in sources:
+            ds_id = source["data_source_id"]
+            if ds_id in self._entries:
+                continue
+            self._entries[ds_id] = {**source, "queued_at": time.time(), "started_at": None}
+            task = asyncio.create_task(self._run(ds_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, ds_id: str):
+        entry = self._entries[ds_id]
+        tenant_slot = self._tenants.setdefault(entry["tenant_id"], asyncio.Semaphore(self.max_per_tenant))
+        try:
+            async with tenant_slot, self._global:
+                entry["started_at"] = time.time()
+                await asyncio.to_thread(
+                    job_manager.run_inline, "scheduled_sync", entry["tenant_id"], ds_id,
+                    run_sync_job, uuid.UUID(ds_id), None
+                )
+        finally:
+            # sync_data_source records COMPLETED / FAILED and last_sync_at on the source
+            del self._entries[ds_id]
+
+    def stats(self, tenant_id=None) -> Dict[str, Any]:
+        """Profondeur de file et retard (secondes écoulées depuis l'échéance) des synchronisations."""
+        now = time.time()
+        entries = [e for e in self._entries.values() if tenant_id is None or e["tenant_id"] == str(tenant_id)]
+        queued = [e for e in entries if e["started_at"] is None]
+        return {
+            "enabled": self.running,
+            "max_concurrent": self.max_concurrent,
+            "max_per_tenant": self.max_per_tenant,
+            "poll_seconds": SYNC_POLL_SECONDS,
+            "last_scan_at": datetime.fromtimestamp(self.last_scan_at, timezone.utc) if self.last_scan_at else None,
+            "queue_depth": len(queued),
+            "running": len(entries) - len(queued),
+            "max_lag_seconds": round(max((now - e["due_at"] for e in queued), default=0.0), 1),
+            "sources": [
+                {
+                    "data_source_id": e["data_source_id"],
+                    "name": e["name"],
+                    "state": "QUEUED" if e["started_at"] is None else "RUNNING",
+                    "due_at": datetime.fromtimestamp(e["due_at"], timezone.utc),
+                    "lag_seconds": round((e["started_at"] or now) - e["due_at"], 1),
+                }
+                for e in sorted(entries, key=lambda e: e["due_at"])
+            ],
+        }
+
+
+sync_scheduler = SyncScheduler()
+
+
+if __name__ == "__main__":
+    asyncio.run(sync_scheduler.run_forever())
@@ -0,0 +1,68 @@
+# services/search.py
+"""
+Recherche de produits en une requête : plein texte (index GIN ix_products_search_tsv,
+websearch_to_tsquery + ts_rank) et, si l'extension pg_trgm est installée, similarité trigramme
+sur le nom pour tolérer les fautes de frappe. Seuls les k meilleurs résultats sont lus.
+"""
+import os
+from typing import List
+
+from sqlalchemy import func, or_, case, text
+from sqlalchemy.orm import Session, Query
+
+import models
+
+# Results returned by a search (chat answer, default REST page).
+SEARCH_TOP_K = int(os.getenv("SEARCH_TOP_K", "10"))
+
+_trigram_support = {}
+
+
+def trigram_supported(db: Session) -> bool:
+    """pg_trgm installé sur la base (vérifié une fois par base)."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    key = str(bind.url)
+    if key not in _trigram_support:
+        _trigram_support[key] = db.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).first() is not None
+    return _trigram_support[key]
+
+
+def apply_search(db: Session, query: Query, term: str) -> Query:
+    """
+    Filtre `query` (portant sur models.Product) sur `term` et la trie par pertinence :
+    SKU exact, nom exact, rang plein texte, puis similarité du nom.
+    """
+    term = " ".join(term.split())
+    document = models.product_search_document(models.Product.name, models.Product.description)
+    tsquery = func.websearch_to_tsquery(text("'french'"), term)
+    matches = [document.op("@@")(tsquery), models.Product.sku == term]
+    order = [
+        case((models.Product.sku == term, 1), else_=0).desc(),
+        case((func.lower(models.Product.name) == term.lower(), 1), else_=0).desc(),
+        func.ts_rank(document, tsquery).desc(),
+    ]
+    if trigram_supported(db):
+        # word similarity: a misspelt word still matches inside a longer name (index ix_products_name_trgm)
+        matches.append(models.Product.name.op("%>")(term))
+        order.append(func.word_similarity(term, models.Product.name).desc())
+    return query.filter(or_(*matches)).order_by(*order, models.Product.name, models.Product.id)
+
+
+def search_products(db: Session, query: Query, term: str, limit: int = SEARCH_TOP_K, offset: int = 0) -> List:
+    """
+    Résultats de `apply_search`, limités. Sans pg_trgm, une recherche par sous-chaîne sur le nom
+    prend le relais quand le plein texte ne trouve rien (ex: référence partielle).
+    """
+    results = apply_search(db, query, term).offset(offset).limit(limit).all()
+    if results or offset or trigram_supported(db):
+        return results
+    return (
+        query.filter(models.Product.name.ilike(f"%{term.strip()}%"))
+        .order_by(models.Product.name, models.Product.id)
+        .limit(limit)
+        .all()
+    )
@@ -0,0 +1,232 @@
+# services/snapshots.py
+"""
+Stock à une date passée.
+
+Des points de contrôle mensuels (stock de chaque produit au 1er du mois, 00:00 UTC) sont pris par un job.
+Le stock à une date quelconque part de la référence la plus proche : le point précédent (plus les mouvements
+depuis), le point suivant ou le stock courant de product_stock (moins les mouvements postérieurs à la date).
+Le coût d'une requête est ainsi borné par les mouvements d'un mois, et non par la longueur de l'historique.
+Les mouvements antidatés corrigent les points existants (triggers de stock_snapshots).
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Any, List, Tuple
+
+from sqlalchemy import func, text, select, union_all, literal
+from sqlalchemy.orm import Session
+
+import models
+
+
+def month_start(moment: datetime) -> datetime:
+    """Début du mois (UTC) contenant `moment`."""
+    moment = moment.astimezone(timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(moment: datetime) -> datetime:
+    return month_start(month_start(moment) + timedelta(days=32))
+
+
+def end_of_day(day: date) -> datetime:
+    """Instant qui suit le jour `day` : le stock "au 31/03" inclut les mouvements du 31/03."""
+    return datetime.combine(day + timedelta(days=1), time.min, tzinfo=timezone.utc)
+
+
+def take_stock_snapshot(db: Session, tenant_id, as_of: datetime) -> int:
+    """
+    Enregistre le stock de chaque produit (par entrepôt) juste avant `as_of`, à partir du point précédent
+    et des mouvements intermédiaires. Les écritures de mouvements sont bloquées le temps du calcul pour
+    qu'aucun mouvement ne soit compté deux fois (calcul + trigger) ou oublié. Retourne le nombre de lignes.
+    """
+    db.execute(text("LOCK TABLE stock_movements IN SHARE MODE"))
+    run = models.StockSnapshotRun
+    previous, taken = db.query(
+        func.max(run.as_of).filter(run.as_of < as_of), func.count().filter(run.as_of == as_of)
+    ).filter(run.tenant_id == tenant_id).one()
+    if taken:
+        # Taken meanwhile by another job (the lock serialises them)
+        db.commit()
+        return 0
+
+    snapshot_run = models.StockSnapshotRun(tenant_id=tenant_id, as_of=as_of)
+    db.add(snapshot_run)
+    db.flush()
+
+    balances = _balances(tenant_id, as_of, previous)
+    inserted = db.execute(
+        models.StockSnapshot.__table__.insert().from_select(
+            ["tenant_id", "product_id", "warehouse_id", "as_of", "on_hand"],
+            select(
+                literal(tenant_id, models.StockSnapshot.tenant_id.type), balances.c.product_id,
+                balances.c.warehouse_id, literal(as_of, models.StockSnapshot.as_of.type), balances.c.on_hand
+            ).where(balances.c.on_hand != 0)
+        )
+    ).rowcount
+    snapshot_run.products = inserted
+    db.commit()
+    return inserted
+
+
+def _balances(tenant_id, at: datetime, checkpoint: datetime | None):
+    """
+    Sous-requête (product_id, warehouse_id, on_hand) du stock juste avant `at` : lignes du point de contrôle
+    `checkpoint` plus mouvements de [checkpoint, at), ou tout l'historique antérieur sans point de contrôle.
+    """
+    snapshot, movement = models.StockSnapshot, models.StockMovement
+    movements = select(
+        movement.product_id, movement.warehouse_id, movement.quantity.label("on_hand")
+    ).where(movement.tenant_id == tenant_id, movement.timestamp < at)
+    if checkpoint is None:
+        rows = movements.subquery()
+    else:
+        rows = union_all(
+            select(snapshot.product_id, snapshot.warehouse_id, snapshot.on_hand)
+            .where(snapshot.tenant_id == tenant_id, snapshot.as_of == checkpoint),
+            movements.where(movement.timestamp >= checkpoint)
+        ).subquery()
+    return select(
+        rows.c.product_id, rows.c.warehouse_id, func.sum(rows.c.on_hand).label("on_hand")
+    ).group_by(rows.c.product_id, rows.c.warehouse_id).subquery()
+
+
+def nearest_reference(db: Session, tenant_id, at: datetime) -> Tuple[datetime | None, bool]:
+    """
+    Référence la plus proche de `at` (en temps, approximation du nombre de mouvements à relire) :
+    (point de contrôle, False) pour partir du point précédent, (point, True) pour repartir du point suivant,
+    (None, True) pour repartir du stock courant, (None, False) pour relire tout l'historique antérieur.
+    """
+    run = models.StockSnapshotRun
+    previous, following = db.query(
+        func.max(run.as_of).filter(run.as_of <= at), func.min(run.as_of).filter(run.as_of > at)
+    ).filter(run.tenant_id == tenant_id).one()
+
+    # Without a previous checkpoint, going forward means reading the history since the first movement
+    start = previous or db.query(func.min(models.StockMovement.timestamp)).filter(
+        models.StockMovement.tenant_id == tenant_id
+    ).scalar()
+    if start is None:
+        return None, False
+    after = (following or max(datetime.now(timezone.utc), at)) - at
+    if at - start <= after:
+        return previous, False
+    return following, True
+
+
+def _product_balances(tenant_id, at: datetime, reference: datetime | None, backward: bool):
+    """
+    Sous-requête (product_id, on_hand) du stock de chaque produit juste avant `at`, depuis la référence choisie
+    par nearest_reference. Stock de référence et mouvements sont agrégés chacun sur une seule table puis
+    rapprochés par FULL JOIN : le planificateur en estime bien la taille (jointures par hachage).
+    """
+    snapshot, movement, stock = models.StockSnapshot, models.StockMovement, models.ProductStock
+    moved = [movement.tenant_id == tenant_id]
+    if backward:
+        moved.append(movement.timestamp >= at)
+        if reference is not None:
+            moved.append(movement.timestamp < reference)
+    else:
+        moved.append(movement.timestamp < at)
+        if reference is not None:
+            moved.append(movement.timestamp >= reference)
+    delta = func.sum(-movement.quantity if backward else movement.quantity)
+    movements = select(movement.product_id, delta.label("quantity")).where(*moved).group_by(movement.product_id).subquery()
+
+    if reference is None and not backward:
+        return select(movements.c.product_id, movements.c.quantity.label("on_hand")).subquery()
+    if reference is None:
+        base = select(stock.product_id, func.sum(stock.on_hand).label("quantity")).where(
+            stock.tenant_id == tenant_id
+        ).group_by(stock.product_id).subquery()
+    else:
+        base = select(snapshot.product_id, func.sum(snapshot.on_hand).label("quantity")).where(
+            snapshot.tenant_id == tenant_id, snapshot.as_of == reference
+        ).group_by(snapshot.product_id).subquery()
+    return select(
+        func.coalesce(base.c.product_id, movements.c.product_id).label("product_id"),
+        (func.coalesce(base.c.quantity, 0) + func.coalesce(movements.c.quantity, 0)).label("on_hand")
+    ).select_from(base.outerjoin(movements, movements.c.product_id == base.c.product_id, full=True)).subquery()
+
+
+def stock_as_of(db: Session, tenant_id, at: datetime, product_name: str | None = None, category: str | None = None,
+                product_id=None, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+    """
+    Stock des produits juste avant `at` : totaux (unités, valeur, produits en stock) et une page de produits,
+    par stock décroissant. Les filtres portent sur le nom du produit, la catégorie ou un produit précis.
+    """
+    reference, backward = nearest_reference(db, tenant_id, at)
+    balances = _product_balances(tenant_id, at, reference, backward)
+    on_hand = balances.c.on_hand
+    value = on_hand * func.coalesce(models.Product.unit_price, 0)
+
+    query = (
+        db.query(
+            models.Product.id, models.Product.sku, models.Product.name,
+            models.Category.name.label("category_name"), on_hand.label("on_hand"),
+            func.count().over().label("total_products"),
+            func.sum(on_hand).over().label("total_units"),
+            func.sum(value).over().label("total_value"),
+            func.count().filter(on_hand > 0).over().label("in_stock"),
+        )
+        .select_from(balances)
+        # Tenant predicate on products too, so that only this tenant's products are read
+        .join(models.Product, (models.Product.id == balances.c.product_id) & (models.Product.tenant_id == tenant_id))
+        .outerjoin(models.Category, models.Category.id == models.Product.category_id)
+        .filter(on_hand != 0)
+    )
+    if product_id:
+        query = query.filter(models.Product.id == product_id)
+    if product_name:
+        query = query.filter(models.Product.name.ilike(f"%{product_name}%"))
+    if category:
+        query = query.filter(models.Category.name.ilike(f"%{category}%"))
+    rows = query.order_by(on_hand.desc(), models.Product.id).offset(offset).limit(limit).all()
+
+    first = rows[0] if rows else None
+    return {
+        "as_of": at,
+        "reference": reference.isoformat() if reference else ("current" if backward else "history"),
+        "total_products": first.total_products if first else 0,
+        "total_units": int(first.total_units or 0) if first else 0,
+        "total_value": float(first.total_value or 0) if first else 0.0,
+        "in_stock": first.in_stock if first else 0,
+        "items": [
+            {"product_id": row.id, "sku": row.sku, "name": row.name,
+             "category": row.category_name, "on_hand": int(row.on_hand)}
+            for row in rows
+        ],
+    }
+
+
+def missing_checkpoints(db: Session, tenant_id, until: datetime | None = None) -> List[datetime]:
+    """Débuts de mois sans point de contrôle, du premier mouvement du tenant jusqu'au mois courant."""
+    first = db.query(func.min(models.StockMovement.timestamp)).filter(
+        models.StockMovement.tenant_id == tenant_id
+    ).scalar()
+    if first is None:
+        return []
+    until = until or datetime.now(timezone.utc)
+    taken = {
+        as_of for (as_of,) in db.query(models.StockSnapshotRun.as_of).filter(models.StockSnapshotRun.tenant_id == tenant_id)
+    }
+    points, point = [], next_month(first)
+    while point <= until:
+        if point not in taken:
+            points.append(point)
+        point = next_month(point)
+    return points
+
+
+def take_missing_snapshots(db: Session, tenant_id, on_progress=None) -> int:
+    """Prend, dans l'ordre chronologique, les points de contrôle mensuels manquants (un commit par point)."""
+    points = missing_checkpoints(db, tenant_id)
+    for done, as_of in enumerate(points, start=1):
+        take_stock_snapshot(db, tenant_id, as_of)
+        if on_progress:
+            on_progress(done, len(points))
+    return len(points)
+
+
+def run_snapshot_job(job, db: Session, tenant_id):
+    """Point d'entrée exécuté par le JobManager pour la prise des points de contrôle d'un tenant."""
+    taken = take_missing_snapshots(db, tenant_id, on_progress=lambda done, total: job.report(done, checkpoints=total))
+    job.message = f"{taken} monthly stock snapshots taken." if taken else "Stock snapshots already up to date."
@@ -0,0 +1,267 @@
+# services/stock.py
+"""
+Lecture du stock courant depuis product_stock (tenu à jour par triggers), et reconstruction /
+vérification de cette table et du cumul journalier stock_movement_daily à partir de l'historique
+des mouvements.
+"""
+from typing import Dict, Any, List
+
+from sqlalchemy import func, text, or_
+from sqlalchemy.orm import Session
+
+import models
+
+
+def stock_level_subquery(db: Session, tenant_id):
+    """
+    Sous-requête (product_id, current_stock) : somme des stocks par entrepôt de chaque produit.
+    Coût proportionnel au nombre de produits, non à la longueur de l'historique.
+    """
+    return (
+        db.query(
+            models.ProductStock.product_id,
+            func.sum(models.ProductStock.on_hand).label("current_stock")
+        )
+        .filter(models.ProductStock.tenant_id == tenant_id)
+        .group_by(models.ProductStock.product_id)
+        .subquery()
+    )
+
+
+def current_stock(db: Session, tenant_id, product_ids: List) -> Dict[Any, int]:
+    """Stock courant des produits donnés."""
+    if not product_ids:
+        return {}
+    rows = db.query(models.ProductStock.product_id, func.sum(models.ProductStock.on_hand)).filter(
+        models.ProductStock.tenant_id == tenant_id,
+        models.ProductStock.product_id.in_(product_ids)
+    ).group_by(models.ProductStock.product_id)
+    return {product_id: int(total or 0) for product_id, total in rows}
+
+
+# Reorder point of the products that have none (LOW_STOCK).
+DEFAULT_REORDER_POINT = 5
+
+
+def status_condition(status: str | None, stock_level, reorder_point):
+    """
+    Condition SQL d'un filtre de statut du chat (OUT_OF_STOCK, LOW_STOCK, ACTIVE) sur des expressions
+    de stock et de seuil de réapprovisionnement, locales ou distantes ; None pour un autre statut.
+    """
+    if status == "OUT_OF_STOCK":
+        return stock_level <= 0
+    if status == "LOW_STOCK":
+        return stock_level <= func.coalesce(reorder_point, DEFAULT_REORDER_POINT)
+    if status == "ACTIVE":
+        return stock_level > 0
+    return None
+
+
+def warehouse_levels(db: Session, tenant_id, product_ids: List) -> Dict[Any, int]:
+    """Stock courant des produits donnés par entrepôt : {(product_id, warehouse_id): stock}."""
+    if not product_ids:
+        return {}
+    rows = db.query(models.ProductStock.product_id, models.ProductStock.warehouse_id, models.ProductStock.on_hand).filter(
+        models.ProductStock.tenant_id == tenant_id,
+        models.ProductStock.product_id.in_(product_ids)
+    )
+    return {(product_id, warehouse_id): int(on_hand) for product_id, warehouse_id, on_hand in rows}
+
+
+NO_WAREHOUSE_LABEL = "Sans entrepôt"
+
+
+def stock_by_warehouse(db: Session, tenant_id, product_ids: List) -> Dict[Any, List[Dict[str, Any]]]:
+    """Stock des produits donnés, par entrepôt (lignes de product_stock, sans stock nul)."""
+    if not product_ids:
+        return {}
+    rows = (
+        db.query(models.ProductStock.product_id, models.ProductStock.warehouse_id, models.Warehouse.code,
+                 models.Warehouse.name, models.ProductStock.on_hand)
+        .outerjoin(models.Warehouse, models.Warehouse.id == models.ProductStock.warehouse_id)
+        .filter(
+            models.ProductStock.tenant_id == tenant_id,
+            models.ProductStock.product_id.in_(product_ids),
+            models.ProductStock.on_hand != 0
+        )
+        .order_by(models.ProductStock.on_hand.desc())
+    )
+    levels: Dict[Any, List[Dict[str, Any]]] = {}
+    for product_id, warehouse_id, code, name, on_hand in rows:
+        levels.setdefault(product_id, []).append({
+            "warehouse_id": warehouse_id, "warehouse_code": code,
+            "warehouse_name": name or NO_WAREHOUSE_LABEL, "on_hand": int(on_hand),
+        })
+    return levels
+
+
+def find_warehouses(db: Session, tenant_id, term: str) -> List[models.Warehouse]:
+    """Entrepôts désignés par `term` : code exact, ou nom / adresse contenant le terme (ex: une ville)."""
+    pattern = f"%{term}%"
+    return db.query(models.Warehouse).filter(
+        models.Warehouse.tenant_id == tenant_id,
+        or_(
+            func.lower(models.Warehouse.code) == term.lower(),
+            models.Warehouse.name.ilike(pattern),
+            models.Warehouse.address.ilike(pattern)
+        )
+    ).order_by(models.Warehouse.name).all()
+
+
+def warehouse_totals(db: Session, tenant_id, warehouse_ids: List | None = None) -> List[Dict[str, Any]]:
+    """
+    Totaux par entrepôt, par unités décroissantes, agrégés à la lecture sur la plage (tenant, entrepôt)
+    de ix_product_stock_tenant_warehouse. Sans `warehouse_ids`, tous les entrepôts du tenant, y compris
+    le stock sans entrepôt.
+    """
+    stock = models.ProductStock
+    # No stored per-warehouse row: concurrent writers of one warehouse never wait on each other
+    totals = (
+        db.query(
+            stock.warehouse_id,
+            func.sum(stock.on_hand).label("units"),
+            func.count().label("skus"),
+            func.count().filter(stock.on_hand > 0).label("skus_in_stock"),
+            func.sum(stock.on_hand * func.coalesce(models.Product.unit_price, 0)).label("stock_value"),
+        )
+        .join(models.Product, models.Product.id == stock.product_id)
+        .filter(stock.tenant_id == tenant_id)
+    )
+    if warehouse_ids is not None:
+        totals = totals.filter(stock.warehouse_id.in_(warehouse_ids))
+    totals = totals.group_by(stock.warehouse_id).subquery()
+    rows = (
+        db.query(totals, models.Warehouse.code, models.Warehouse.name)
+        .outerjoin(models.Warehouse, models.Warehouse.id == totals.c.warehouse_id)
+        .order_by(totals.c.units.desc())
+    )
+    return [
+        {
+            "warehouse_id": warehouse_id, "warehouse_code": code, "warehouse_name": name or NO_WAREHOUSE_LABEL,
+            "units": int(units), "skus": skus, "skus_in_stock": skus_in_stock,
+            "skus_out_of_stock": skus - skus_in_stock, "stock_value": float(stock_value),
+        }
+        for warehouse_id, units, skus, skus_in_stock, stock_value, code, name in rows
+    ]
+
+
+def warehouse_products(db: Session, tenant_id, warehouse_ids: List, out_of_stock: bool = False,
+                       limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    Produits des entrepôts donnés : plus gros stocks, ou ruptures (stock <= 0) si `out_of_stock`.
+    Les `limit` lignes sont choisies dans la plage (tenant, entrepôt) de l'index ix_product_stock_tenant_warehouse
+    (parcours d'index seul) avant la jointure avec les produits.
+    """
+    stock = models.ProductStock
+    order = (stock.on_hand, stock.product_id) if out_of_stock else (stock.on_hand.desc(), stock.product_id)
+    top = (
+        db.query(stock.product_id, stock.warehouse_id, stock.on_hand)
+        .filter(stock.tenant_id == tenant_id, stock.warehouse_id.in_(warehouse_ids))
+    )
+    if out_of_stock:
+        top = top.filter(stock.on_hand <= 0)
+    top = top.order_by(*order).limit(limit).subquery()
+    rows = (
+        db.query(models.Product.sku, models.Product.name, models.Warehouse.name, top.c.on_hand)
+        .select_from(top)
+        .join(models.Product, models.Product.id == top.c.product_id)
+        .join(models.Warehouse, models.Warehouse.id == top.c.warehouse_id)
+        .order_by(top.c.on_hand if out_of_stock else top.c.on_hand.desc(), top.c.product_id)
+    )
+    return [
+        {"sku": sku, "name": name, "warehouse_name": warehouse_name, "on_hand": int(on_hand)}
+        for sku, name, warehouse_name, on_hand in rows
+    ]
+
+
+_STOCK_DIFF = f"""
+    WITH expected AS (
+        SELECT tenant_id, product_id, {models.PRODUCT_STOCK_KEY} AS warehouse_key, SUM(quantity) AS on_hand
+        FROM stock_movements {{where}} GROUP BY 1, 2, 3
+    ), actual AS (
+        SELECT tenant_id, product_id, {models.PRODUCT_STOCK_KEY} AS warehouse_key, on_hand
+        FROM product_stock {{where}}
+    )
+    SELECT COALESCE(e.product_id, a.product_id) AS product_id, e.on_hand AS expected, a.on_hand AS actual
+    FROM expected e FULL OUTER JOIN actual a
+      ON a.product_id = e.product_id AND a.warehouse_key = e.warehouse_key
+    WHERE COALESCE(e.on_hand, 0) <> COALESCE(a.on_hand, 0)
+"""
+
+
+def verify_product_stock(db: Session, tenant_id=None, sample: int = 10) -> Dict[str, Any]:
+    """Compare product_stock à la somme des mouvements ; retourne le nombre d'écarts et un échantillon."""
+    where = "WHERE tenant_id = :tenant_id" if tenant_id else ""
+    params = {"tenant_id": tenant_id} if tenant_id else {}
+    rows = db.execute(text(_STOCK_DIFF.format(where=where)), params).all()
+    return {
+        "mismatches": len(rows),
+        "sample": [
+            {"product_id": str(product_id), "expected": expected, "actual": actual}
+            for product_id, expected, actual in rows[:sample]
+        ],
+    }
+
+
+def rebuild_product_stock(db: Session, tenant_id=None) -> int:
+    """
+    Recalcule product_stock depuis stock_movements (tout ou un tenant), en une transaction.
+    Les écritures de mouvements sont bloquées le temps du recalcul pour ne pas en perdre.
+    """
+    db.execute(text("LOCK TABLE stock_movements IN SHARE MODE"))
+    stale = db.query(models.ProductStock)
+    if tenant_id:
+        stale = stale.filter(models.ProductStock.tenant_id == tenant_id)
+    stale.delete(synchronize_session=False)
+    where = "WHERE tenant_id = :tenant_id" if tenant_id else ""
+    result = db.execute(text(models.PRODUCT_STOCK_REBUILD.format(where=where)), {"tenant_id": tenant_id} if tenant_id else {})
+    db.commit()
+    return result.rowcount
+
+
+_DAILY_DIFF = f"""
+    WITH expected AS (
+        SELECT product_id, {models.PRODUCT_STOCK_KEY} AS warehouse_key, {models.MOVEMENT_DAY} AS day, movement_type,
+               SUM(GREATEST(quantity, 0)) AS quantity_in, SUM(GREATEST(-quantity, 0)) AS quantity_out,
+               COUNT(*) AS movement_count
+        FROM stock_movements {{where}} GROUP BY 1, 2, 3, 4
+    ), actual AS (
+        SELECT product_id, {models.PRODUCT_STOCK_KEY} AS warehouse_key, day, movement_type,
+               quantity_in, quantity_out, movement_count
+        FROM stock_movement_daily {{where}}
+    )
+    SELECT COALESCE(e.product_id, a.product_id), COALESCE(e.day, a.day), COALESCE(e.movement_type, a.movement_type),
+           e.movement_count, a.movement_count
+    FROM expected e FULL OUTER JOIN actual a
+      ON a.product_id = e.product_id AND a.warehouse_key = e.warehouse_key
+     AND a.day = e.day AND a.movement_type = e.movement_type
+    WHERE (e.quantity_in, e.quantity_out, e.movement_count) IS DISTINCT FROM (a.quantity_in, a.quantity_out, a.movement_count)
+"""
+
+
+def verify_movement_daily(db: Session, tenant_id=None, sample: int = 10) -> Dict[str, Any]:
+    """Compare stock_movement_daily au regroupement des mouvements par jour ; nombre d'écarts et échantillon."""
+    where = "WHERE tenant_id = :tenant_id" if tenant_id else ""
+    params = {"tenant_id": tenant_id} if tenant_id else {}
+    rows = db.execute(text(_DAILY_DIFF.format(where=where)), params).all()
+    return {
+        "mismatches": len(rows),
+        "sample": [
+            {"product_id": str(product_id), "day": str(day), "movement_type": movement_type,
+             "expected": expected, "actual": actual}
+            for product_id, day, movement_type, expected, actual in rows[:sample]
+        ],
+    }
+
+
+def rebuild_movement_daily(db: Session, tenant_id=None) -> int:
+    """Recalcule stock_movement_daily depuis stock_movements (tout ou un tenant), en une transaction."""
+    db.execute(text("LOCK TABLE stock_movements IN SHARE MODE"))
+    stale = db.query(models.StockMovementDaily)
+    if tenant_id:
+        stale = stale.filter(models.StockMovementDaily.tenant_id == tenant_id)
+    stale.delete(synchronize_session=False)
+    where = "WHERE tenant_id = :tenant_id" if tenant_id else ""
+    result = db.execute(text(models.STOCK_MOVEMENT_DAILY_REBUILD.format(where=where)), {"tenant_id": tenant_id} if tenant_id else {})
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,203 @@
+# services/upload_store.py
+import os
+import gzip
+import uuid
+import shutil
+import asyncio
+import hashlib
+import logging
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO
+
+from fastapi import UploadFile
+from sqlalchemy import text, or_
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "uploads"
+OBJECTS_DIR = os.path.join(UPLOAD_DIR, "objects")
+TMP_DIR = os.path.join(UPLOAD_DIR, "tmp")
+
+# Bytes read per await on the upload.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+
+# connection_config key of a delta's new file until the delta succeeds (the previous file stays in use).
+PENDING_UPLOAD = "pending_upload"
+
+
+class StoredUpload:
+    def __init__(self, content_hash: str, path: str, size: int, tmp_path: str | None = None):
+        self.content_hash = content_hash
+        self.path = path
+        self.size = size
+        # Written but not moved to `path` yet: see keep_object
+        self.tmp_path = tmp_path
+
+
+def object_path(content_hash: str) -> str:
+    """Chemin adressé par le contenu : uploads/objects/ab/abcdef....gz"""
+    return os.path.join(OBJECTS_DIR, content_hash[:2], f"{content_hash}.gz")
+
+
+class _ObjectWriter:
+    """Écrit un flux dans un fichier temporaire compressé en calculant son SHA-256."""
+
+    def __init__(self):
+        os.makedirs(TMP_DIR, exist_ok=True)
+        self.tmp_path = os.path.join(TMP_DIR, f"{uuid.uuid4()}.gz")
+        self._out = gzip.open(self.tmp_path, "wb", compresslevel=COMPRESS_LEVEL)
+        self._hasher = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes):
+        self._hasher.update(chunk)
+        self._out.write(chunk)
+        self.size += len(chunk)
+
+    def abort(self):
+        self._out.close()
+        os.remove(self.tmp_path)
+
+    def finish(self) -> StoredUpload:
+        # The object is put in place by keep_object, in the transaction that references it
+        self._out.close()
+        content_hash = self._hasher.hexdigest()
+        return StoredUpload(content_hash, object_path(content_hash), self.size, self.tmp_path)
+
+
+async def store_upload(file: UploadFile) -> StoredUpload:
+    """
+    Copie l'upload sur disque par blocs, en calculant son SHA-256 et en le compressant (gzip) au vol.
+    Le fichier sera rangé sous son empreinte (keep_object) : un contenu identique n'est stocké qu'une fois.
+    """
+    writer = _ObjectWriter()
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            # Hashing + compression are CPU-bound: keep them off the event loop
+            await asyncio.to_thread(writer.write, chunk)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.finish()
+
+
+def store_fileobj(fileobj: BinaryIO) -> StoredUpload:
+    """Équivalent synchrone de store_upload, pour un objet fichier (ex: upload Streamlit)."""
+    writer = _ObjectWriter()
+    try:
+        while True:
+            chunk = fileobj.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.write(chunk)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.finish()
+
+
+def find_duplicate(db: Session, tenant_id, content_hash: str) -> models.DataSource | None:
+    """Source déjà importée par ce tenant avec exactement les mêmes octets (hors imports en échec ou supprimés)."""
+    return db.query(models.DataSource).filter(
+        models.DataSource.tenant_id == tenant_id,
+        models.DataSource.type == models.DataSourceType.FILE_UPLOAD,
+        models.DataSource.connection_config["content_hash"].as_string() == content_hash,
+        models.DataSource.status.notin_([models.DataSourceStatus.ERROR, models.DataSourceStatus.INACTIVE])
+    ).order_by(models.DataSource.created_at.desc()).first()
+
+
+def lock_object(db: Session, content_hash: str):
+    """Verrou sur l'objet d'une empreinte, jusqu'à la fin de la transaction en cours."""
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtextextended(:content_hash, 0))"), {"content_hash": content_hash})
+
+
+def keep_object(db: Session, stored: StoredUpload):
+    """
+    Range un upload sous son empreinte, ou réutilise l'objet déjà stocké, sous le verrou de l'objet :
+    la source qui le référence doit être écrite dans la même transaction. release_file prend le même
+    verrou et ne voit que les sources validées : l'objet ne disparaît pas entre les deux.
+    """
+    lock_object(db, stored.content_hash)
+    if stored.tmp_path is None:
+        return
+    if os.path.exists(stored.path):
+        os.remove(stored.tmp_path)
+    else:
+        os.makedirs(os.path.dirname(stored.path), exist_ok=True)
+        os.replace(stored.tmp_path, stored.path)
+    stored.tmp_path = None
+
+
+def discard_upload(stored: StoredUpload):
+    """Supprime un upload qui ne sera pas rangé (ex: doublon d'un import existant)."""
+    if stored.tmp_path and os.path.exists(stored.tmp_path):
+        os.remove(stored.tmp_path)
+    stored.tmp_path = None
+
+
+def release_file(db: Session, file_path: str | None, content_hash: str | None, data_source_id=None):
+    """
+    Supprime un fichier stocké, sauf s'il est encore référencé par une source autre que `data_source_id`
+    (comme fichier courant ou comme nouvelle version en attente d'un delta). Le verrou de l'objet est
+    gardé jusqu'au commit de l'appelant (voir keep_object).
+    """
+    if not file_path:
+        return
+
+    if content_hash:
+        lock_object(db, content_hash)
+        config = models.DataSource.connection_config
+        still_used = db.query(models.DataSource.id).filter(
+            or_(
+                config["content_hash"].as_string() == content_hash,
+                config[(PENDING_UPLOAD, "content_hash")].as_string() == content_hash
+            )
+        )
+        if data_source_id is not None:
+            still_used = still_used.filter(models.DataSource.id != data_source_id)
+        if still_used.first():
+            return
+
+    try:
+        os.remove(file_path)
+        logger.info("Deleted stored upload %s", file_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning("Could not delete stored upload %s: %s", file_path, e)
+
+
+def release_object(db: Session, data_source: models.DataSource):
+    """Supprime les fichiers stockés d'une source (fichier courant et version en attente), s'ils ne servent qu'à elle."""
+    config = data_source.connection_config or {}
+    for stored in (config, config.get(PENDING_UPLOAD) or {}):
+        release_file(db, stored.get("file_path"), stored.get("content_hash"), data_source.id)
+
+
+@contextmanager
+def open_for_parsing(file_path: str, filename: str):
+    """
+    Fournit un chemin lisible par le parseur. Les CSV compressés sont lus directement par pandas ;
+    les classeurs Excel (archives zip nécessitant des seek) sont décompressés dans un fichier temporaire.
+    """
+    if not file_path.endswith(".gz") or filename.endswith(".csv"):
+        yield file_path
+        return
+
+    os.makedirs(TMP_DIR, exist_ok=True)
+    suffix = os.path.splitext(filename)[1]
+    with tempfile.NamedTemporaryFile(dir=TMP_DIR, suffix=suffix, delete=False) as tmp:
+        with gzip.open(file_path, "rb") as src:
+            shutil.copyfileobj(src, tmp, UPLOAD_CHUNK_SIZE)
+    try:
+        yield tmp.name
+    finally:
+        os.remove(tmp.name)
@@ -35,4 +35,27 @@ class VisualizationService:
         
         return json.loads(json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder))
 
+    def create_line_chart(self, data: list, x_key: str, y_key: str, title: str, x_label: str, y_label: str,
+                          series_key: str | None = None):
+        """Génère la config JSON pour un Line Chart (une courbe par valeur de series_key)"""
+        series = {}
+        for item in data:
+            series.setdefault(item[series_key] if series_key else y_label, []).append(item)
+
+        fig = go.Figure(data=[
+            go.Scatter(name=str(name), x=[item[x_key] for item in items], y=[item[y_key] for item in items], mode='lines+markers')
+            for name, items in series.items()
+        ])
+
+        fig.update_layout(
+            title=title,
+            xaxis_title=x_label,
+            yaxis_title=y_label,
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(family="Inter, sans-serif")
+        )
+
+        return json.loads(json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder))
+
 viz_service = VisualizationService()
\ No newline at end of file
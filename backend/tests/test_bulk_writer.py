@@ -0,0 +1,35 @@
+# tests/test_bulk_writer.py
+"""Écriture en masse des produits : un SKU créé entre-temps par un autre import est rattaché, pas dupliqué."""
+import uuid
+
+import pytest
+
+import models
+import services.bulk_writer as bulk_writer
+from services.bulk_writer import write_products
+
+
+@pytest.fixture(params=["insert", "copy"])
+def write_path(request, monkeypatch):
+    """Écrit les produits par INSERT multi-lignes ou par COPY + table de staging."""
+    monkeypatch.setattr(bulk_writer, "COPY_THRESHOLD_ROWS", 1 if request.param == "copy" else 10 ** 9)
+    return request.param
+
+
+def product(tenant, sku):
+    return {"id": uuid.uuid4(), "tenant_id": tenant.id, "sku": sku, "name": f"Produit {sku}", "unit_price": 1}
+
+
+def test_existing_skus_are_remapped(db, tenant, write_path):
+    existing = models.Product(id=uuid.uuid4(), tenant_id=tenant.id, sku="TAKEN", name="Déjà là", unit_price=2)
+    db.add(existing)
+    db.commit()
+
+    rows = [product(tenant, "TAKEN"), product(tenant, "NEW")]
+    remapped = write_products(db, rows)
+    db.commit()
+
+    assert remapped == {"TAKEN": existing.id}
+    stored = dict(db.query(models.Product.sku, models.Product.id).filter(models.Product.tenant_id == tenant.id))
+    assert stored == {"TAKEN": existing.id, "NEW": rows[1]["id"]}
+    assert db.get(models.Product, existing.id).name == "Déjà là"
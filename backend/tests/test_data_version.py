@@ -0,0 +1,57 @@
+# tests/test_data_version.py
+"""Version des données d'un tenant (cache du chat) : une incrémentation par transaction validée."""
+import uuid
+
+from sqlalchemy import text
+
+import models
+import services.query as query
+from services.query import QueryService, data_version
+
+
+def add_category(conn, tenant_id):
+    conn.execute(
+        text("INSERT INTO categories (id, name, tenant_id) VALUES (:id, :name, :tenant_id)"),
+        {"id": uuid.uuid4(), "name": f"Catégorie {uuid.uuid4().hex[:8]}", "tenant_id": tenant_id}
+    )
+
+
+def test_version_bumped_once_per_transaction_at_commit(db, engine, tenant):
+    before = data_version(db, tenant.id)
+
+    with engine.connect() as first, engine.connect() as second:
+        add_category(first, tenant.id)
+        add_category(first, tenant.id)
+        # A concurrent writer of the same tenant does not wait for the first transaction
+        second.execute(text("SET lock_timeout = '1s'"))
+        add_category(second, tenant.id)
+        assert data_version(db, tenant.id) == before
+        second.commit()
+        db.commit()
+        assert data_version(db, tenant.id) == before + 1
+        first.commit()
+
+    db.commit()
+    assert data_version(db, tenant.id) == before + 2
+    assert db.query(models.TenantDataChange).count() == 0
+
+
+def test_rolled_back_writes_keep_the_version(db, engine, tenant):
+    before = data_version(db, tenant.id)
+    with engine.connect() as conn:
+        add_category(conn, tenant.id)
+        conn.rollback()
+    assert data_version(db, tenant.id) == before
+
+
+def test_cache_counters_are_bounded(monkeypatch):
+    monkeypatch.setattr(query, "QUERY_COUNTERS_MAX_TENANTS", 2)
+    service = QueryService()
+    tenants = [str(uuid.uuid4()) for _ in range(3)]
+    for tenant_id in tenants:
+        service._count(tenant_id, hit=False)
+    service._count(tenants[2], hit=True)
+
+    # The oldest tenant's counters were evicted
+    assert service.cache_stats(tenants[0])["tenant"] == {"hits": 0, "misses": 0}
+    assert service.cache_stats(tenants[2])["tenant"] == {"hits": 1, "misses": 1}
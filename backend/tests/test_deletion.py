@@ -0,0 +1,27 @@
+# tests/test_deletion.py
+"""Suppression d'une source par lots : tout ce que la source a écrit disparaît, le reste est conservé."""
+import models
+from services.deletion import delete_data_source_in_batches
+from services.ingestion import SOURCE_REFERENCE_TYPE
+from services.stock import current_stock
+
+
+def test_movements_on_other_sources_products_are_deleted(db, tenant, upload, assert_consistent):
+    _, owner, _ = upload("owner.csv", [("A1", "Alpha", 2, 10)])
+    # A1 belongs to the first source: the second one only adds stock to it
+    _, other, _ = upload("other.csv", [("A1", "Alpha", 2, 4), ("B1", "Beta", 1, 3)])
+    product_id = db.query(models.Product.id).filter(
+        models.Product.tenant_id == tenant.id, models.Product.sku == "A1"
+    ).scalar()
+    assert current_stock(db, tenant.id, [product_id]) == {product_id: 14}
+
+    counts = delete_data_source_in_batches(db, other)
+
+    assert counts == {"movements_deleted": 2, "products_deleted": 1}
+    assert current_stock(db, tenant.id, [product_id]) == {product_id: 10}
+    assert db.query(models.StockMovement).filter(
+        models.StockMovement.reference_type == SOURCE_REFERENCE_TYPE,
+        models.StockMovement.reference_id == str(other.id)
+    ).count() == 0
+    assert db.get(models.DataSource, owner.id) is not None
+    assert_consistent(tenant.id)
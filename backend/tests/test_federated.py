@@ -0,0 +1,103 @@
+# tests/test_federated.py
+"""Mode fédéré : questions du chat compilées en SQL sur une base « distante » (un schéma de la base de test)."""
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+import models
+import services.federated as federated
+from services.federated import FederatedQueryService
+
+# (ref_art, libelle, qte, seuil)
+ARTICLES = (
+    [(f"CH{i:02}", "Chaise", 30 + i, None) for i in range(12)]
+    + [("L1", "Lampe", 4, None), ("L2", "Lampe de bureau", 6, None), ("L3", "Grande lampe", 15, 20)]
+    + [(f"T{i}", f"Table {i}", 0, 2) for i in range(10)]
+)
+
+
+@pytest.fixture
+def remote(engine, monkeypatch):
+    """Table erp.articles d'un client, lue à travers le mapping du mode fédéré."""
+    schema = f"erp_{uuid.uuid4().hex[:8]}"
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+        conn.execute(text(
+            f"CREATE TABLE {schema}.articles (ref_art text PRIMARY KEY, libelle text, pv numeric, qte integer, seuil integer)"
+        ))
+        conn.execute(
+            text(f"INSERT INTO {schema}.articles VALUES (:ref, :name, 10, :qty, :threshold)"),
+            [{"ref": ref, "name": name, "qty": qty, "threshold": threshold} for ref, name, qty, threshold in ARTICLES]
+        )
+    monkeypatch.setattr(federated.engine_pool, "get", lambda data_source: engine)
+    statements = []
+    run = FederatedQueryService._run
+    monkeypatch.setattr(FederatedQueryService, "_run", lambda self, ds, statement: statements.append(statement) or run(self, ds, statement))
+
+    data_source = models.DataSource(
+        id=uuid.uuid4(), tenant_id=uuid.uuid4(), name="ERP", type=models.DataSourceType.SQL_CONNECTOR,
+        connection_config={"mode": "federated", "federated": {"products": {
+            "table": f"{schema}.articles",
+            "columns": {"ref_art": "sku", "libelle": "name", "pv": "unit_price", "qte": "quantity", "seuil": "reorder_point"},
+        }}}
+    )
+    yield data_source, statements
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+
+def ask(data_source, intent, **entities):
+    return FederatedQueryService().execute(data_source, intent, entities)["text"]
+
+
+def test_list_pages_follow_the_keyset(remote):
+    data_source, _ = remote
+
+    answers = [ask(data_source, "LIST_PRODUCTS")]
+    while "page suivante" in answers[-1]:
+        answers.append(ask(data_source, "LIST_PRODUCTS", page="next"))
+
+    assert answers[0].startswith(f"Voici les produits trouvés ({len(ARTICLES)})")
+    assert answers[-1].startswith(f"Produits 21 à {len(ARTICLES)} sur {len(ARTICLES)}")
+    # Twelve products share a name: each is listed once across the pages
+    assert sum(answer.count("**Chaise**") for answer in answers) == 12
+    assert "pas de liste en cours" in ask(data_source, "LIST_PRODUCTS", page="next")
+
+
+def test_low_stock_uses_the_reorder_point(remote):
+    data_source, _ = remote
+
+    answer = ask(data_source, "LIST_PRODUCTS", filter_status="LOW_STOCK")
+
+    # Lampe: 4 <= 5 (default), Grande lampe: 15 <= 20, Tables: 0 <= 2; Lampe de bureau: 6 > 5
+    assert answer.startswith("Voici les produits trouvés (12)")
+    assert "**Grande lampe**" in answer and "**Lampe de bureau**" not in answer
+
+
+def test_search_is_one_ranked_query(remote):
+    data_source, statements = remote
+
+    answer = ask(data_source, "SEARCH_PRODUCT", product_name="lampe")
+
+    assert len(statements) == 1
+    names = [line.split("**")[1] for line in answer.splitlines() if "**" in line]
+    assert names == ["Lampe", "Lampe de bureau", "Grande lampe"]
+
+
+def test_cache_key_ignores_case_and_blank_entities(remote):
+    data_source, statements = remote
+
+    first = ask(data_source, "SEARCH_PRODUCT", product_name="Lampe  de bureau")
+    again = ask(data_source, "SEARCH_PRODUCT", product_name="lampe de bureau", category="")
+
+    assert again == first
+    assert len(statements) == 1
+
+
+@pytest.mark.parametrize("intent", sorted(federated.LOCAL_ONLY_INTENTS))
+def test_history_intents_are_not_available(remote, intent):
+    data_source, statements = remote
+
+    assert "en mode fédéré" in ask(data_source, intent)
+    assert statements == []
@@ -0,0 +1,173 @@
+# tests/test_ingestion.py
+"""Imports de fichiers : delta, échec puis renvoi, ré-ingestion depuis l'archive, reprise au démarrage."""
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+import models
+import services.delta as delta
+import services.ingestion as ingestion
+from services.ingestion import (
+    UPLOAD_DELTA, UPLOAD_FULL, SOURCE_REFERENCE_TYPE, BulkIngestor,
+    reprocess_data_source, recover_interrupted_imports
+)
+from services.parsing import iter_file_chunks
+from services.stock import current_stock
+from services.upload_store import PENDING_UPLOAD, find_duplicate
+
+
+def stock_by_sku(db, tenant_id):
+    products = dict(db.query(models.Product.sku, models.Product.id).filter(models.Product.tenant_id == tenant_id))
+    levels = current_stock(db, tenant_id, list(products.values()))
+    return {sku: levels.get(product_id, 0) for sku, product_id in products.items()}
+
+
+def test_delta_added_changed_removed(db, tenant, upload, assert_consistent):
+    mode, data_source, _ = upload("stock.csv", [("A", "Alpha", 10, 10), ("B", "Beta", 5, 5), ("C", "Gamma", 3, 3)])
+    assert mode == UPLOAD_FULL
+    first_config = dict(data_source.connection_config)
+
+    # A: new name and quantity, B: removed, C: unchanged, D: new
+    mode, again, summary = upload("stock.csv", [("A", "Alpha v2", 10, 12), ("C", "Gamma", 3, 3), ("D", "Delta", 4, 4)])
+    assert mode == UPLOAD_DELTA and again.id == data_source.id
+    assert (summary["added"], summary["updated"], summary["adjusted"]) == (1, 1, 2)
+
+    assert stock_by_sku(db, tenant.id) == {"A": 12, "B": 0, "C": 3, "D": 4}
+    names = dict(db.query(models.Product.sku, models.Product.name).filter(models.Product.tenant_id == tenant.id))
+    assert names["A"] == "Alpha v2"
+    adjustments = db.query(models.StockMovement.quantity).filter(
+        models.StockMovement.tenant_id == tenant.id, models.StockMovement.movement_type == "ADJUSTMENT",
+        models.StockMovement.reference_id == str(data_source.id)
+    )
+    assert sorted(quantity for quantity, in adjustments) == [-5, 2]
+    # The new version replaces the previous file only once the delta is committed
+    assert not os.path.exists(first_config["file_path"])
+    assert os.path.exists(again.connection_config["file_path"])
+    assert PENDING_UPLOAD not in again.connection_config
+    assert_consistent(tenant.id)
+
+
+def test_failed_delta_keeps_the_previous_file(db, tenant, upload, workdir, monkeypatch):
+    _, data_source, _ = upload("stock.csv", [("A", "Alpha", 10, 10)])
+    previous_config = dict(data_source.connection_config)
+
+    def failing_write(db, movements):
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(delta, "write_movements", failing_write)
+    with pytest.raises(RuntimeError):
+        upload("stock.csv", [("A", "Alpha", 10, 7)])
+
+    db.refresh(data_source)
+    assert data_source.status == models.DataSourceStatus.ERROR
+    assert data_source.connection_config == previous_config
+    assert os.path.exists(previous_config["file_path"])
+    # The file received for the failed delta is not kept
+    assert [str(path) for path in workdir.rglob("*.gz")] == [str(workdir / previous_config["file_path"])]
+    assert stock_by_sku(db, tenant.id) == {"A": 10}
+
+
+def test_failed_import_is_purged_and_can_be_retried(db, tenant, upload, monkeypatch, assert_consistent):
+    upload("other.csv", [("S1", "Shared", 1, 7)])
+    rows = [("S1", "Shared", 1, 1), ("F1", "One", 1, 1), ("F2", "Two", 1, 2), ("F3", "Three", 1, 3)]
+
+    failures = []
+
+    def failing_chunks(path, filename):
+        # Two committed chunks, then the third one fails (first attempt only)
+        for index, chunk in enumerate(iter_file_chunks(path, filename, chunksize=2)):
+            if index == 1 and not failures:
+                failures.append(index)
+                raise RuntimeError("disk full")
+            yield chunk
+
+    monkeypatch.setattr(ingestion, "iter_file_chunks", failing_chunks)
+    with pytest.raises(RuntimeError):
+        upload("failing.csv", rows)
+
+    failed = db.query(models.DataSource).filter(
+        models.DataSource.tenant_id == tenant.id, models.DataSource.name == "failing.csv"
+    ).one()
+    assert failed.status == models.DataSourceStatus.ERROR
+    # The committed chunk is gone; the product fed by another source is kept
+    assert stock_by_sku(db, tenant.id) == {"S1": 7}
+    assert find_duplicate(db, tenant.id, failed.connection_config["content_hash"]) is None
+
+    mode, _, _ = upload("failing.csv", rows)
+    assert mode == UPLOAD_FULL
+    assert stock_by_sku(db, tenant.id) == {"S1": 8, "F1": 1, "F2": 2, "F3": 3}
+    assert_consistent(tenant.id)
+
+
+def test_reprocess_keeps_other_movements(db, tenant, upload, assert_consistent):
+    _, source_a, _ = upload("a.csv", [("A1", "Alpha", 2, 10), ("A2", "Beta", 1, 4)])
+    upload("b.csv", [("A1", "Alpha", 2, 5)])
+    product_id = db.query(models.Product.id).filter(
+        models.Product.tenant_id == tenant.id, models.Product.sku == "A1"
+    ).scalar()
+    manual = models.StockMovement(
+        id=uuid.uuid4(), tenant_id=tenant.id, product_id=product_id, movement_type="ADJUSTMENT", quantity=-3,
+        timestamp=datetime(2025, 1, 1, tzinfo=timezone.utc), notes="Inventaire"
+    )
+    db.add(manual)
+    # Source A's movements were written on different days
+    for day, sku in enumerate(("A1", "A2"), start=1):
+        db.query(models.StockMovement).filter(
+            models.StockMovement.reference_id == str(source_a.id),
+            models.StockMovement.product_id == db.query(models.Product.id).filter(
+                models.Product.tenant_id == tenant.id, models.Product.sku == sku
+            ).scalar_subquery()
+        ).update({"timestamp": datetime(2025, 2, day, tzinfo=timezone.utc)}, synchronize_session=False)
+    db.commit()
+
+    def source_movements():
+        return sorted(
+            (str(ref), quantity, timestamp) for ref, quantity, timestamp in db.query(
+                models.StockMovement.reference_id, models.StockMovement.quantity, models.StockMovement.timestamp
+            ).filter(models.StockMovement.tenant_id == tenant.id)
+        )
+
+    products_before = dict(db.query(models.Product.sku, models.Product.id).filter(models.Product.tenant_id == tenant.id))
+    movements_before = source_movements()
+
+    reprocess_data_source(db, source_a, None)
+
+    products_after = dict(db.query(models.Product.sku, models.Product.id).filter(models.Product.tenant_id == tenant.id))
+    assert products_after == products_before
+    # Same quantities at the same dates: other sources, manual entries and the rollups are untouched
+    assert source_movements() == movements_before
+    assert stock_by_sku(db, tenant.id) == {"A1": 12, "A2": 4}
+    assert db.query(models.StockMovement).filter(
+        models.StockMovement.reference_type == SOURCE_REFERENCE_TYPE,
+        models.StockMovement.reference_id == str(source_a.id)
+    ).count() == 2
+    assert_consistent(tenant.id)
+
+
+def test_interrupted_import_is_failed_at_startup(db, tenant, workdir, assert_consistent):
+    data_source = models.DataSource(
+        name="crash.csv", type=models.DataSourceType.FILE_UPLOAD, tenant_id=tenant.id,
+        connection_config={"content_hash": uuid.uuid4().hex}, status=models.DataSourceStatus.PENDING,
+        last_sync_status="QUEUED"
+    )
+    db.add(data_source)
+    db.commit()
+    # First chunk committed, then the process stops
+    ingestor = BulkIngestor(db, tenant.id, None, data_source.id, "crash.csv", keep_archive=False)
+    ingestor.write_records([{
+        "sku": "C1", "name": "Crash", "category": "Général", "supplier_name": None,
+        "unit_price": 1, "cost_price": None, "quantity": 3, "warehouse": None
+    }])
+    data_source.last_sync_status = "PROCESSING"
+    db.commit()
+
+    assert recover_interrupted_imports(db) >= 1
+
+    db.refresh(data_source)
+    assert data_source.status == models.DataSourceStatus.ERROR
+    assert data_source.last_sync_status == "FAILED"
+    assert db.query(models.Product).filter(models.Product.tenant_id == tenant.id).count() == 0
+    assert find_duplicate(db, tenant.id, data_source.connection_config["content_hash"]) is None
+    assert_consistent(tenant.id)
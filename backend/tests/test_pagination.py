@@ -0,0 +1,95 @@
+# tests/test_pagination.py
+"""Pagination par clé des listes de produits et de mouvements (curseurs X-Next-Cursor)."""
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import models
+from services.pagination import encode_cursor, decode_cursor
+
+SAME_INSTANT = datetime(2026, 5, 4, 8, 15, 30, 123456, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def client(tenant):
+    import main
+    from routers.data_source import get_current_user
+
+    main.app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(tenant_id=tenant.id, id=None)
+    yield TestClient(main.app)
+    main.app.dependency_overrides.pop(get_current_user, None)
+
+
+def walk(client, url, limit):
+    """Toutes les lignes d'une liste, page par page, en suivant X-Next-Cursor ; retourne (lignes, pages)."""
+    rows, pages, cursor = [], 0, None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params)
+        assert response.status_code == 200, response.text
+        rows += response.json()
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return rows, pages
+
+
+def test_cursor_round_trip():
+    product_id = uuid.uuid4()
+    cursor = encode_cursor("movements", SAME_INSTANT, product_id)
+    assert decode_cursor("movements", cursor, datetime.fromisoformat, uuid.UUID) == [SAME_INSTANT, product_id]
+
+    with pytest.raises(ValueError):
+        decode_cursor("products", cursor, str, uuid.UUID)
+    with pytest.raises(ValueError):
+        decode_cursor("movements", cursor[:-3], datetime.fromisoformat, uuid.UUID)
+
+
+def test_products_pages_cover_every_product_once(db, tenant, client):
+    # Several products share a name: the id breaks the tie
+    names = ["Chaise", "Bureau", "Chaise", "Lampe", "Chaise", "Armoire", "Lampe", "Chaise", "Tabouret"]
+    products = [
+        models.Product(id=uuid.uuid4(), tenant_id=tenant.id, sku=f"SKU{i}", name=name, unit_price=1)
+        for i, name in enumerate(names)
+    ]
+    db.add_all(products)
+    db.commit()
+
+    rows, pages = walk(client, "/api/v1/products/", limit=2)
+
+    expected = [str(p.id) for p in sorted(products, key=lambda p: (p.name, p.id))]
+    assert [row["id"] for row in rows] == expected
+    assert pages == 5
+
+
+def test_movements_pages_with_timestamp_ties(db, tenant, client):
+    product = models.Product(id=uuid.uuid4(), tenant_id=tenant.id, sku="TIE", name="Égalité", unit_price=1)
+    db.add(product)
+    db.commit()
+    # Seven movements at the same instant (e.g. one import batch) between two others
+    timestamps = [SAME_INSTANT + timedelta(seconds=1)] + [SAME_INSTANT] * 7 + [SAME_INSTANT - timedelta(days=1)]
+    movements = [
+        models.StockMovement(
+            id=uuid.uuid4(), tenant_id=tenant.id, product_id=product.id, movement_type="INBOUND",
+            quantity=1, timestamp=timestamp
+        )
+        for timestamp in timestamps
+    ]
+    db.add_all(movements)
+    db.commit()
+
+    rows, pages = walk(client, "/api/v1/movements/", limit=3)
+
+    expected = [str(m.id) for m in sorted(movements, key=lambda m: (m.timestamp, m.id), reverse=True)]
+    assert [row["id"] for row in rows] == expected
+    assert pages == 3
+
+
+def test_invalid_or_foreign_cursor_is_rejected(client):
+    products_cursor = encode_cursor("products", "Chaise", uuid.uuid4())
+    assert client.get("/api/v1/movements/", params={"cursor": products_cursor}).status_code == 400
+    assert client.get("/api/v1/products/", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/v1/products/", params={"limit": 1001}).status_code == 422
@@ -0,0 +1,53 @@
+# tests/test_parsing.py
+"""Validation vectorisée des fichiers clients (sans base de données)."""
+import pandas as pd
+
+from services.parsing import RECORD_COLUMNS, DEFAULT_CATEGORY, MAX_QUANTITY, validate_frame, to_records
+
+
+def test_headers_are_mapped_and_defaults_filled():
+    clean, rejected = validate_frame(pd.DataFrame({" Ref ": ["A1", 42], "Qte": [3, None]}))
+
+    assert rejected.empty
+    assert list(clean.columns) == list(RECORD_COLUMNS)
+    assert to_records(clean) == [
+        {"sku": "A1", "name": "Product A1", "category": DEFAULT_CATEGORY, "supplier_name": None,
+         "unit_price": 0.0, "cost_price": 0.0, "quantity": 3, "warehouse": None},
+        {"sku": "42", "name": "Product 42", "category": DEFAULT_CATEGORY, "supplier_name": None,
+         "unit_price": 0.0, "cost_price": 0.0, "quantity": None, "warehouse": None},
+    ]
+
+
+def test_invalid_rows_are_rejected_with_their_line_and_reason():
+    clean, rejected = validate_frame(pd.DataFrame({
+        "sku": ["OK", None, "PRICE", "NEG", "BIG", "LONG"],
+        "nom": ["Bon", "Sans réf", "Prix", "Négatif", "Énorme", "x" * 256],
+        "prix": [10, 1, "dix", -1, 1, 1],
+        "qte": [1, 1, 1, 1, MAX_QUANTITY + 1, 1],
+    }))
+
+    assert clean["sku"].tolist() == ["OK"]
+    assert rejected.to_dict("records") == [
+        {"row": 1, "sku": None, "error": "missing SKU"},
+        {"row": 2, "sku": "PRICE", "error": "invalid unit_price: 'dix'"},
+        {"row": 3, "sku": "NEG", "error": "negative unit_price"},
+        {"row": 4, "sku": "BIG", "error": "quantity out of range"},
+        {"row": 5, "sku": "LONG", "error": "name longer than 255 characters"},
+    ]
+
+
+def test_duplicates_merge_per_sku_and_warehouse():
+    clean, rejected = validate_frame(pd.DataFrame({
+        "sku": ["A", "A", "A", "B"],
+        "nom": ["Premier", "Second", "Troisième", "Bêta"],
+        "qte": [2, 3, -1, 4.7],
+        "entrepôt": ["LYO", "LYO ", "PAR", ""],
+    }))
+
+    assert rejected.empty
+    records = {(r["sku"], r["warehouse"]): r for r in to_records(clean)}
+    # Positive quantities add up, the first occurrence's attributes win, blanks mean "no warehouse"
+    assert records[("A", "LYO")]["quantity"] == 5
+    assert records[("A", "PAR")]["quantity"] == 0
+    assert records[("A", "PAR")]["name"] == "Premier"
+    assert records[("B", None)]["quantity"] == 4
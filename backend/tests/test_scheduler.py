@@ -0,0 +1,67 @@
+# tests/test_scheduler.py
+"""Planificateur des synchronisations : jitter et limites de concurrence (sans base de données)."""
+import asyncio
+import threading
+import time
+import uuid
+
+import services.scheduler as scheduler
+from services.scheduler import SyncScheduler, jitter_seconds
+
+
+def test_jitter_is_stable_and_bounded():
+    ids = [uuid.uuid4() for _ in range(1000)]
+    hourly = [jitter_seconds(ds_id, 3600) for ds_id in ids]
+    window = min(3600 * scheduler.SYNC_JITTER_RATIO, scheduler.SYNC_MAX_JITTER_SECONDS)
+
+    assert hourly == [jitter_seconds(ds_id, 3600) for ds_id in ids]
+    assert all(0 <= offset < window for offset in hourly)
+    # Sources of the same frequency are spread over the window, not stacked on the same second
+    assert len({int(offset) for offset in hourly}) > window * 0.8
+    # Long periods: the window is capped
+    assert max(jitter_seconds(ds_id, 7 * 86400) for ds_id in ids) < scheduler.SYNC_MAX_JITTER_SECONDS
+
+
+def test_global_and_tenant_limits(monkeypatch):
+    lock = threading.Lock()
+    running = {"total": 0, "max_total": 0}
+    per_tenant = {}
+    done = []
+
+    def fake_run_inline(kind, tenant_id, ds_id, target, *args):
+        with lock:
+            running["total"] += 1
+            running["max_total"] = max(running["max_total"], running["total"])
+            current, peak = per_tenant.get(tenant_id, (0, 0))
+            per_tenant[tenant_id] = (current + 1, max(peak, current + 1))
+        time.sleep(0.05)
+        with lock:
+            running["total"] -= 1
+            current, peak = per_tenant[tenant_id]
+            per_tenant[tenant_id] = (current - 1, peak)
+            done.append(ds_id)
+
+    monkeypatch.setattr(scheduler.job_manager, "run_inline", fake_run_inline)
+    tenants = [str(uuid.uuid4()) for _ in range(3)]
+    sources = [
+        {"data_source_id": str(uuid.uuid4()), "tenant_id": tenant_id, "name": f"Source {i}", "due_at": time.time()}
+        for tenant_id in tenants for i in range(3)
+    ]
+
+    async def run():
+        sync = SyncScheduler(max_concurrent=2, max_per_tenant=1)
+        sync._global = asyncio.Semaphore(sync.max_concurrent)
+        sync.enqueue(sources)
+        # A source already queued is not queued twice
+        sync.enqueue(sources[:2])
+        stats = sync.stats()
+        assert stats["queue_depth"] + stats["running"] == len(sources)
+        await asyncio.gather(*sync._tasks)
+        return sync
+
+    sync = asyncio.run(run())
+
+    assert sorted(done) == sorted(s["data_source_id"] for s in sources)
+    assert running["max_total"] == 2
+    assert all(peak == 1 for _, peak in per_tenant.values())
+    assert sync.stats()["queue_depth"] == 0
@@ -0,0 +1,142 @@
+# tests/test_stock_aggregates.py
+"""Les tables tenues par triggers (product_stock, stock_movement_daily) suivent chaque écriture."""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+import models
+import services.bulk_writer as bulk_writer
+from services.bulk_writer import write_movements
+from services.analytics import movement_trend
+from services.stock import current_stock, warehouse_levels, warehouse_totals
+
+DAY = datetime(2026, 3, 10, 9, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def catalog(db, tenant):
+    """Deux entrepôts, un produit stocké dans les deux et un produit sans entrepôt."""
+    lyon = models.Warehouse(id=uuid.uuid4(), tenant_id=tenant.id, code="LYO", name="Lyon")
+    paris = models.Warehouse(id=uuid.uuid4(), tenant_id=tenant.id, code="PAR", name="Paris")
+    chair = models.Product(id=uuid.uuid4(), tenant_id=tenant.id, sku="CHAIR", name="Chaise", unit_price=20, cost_price=12)
+    lamp = models.Product(id=uuid.uuid4(), tenant_id=tenant.id, sku="LAMP", name="Lampe", unit_price=35, cost_price=20)
+    db.add_all([lyon, paris, chair, lamp])
+    db.commit()
+    return {"lyon": lyon.id, "paris": paris.id, "chair": chair.id, "lamp": lamp.id}
+
+
+def movement(tenant, product_id, quantity, warehouse_id=None, movement_type="INBOUND", timestamp=DAY):
+    return {
+        "id": uuid.uuid4(), "tenant_id": tenant.id, "product_id": product_id, "warehouse_id": warehouse_id,
+        "movement_type": movement_type, "quantity": quantity, "timestamp": timestamp,
+    }
+
+
+@pytest.fixture(params=["insert", "copy"])
+def write_path(request, monkeypatch):
+    """Écrit les mouvements par INSERT multi-lignes ou par COPY + table de staging."""
+    monkeypatch.setattr(bulk_writer, "COPY_THRESHOLD_ROWS", 1 if request.param == "copy" else 10 ** 9)
+    return request.param
+
+
+def test_insert(db, tenant, catalog, write_path, assert_consistent):
+    write_movements(db, [
+        movement(tenant, catalog["chair"], 10, catalog["lyon"]),
+        movement(tenant, catalog["chair"], 4, catalog["paris"]),
+        movement(tenant, catalog["chair"], -3, catalog["lyon"], "OUTBOUND", DAY + timedelta(days=1)),
+        movement(tenant, catalog["lamp"], 6),
+    ])
+    db.commit()
+
+    assert current_stock(db, tenant.id, [catalog["chair"], catalog["lamp"]]) == {catalog["chair"]: 11, catalog["lamp"]: 6}
+    levels = warehouse_levels(db, tenant.id, [catalog["chair"]])
+    assert levels[(catalog["chair"], catalog["lyon"])] == 7
+    assert levels[(catalog["chair"], catalog["paris"])] == 4
+    totals = {row["warehouse_id"]: row["units"] for row in warehouse_totals(db, tenant.id)}
+    assert totals[catalog["lyon"]] == 7
+    assert_consistent(tenant.id)
+
+
+def test_update(db, tenant, catalog, assert_consistent):
+    inbound = movement(tenant, catalog["chair"], 10, catalog["lyon"])
+    write_movements(db, [inbound, movement(tenant, catalog["lamp"], 5)])
+    db.commit()
+
+    # Quantity, warehouse, day and type of the same movement change
+    db.query(models.StockMovement).filter(models.StockMovement.id == inbound["id"]).update({
+        "quantity": 8, "warehouse_id": catalog["paris"], "movement_type": "ADJUSTMENT",
+        "timestamp": DAY + timedelta(days=3),
+    }, synchronize_session=False)
+    db.commit()
+
+    assert current_stock(db, tenant.id, [catalog["chair"]]) == {catalog["chair"]: 8}
+    # The emptied (chair, Lyon) row stays at 0
+    levels = warehouse_levels(db, tenant.id, [catalog["chair"]])
+    assert {key: on_hand for key, on_hand in levels.items() if on_hand} == {(catalog["chair"], catalog["paris"]): 8}
+    assert_consistent(tenant.id)
+
+
+def test_delete(db, tenant, catalog, write_path, assert_consistent):
+    rows = [movement(tenant, catalog["chair"], quantity, catalog["lyon"]) for quantity in (2, 3, 5)]
+    write_movements(db, rows)
+    db.commit()
+
+    db.query(models.StockMovement).filter(
+        models.StockMovement.id.in_([rows[0]["id"], rows[1]["id"]])
+    ).delete(synchronize_session=False)
+    db.commit()
+    assert current_stock(db, tenant.id, [catalog["chair"]]) == {catalog["chair"]: 5}
+    assert_consistent(tenant.id)
+
+    # The last movement of the day: the daily rollup row goes away too
+    db.query(models.StockMovement).filter(models.StockMovement.id == rows[2]["id"]).delete(synchronize_session=False)
+    db.commit()
+    assert db.query(models.StockMovementDaily).filter(models.StockMovementDaily.tenant_id == tenant.id).count() == 0
+    assert_consistent(tenant.id)
+
+
+def test_product_cascade(db, tenant, catalog, assert_consistent):
+    write_movements(db, [
+        movement(tenant, catalog["chair"], 10, catalog["lyon"]),
+        movement(tenant, catalog["lamp"], 4, catalog["lyon"]),
+    ])
+    db.commit()
+
+    db.query(models.Product).filter(models.Product.id == catalog["chair"]).delete(synchronize_session=False)
+    db.commit()
+
+    assert db.query(models.ProductStock).filter(models.ProductStock.product_id == catalog["chair"]).count() == 0
+    totals = {row["warehouse_id"]: row for row in warehouse_totals(db, tenant.id)}
+    assert totals[catalog["lyon"]]["units"] == 4
+    assert totals[catalog["lyon"]]["skus"] == 1
+    assert totals[catalog["lyon"]]["stock_value"] == 4 * 35
+    assert_consistent(tenant.id)
+
+
+def test_concurrent_writers_of_one_warehouse(db, engine, tenant, catalog):
+    # Two imports into the same warehouse touch different product_stock rows: neither waits
+    with engine.connect() as first, engine.connect() as second:
+        for conn, product in ((first, "chair"), (second, "lamp")):
+            conn.execute(text("SET lock_timeout = '1s'"))
+            conn.execute(models.StockMovement.__table__.insert(), [movement(tenant, catalog[product], 5, catalog["lyon"])])
+        second.commit()
+        first.commit()
+
+    totals = {row["warehouse_id"]: row for row in warehouse_totals(db, tenant.id, [catalog["lyon"]])}
+    assert totals[catalog["lyon"]]["units"] == 10
+    assert totals[catalog["lyon"]]["stock_value"] == 5 * 20 + 5 * 35
+
+
+def test_trend_counts_outbound_movements_as_sorties(db, tenant, catalog):
+    today = datetime.now(timezone.utc)
+    write_movements(db, [
+        movement(tenant, catalog["chair"], 10, catalog["lyon"], timestamp=today),
+        movement(tenant, catalog["chair"], -3, catalog["lyon"], "OUTBOUND", today),
+        movement(tenant, catalog["chair"], -2, catalog["lyon"], "ADJUSTMENT", today),
+    ])
+    db.commit()
+
+    assert sum(point["quantity"] for point in movement_trend(db, tenant.id, "out", days=7)["points"]) == 3
+    assert sum(point["quantity"] for point in movement_trend(db, tenant.id, "net", days=7)["points"]) == 5
@@ -0,0 +1,47 @@
+# tests/test_upload_store.py
+"""Stockage adressé par le contenu : un objet partagé n'est supprimé que sans source qui le référence."""
+import io
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+import models
+from services.deletion import delete_data_source_in_batches
+from services.ingestion import register_upload, run_upload
+from services.upload_store import store_fileobj, keep_object, release_object
+
+# Bytes of upload("...", [("A1", "Alpha", 2, 10)])
+CONTENT = b"ref,nom,prix,qte\nA1,Alpha,2,10\n"
+
+
+def test_object_reused_by_an_upload_in_flight_survives_a_release(db, tenant, upload):
+    _, first, _ = upload("first.csv", [("A1", "Alpha", 2, 10)])
+    # Not a duplicate for the next upload, but still the only source of the object
+    first.status = models.DataSourceStatus.ERROR
+    db.commit()
+
+    # Same bytes received while the first source is deleted
+    stored = store_fileobj(io.BytesIO(CONTENT))
+    delete_data_source_in_batches(db, first)
+    mode, second = register_upload(db, tenant.id, stored, "second.csv")
+
+    assert os.path.exists(second.connection_config["file_path"])
+    assert run_upload(db, mode, second, None, stored.path, "second.csv")["processed_count"] == 1
+
+
+def test_release_and_reuse_of_one_object_are_serialized(db, engine, tenant, upload):
+    _, source, _ = upload("first.csv", [("A1", "Alpha", 2, 10)])
+    stored = store_fileobj(io.BytesIO(CONTENT))
+
+    with engine.connect() as conn:
+        other = Session(bind=conn)
+        release_object(other, source)
+        # The release holds the object until it commits: a new reference waits for it
+        db.execute(text("SET lock_timeout = '200ms'"))
+        with pytest.raises(OperationalError):
+            keep_object(db, stored)
+        db.rollback()
+        other.rollback()
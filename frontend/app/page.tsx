@@ -2,7 +2,7 @@
 
 import React, { useEffect, useState } from 'react';
 import ChatWidget from '../src/components/ChatWidget';
-import { LayoutDashboard, Package, Truck, Database, Activity, TrendingUp, Globe } from 'lucide-react';
+import { LayoutDashboard, Package, Truck, Database, Activity, TrendingUp, Globe, Warehouse } from 'lucide-react';
 
 // --- Translations ---
 const translations = {
@@ -19,6 +19,13 @@ const translations = {
     sourceStatus: "Status",
     lastUpdate: "Last Update",
     noSources: "No data sources connected.",
+    warehouseListTitle: "Stock per Warehouse",
+    warehouseName: "Warehouse",
+    warehouseUnits: "Units",
+    warehouseInStock: "SKUs in stock",
+    warehouseOutOfStock: "Out of stock",
+    warehouseValue: "Value",
+    noWarehouses: "No stock recorded per warehouse.",
     quickActions: "Quick Actions",
     quickActionsSubtitle: "Ask the assistant to analyze data.",
     action1: "Price Histogram",
@@ -39,6 +46,13 @@ const translations = {
     sourceStatus: "Statut",
     lastUpdate: "Dernière MàJ",
     noSources: "Aucune source connectée.",
+    warehouseListTitle: "Stock par Entrepôt",
+    warehouseName: "Entrepôt",
+    warehouseUnits: "Unités",
+    warehouseInStock: "Réf. en stock",
+    warehouseOutOfStock: "En rupture",
+    warehouseValue: "Valeur",
+    noWarehouses: "Aucun stock enregistré par entrepôt.",
     quickActions: "Actions Rapides",
     quickActionsSubtitle: "Demandez une analyse à l'assistant.",
     action1: "Histogramme des prix",
@@ -107,8 +121,55 @@ const DataSourceList = ({ sources, t }: { sources: any[], t: any }) => (
   </div>
 );
 
+const WarehouseStockList = ({ warehouses, t }: { warehouses: any[], t: any }) => (
+  <div className="bg-white rounded-2xl shadow-sm border border-gray-100 p-6">
+    <h3 className="text-lg font-semibold text-gray-900 mb-4 flex items-center">
+      <Warehouse className="w-5 h-5 mr-2 text-blue-600" />
+      {t.warehouseListTitle}
+    </h3>
+    <div className="overflow-x-auto">
+      <table className="w-full text-left">
+        <thead>
+          <tr className="border-b border-gray-100 text-sm text-gray-500">
+            <th className="pb-3 font-medium">{t.warehouseName}</th>
+            <th className="pb-3 font-medium text-right">{t.warehouseUnits}</th>
+            <th className="pb-3 font-medium text-right">{t.warehouseInStock}</th>
+            <th className="pb-3 font-medium text-right">{t.warehouseOutOfStock}</th>
+            <th className="pb-3 font-medium text-right">{t.warehouseValue}</th>
+          </tr>
+        </thead>
+        <tbody className="text-sm">
+          {warehouses.length === 0 ? (
+            <tr>
+              <td colSpan={5} className="py-4 text-center text-gray-400">{t.noWarehouses}</td>
+            </tr>
+          ) : (
+            warehouses.map((warehouse) => (
+              <tr key={warehouse.warehouse_id || 'none'} className="group hover:bg-gray-50 transition-colors">
+                <td className="py-3 font-medium text-gray-800">{warehouse.warehouse_name}</td>
+                <td className="py-3 text-right text-gray-500">{warehouse.units.toLocaleString()}</td>
+                <td className="py-3 text-right text-gray-500">{warehouse.skus_in_stock.toLocaleString()}</td>
+                <td className="py-3 text-right">
+                  <span className={`px-2 py-1 rounded-full text-xs font-medium 
+                    ${warehouse.skus_out_of_stock === 0 ? 'bg-green-100 text-green-700' : 'bg-red-100 text-red-700'}`}>
+                    {warehouse.skus_out_of_stock}
+                  </span>
+                </td>
+                <td className="py-3 text-right text-gray-400">
+                  {warehouse.stock_value.toLocaleString(undefined, { maximumFractionDigits: 0 })} €
+                </td>
+              </tr>
+            ))
+          )}
+        </tbody>
+      </table>
+    </div>
+  </div>
+);
+
 export default function Dashboard() {
   const [stats, setStats] = useState<any>(null);
+  const [warehouses, setWarehouses] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
   const [lang, setLang] = useState<Language>('en'); // Default English
   const [clientId, setClientId] = useState<string>('');
@@ -129,15 +190,20 @@ export default function Dashboard() {
   const fetchStats = React.useCallback(async () => {
     if (!clientId) return;
     try {
-      const res = await fetch('http://127.0.0.1:8000/api/v1/dashboard/stats', {
-        headers: {
-          'x-client-id': clientId // Pass session ID to isolate data
-        }
-      });
+      const headers = {
+        'x-client-id': clientId // Pass session ID to isolate data
+      };
+      const [res, warehouseRes] = await Promise.all([
+        fetch('http://127.0.0.1:8000/api/v1/dashboard/stats', { headers }),
+        fetch('http://127.0.0.1:8000/api/v1/dashboard/warehouses', { headers })
+      ]);
       if (res.ok) {
         const data = await res.json();
         setStats(data);
       }
+      if (warehouseRes.ok) {
+        setWarehouses(await warehouseRes.json());
+      }
     } catch (err) {
       console.error("Failed to load stats", err);
     } finally {
@@ -226,9 +292,10 @@ export default function Dashboard() {
 
             {/* Main Content Area */}
             <div className="grid grid-cols-1 lg:grid-cols-3 gap-8">
-              {/* Data Source List */}
-              <div className="lg:col-span-2">
+              {/* Data Source List and Stock per Warehouse */}
+              <div className="lg:col-span-2 space-y-8">
                 <DataSourceList sources={stats?.data_sources || []} t={t} />
+                <WarehouseStockList warehouses={warehouses} t={t} />
               </div>
 
               {/* Quick Activity / Tips */}
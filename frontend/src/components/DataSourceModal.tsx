@@ -13,6 +13,7 @@ const DataSourceModal: React.FC<DataSourceModalProps> = ({ isOpen, onClose, onUp
     const [activeTab, setActiveTab] = useState<'upload' | 'database'>('upload');
     const [uploadStatus, setUploadStatus] = useState<'idle' | 'uploading' | 'success' | 'error'>('idle');
     const [message, setMessage] = useState('');
+    const [errorReportUrl, setErrorReportUrl] = useState<string | null>(null);
 
     const [dataSources, setDataSources] = useState<any[]>([]);
 
@@ -59,12 +60,67 @@ const DataSourceModal: React.FC<DataSourceModalProps> = ({ isOpen, onClose, onUp
     };
 
 
+    // Subscribe to the ingestion job progress (Server-Sent Events)
+    // e.g. "lecture 1.2s · parse 3.4s · écriture 2.1s"
+    const formatTimings = (timings?: Record<string, number>) => {
+        if (!timings) return '';
+        const labels: Record<string, string> = {
+            read: 'lecture', parse: 'parse', lookups: 'référentiels', write: 'écriture',
+            commit: 'commit', diff: 'diff', archive: 'archive'
+        };
+        return Object.entries(timings)
+            .map(([stage, seconds]) => `${labels[stage] || stage} ${seconds.toFixed(1)}s`)
+            .join(' · ');
+    };
+
+    const followJob = (jobId: string) => {
+        const source = new EventSource(`http://127.0.0.1:8000/api/v1/datasources/jobs/${jobId}/events?client_id=${encodeURIComponent(clientId)}`);
+
+        source.onmessage = (event) => {
+            const job = JSON.parse(event.data);
+            setMessage(`Import en cours... ${job.rows_done} lignes (${Math.round(job.rows_per_sec)} lignes/s, ${job.error_count} erreurs)`);
+        };
+
+        source.addEventListener('done', (event) => {
+            source.close();
+            const job = JSON.parse((event as MessageEvent).data);
+            fetchDataSources();
+            if (job.status === 'COMPLETED') {
+                setUploadStatus('success');
+                const timings = formatTimings(job.timings);
+                setMessage(`${job.message || 'Fichier importé avec succès !'}${timings ? ` (${timings})` : ''}`);
+                if (onUploadSuccess) {
+                    onUploadSuccess();
+                }
+                if (job.error_count > 0 && job.data_source_id) {
+                    // Keep the message up so the full report of rejected rows can be downloaded
+                    setErrorReportUrl(`http://127.0.0.1:8000/api/v1/datasources/${job.data_source_id}/errors?client_id=${encodeURIComponent(clientId)}`);
+                    return;
+                }
+                setTimeout(() => {
+                    setUploadStatus('idle');
+                    setMessage('');
+                }, 5000);
+            } else {
+                setUploadStatus('error');
+                setMessage(job.message || "Erreur lors de l'import.");
+            }
+        });
+
+        source.onerror = () => {
+            source.close();
+            setUploadStatus('error');
+            setMessage("Connexion au suivi de l'import perdue.");
+        };
+    };
+
     const handleFileUpload = async (event: React.ChangeEvent<HTMLInputElement>) => {
         const file = event.target.files?.[0];
         if (!file) return;
 
         setUploadStatus('uploading');
         setMessage('Upload en cours...');
+        setErrorReportUrl(null);
 
         const formData = new FormData();
         formData.append('file', file);
@@ -86,17 +142,18 @@ const DataSourceModal: React.FC<DataSourceModalProps> = ({ isOpen, onClose, onUp
 
             const data = await response.json();
 
-            if (response.ok) {
+            if (response.ok && data.duplicate) {
+                // Same bytes already imported: nothing was re-ingested
                 setUploadStatus('success');
-                setMessage(data.message || 'Fichier importé avec succès !');
-                if (onUploadSuccess) {
-                    onUploadSuccess();
-                }
-                fetchDataSources(); // Refresh list immediately
+                setMessage('Ce fichier a déjà été importé : aucune donnée dupliquée.');
                 setTimeout(() => {
                     setUploadStatus('idle');
                     setMessage('');
                 }, 2000);
+            } else if (response.ok) {
+                setMessage(data.message || 'Import en cours...');
+                fetchDataSources(); // Show the pending source immediately
+                followJob(data.job_id);
             } else {
                 setUploadStatus('error');
                 setMessage(data.detail || "Erreur lors de l'import.");
@@ -182,6 +239,11 @@ const DataSourceModal: React.FC<DataSourceModalProps> = ({ isOpen, onClose, onUp
                                             'bg-blue-50 text-blue-700'
                                         }`}>
                                         {message}
+                                        {errorReportUrl && (
+                                            <a href={errorReportUrl} className="block mt-2 underline">
+                                                Télécharger le rapport des lignes rejetées
+                                            </a>
+                                        )}
                                     </div>
                                 )}
                             </div>
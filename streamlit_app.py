@@ -24,6 +24,8 @@ import models
 Base = models.Base
 from services.nlp import nlp_service
 from services.query import query_service
+from services.ingestion import register_upload, run_upload, error_report_path, UPLOAD_DUPLICATE
+from services.upload_store import store_fileobj
 from routers import auth
 
 # --- DATABASE CONNECTION CACHING ---
@@ -135,121 +137,42 @@ with st.sidebar:
                     # Get user (create if needed)
                     user = auth.get_or_create_session_user(db, st.session_state.client_id)
                     
-                    # We need to adapt the upload logic from data_source.py here
-                    # Or call a simplified service function. 
-                    # For quick deploy, let's implement a simplified ingestor here using pandas directly.
-                    
+                    # Same ingestion pipeline as the API upload (routers/data_source.py),
+                    # run synchronously here instead of in a background job.
                     with st.spinner("Analyse et import en cours..."):
-                        timestamp = pd.Timestamp.now().strftime("%Y%m%d_%H%M%S")
-                        filename = uploaded_file.name
-                        
-                        # Create DataSource
-                        ds = models.DataSource(
-                            name=filename,
-                            type=models.DataSourceType.FILE_UPLOAD,
-                            tenant_id=user.tenant_id,
-                            status=models.DataSourceStatus.ACTIVE,
-                            last_sync_status="COMPLETED"
-                        )
-                        db.add(ds)
-                        db.commit()
-                        db.refresh(ds)
-                        
-                        df = None
-                        if filename.endswith('.csv'):
-                            df = pd.read_csv(uploaded_file)
+                        filename = uploaded_file.name.lower()
+                        uploaded_file.seek(0)
+                        stored = store_fileobj(uploaded_file)
+                        mode, ds = register_upload(db, user.tenant_id, stored, filename)
+
+                        if mode == UPLOAD_DUPLICATE:
+                            st.info(f"Ce fichier a déjà été importé ('{ds.name}'). Rien à faire.")
                         else:
-                            df = pd.read_excel(uploaded_file)
-                            
-                        # Standardize columns
-                        column_mapping = {
-                            'product': 'name', 'nom produit': 'name', 'nom': 'name', 'designation': 'name', 'product_name': 'name',
-                            'sku': 'sku', 'ref': 'sku', 'reference': 'sku', 'code': 'sku', 'product_id': 'sku',
-                            'category': 'category', 'catégorie': 'category', 'famille': 'category',
-                            'quantity': 'quantity', 'quantité': 'quantity', 'stock': 'quantity', 'qte': 'quantity', 'quantity_in_stock': 'quantity',
-                            'price': 'unit_price', 'prix': 'unit_price', 'prix unitaire': 'unit_price',
-                            'cost': 'cost_price', 'coût': 'cost_price', 'pamp': 'cost_price',
-                            'supplier': 'supplier_name', 'fournisseur': 'supplier_name'
-                        }
-                        df.columns = [str(col).lower().strip() for col in df.columns]
-                        df.rename(columns={k:v for k,v in column_mapping.items() if k in df.columns}, inplace=True)
-                        
-                        processed_count = 0
-                        skipped_count = 0
-                        
-                        # Debug: Show columns found
-                        st.info(f"Colonnes trouvées dans le fichier: {list(df.columns)}")
-                        
-                        for idx, row in df.iterrows():
-                            try:
-                                # Helper
-                                def get(col, default=None): return row[col] if col in row and pd.notna(row[col]) else default
-                                
-                                sku = get('sku')
-                                name = get('name')
-                                if not sku and not name: continue
-                                sku = str(sku) if sku else f"GEN-{hash(name)}"
-                                
-                                # Category
-                                cat_name = str(get('category', 'General'))
-                                cat = db.query(models.Category).filter_by(name=cat_name, tenant_id=user.tenant_id).first()
-                                if not cat:
-                                    cat = models.Category(name=cat_name, tenant_id=user.tenant_id)
-                                    db.add(cat)
-                                    db.flush()
-                                    
-                                # Supplier
-                                sup_name = get('supplier_name')
-                                sup_id = None
-                                if sup_name:
-                                    sup = db.query(models.Supplier).filter_by(name=str(sup_name), tenant_id=user.tenant_id).first()
-                                    if not sup:
-                                        sup = models.Supplier(name=str(sup_name), tenant_id=user.tenant_id)
-                                        db.add(sup)
-                                        db.flush()
-                                    sup_id = sup.id
-                                    
-                                # Product
-                                prod = db.query(models.Product).filter_by(sku=sku, tenant_id=user.tenant_id).first()
-                                if not prod:
-                                    prod = models.Product(
-                                        sku=sku,
-                                        name=str(name) if name else f"Product {sku}",
-                                        category_id=cat.id,
-                                        supplier_id=sup_id,
-                                        unit_price=float(get('unit_price', 0)),
-                                        cost_price=float(get('cost_price', 0)),
-                                        tenant_id=user.tenant_id,
-                                        data_source_id=ds.id
-                                    )
-                                    db.add(prod)
-                                    db.flush()
-                                    
-                                # Stock
-                                qty = int(get('quantity', 0))
-                                if qty > 0:
-                                    mv = models.StockMovement(
-                                        product_id=prod.id,
-                                        movement_type="INBOUND",
-                                        quantity=qty,
-                                        notes="Initial Import via Streamlit",
-                                        user_id=user.id,
-                                        tenant_id=user.tenant_id
-                                    )
-                                    db.add(mv)
-                                
-                                processed_count += 1
-                            except Exception as e:
-                                skipped_count += 1
-                                if skipped_count <= 5: # Show first 5 errors only
-                                    st.warning(f"Ligne {idx} ignorée: {e} | Données: {row.to_dict()}")
-                                print(f"Skipping row: {e}")
-                                
-                        db.commit()
-                        st.success(f"✅ Importé {processed_count} articles avec succès !")
-                        if skipped_count > 0:
-                            st.warning(f"⚠️ {skipped_count} lignes ignorées (voir détails ci-dessus ou logs).")
-                        st.session_state.messages.append({"role": "assistant", "content": f"J'ai bien reçu vos données ({processed_count} articles). Je suis prêt à les analyser !"})
+                            summary = run_upload(db, mode, ds, user.id, stored.path, filename)
+                            processed_count = summary["processed_count"]
+
+                            st.success(f"✅ {summary['message']}")
+                            if summary["error_count"] > 0:
+                                st.warning(f"⚠️ {summary['error_count']} lignes ignorées.")
+                                for error in summary["errors"][:5]:  # Show first 5 errors only
+                                    st.caption(error)
+                                report_path = error_report_path(ds.id)
+                                if os.path.exists(report_path):
+                                    with open(report_path, "rb") as report:
+                                        st.download_button(
+                                            "📄 Rapport complet des lignes rejetées", report.read(),
+                                            file_name=f"{filename}.errors.csv", mime="text/csv"
+                                        )
+
+                            with st.expander("⏱️ Durée par étape"):
+                                timings = summary["timings"]
+                                st.dataframe(
+                                    pd.DataFrame({"Étape": list(timings), "Secondes": list(timings.values())}),
+                                    hide_index=True
+                                )
+                                st.caption(f"{summary['rows_read']} lignes lues")
+
+                            st.session_state.messages.append({"role": "assistant", "content": f"J'ai bien reçu vos données ({processed_count} articles). Je suis prêt à les analyser !"})
                         
                 except Exception as e:
                     st.error(f"Erreur d'import: {str(e)}")